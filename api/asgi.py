@@ -0,0 +1,202 @@
+import asyncio
+import json
+import os
+import sys
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+# Import the Flask app and its shared state
+sys.path.insert(0, os.path.dirname(__file__))
+from index import (
+    app as flask_app,
+    r,
+    get_deep_memory,
+    parse_chat_request,
+    capture_response,
+    build_research_prompt,
+    format_sse,
+    request_deadlines
+)
+
+
+#=======================================================================
+# ASGI entry point
+#
+# Serves /api/python on the async DeepMemory API, so one process can
+# hold many in-flight research requests while they wait on OpenAI and
+# Pinecone. Every other route is handed to the Flask app in a worker
+# thread. Run with any ASGI server, e.g. `uvicorn asgi:app --app-dir api`.
+#=======================================================================
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await handle_lifespan(receive, send)
+        return
+
+    if scope["type"] != "http":
+        return
+
+    body = await read_body(receive)
+    if scope["path"] == "/api/python" and scope["method"] == "POST":
+        await chat(body, send)
+    else:
+        await call_flask(scope, body, send)
+
+
+#=======================================================================
+# Acknowledges server startup and shutdown
+#=======================================================================
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+#=======================================================================
+# Reads the full request body
+#=======================================================================
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+#=======================================================================
+# Sends a complete JSON response
+#=======================================================================
+async def send_json(send, status: int, data: dict):
+    body = json.dumps(data).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))]
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+#=======================================================================
+# Chat endpoint (async counterpart of call_chatgpt)
+#=======================================================================
+async def chat(body: bytes, send):
+    research_deadline, request_deadline = request_deadlines()
+    chat_request = parse_chat_request(json.loads(body.decode("utf-8")))
+    user_id = chat_request["user_id"]
+    user_query = chat_request["user_query"]
+
+    # Credential lookup and instance creation may block on Redis and Pinecone
+    credentials = await asyncio.to_thread(r.hgetall, user_id)
+    dm = await asyncio.to_thread(get_deep_memory, user_id, credentials)
+
+    if chat_request["stream_enabled"]:
+        await stream_chat(dm, chat_request, send, research_deadline, request_deadline)
+        return
+
+    prompt = user_query
+
+    # Perform deep research if enabled
+    if chat_request["research_enabled"]:
+        research_result = await dm.aresearch(user_query, mode=chat_request["research_mode"], deadline=research_deadline)
+        prompt = build_research_prompt(user_query, research_result)
+
+    # Generate chat response using OpenAI
+    response_text = await dm.async_openai_provider.generate_text(prompt, use_cache=False, deadline=request_deadline)
+
+    job_id = await asyncio.to_thread(capture_response, dm, user_id, chat_request["conversation_memory"], response_text, chat_request["memorize_enabled"])
+    if job_id is not None:
+        await send_json(send, 200, {"text": response_text, "memorizeJobId": job_id})
+        return
+
+    await send_json(send, 200, {"text": response_text})
+
+
+#=======================================================================
+# Streams a chat response as Server-Sent Events (same events as the
+# Flask stream_chat)
+#=======================================================================
+async def stream_chat(dm, chat_request: dict, send, research_deadline=None, request_deadline=None):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]
+    })
+
+    async def emit(event: str, data: dict):
+        await send({"type": "http.response.body", "body": format_sse(event, data).encode("utf-8"), "more_body": True})
+
+    user_query = chat_request["user_query"]
+    chunks = []
+    completed = False
+    try:
+        prompt = user_query
+
+        # Run research in the background, forwarding its progress events
+        if chat_request["research_enabled"]:
+            events = asyncio.Queue()
+
+            async def run_research():
+                try:
+                    return await dm.aresearch(
+                        user_query,
+                        on_progress=lambda stage, detail: events.put_nowait({"stage": stage, **detail}),
+                        mode=chat_request["research_mode"],
+                        deadline=research_deadline
+                    )
+                finally:
+                    events.put_nowait(None)
+
+            research = asyncio.create_task(run_research())
+            while (event := await events.get()) is not None:
+                await emit("progress", event)
+
+            try:
+                prompt = build_research_prompt(user_query, await research)
+            except Exception as e:
+                await emit("error", {"message": str(e)})
+                return
+
+        # Stream generated tokens
+        try:
+            async for delta in dm.async_openai_provider.stream_text(prompt, deadline=request_deadline):
+                chunks.append(delta)
+                await emit("token", {"text": delta})
+        except Exception as e:
+            await emit("error", {"message": str(e)})
+            return
+
+        completed = True
+        await emit("done", {"text": "".join(chunks)})
+
+    finally:
+        # Capture the completed conversation in memory once the stream ends
+        if completed and chunks:
+            await asyncio.to_thread(capture_response, dm, chat_request["user_id"], chat_request["conversation_memory"], "".join(chunks), chat_request["memorize_enabled"])
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+#=======================================================================
+# Hands a request to the Flask app in a worker thread
+#=======================================================================
+async def call_flask(scope, body: bytes, send):
+    headers = [(name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"]]
+    environ = EnvironBuilder(
+        path=scope.get("root_path", "") + scope["path"],
+        method=scope["method"],
+        headers=headers,
+        data=body,
+        query_string=scope.get("query_string", b"").decode("latin-1")
+    ).get_environ()
+
+    app_iter, status, response_headers = await asyncio.to_thread(run_wsgi_app, flask_app, environ, True)
+    response_body = b"".join(app_iter)
+
+    await send({
+        "type": "http.response.start",
+        "status": int(status.split(" ", 1)[0]),
+        "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response_headers.items()]
+    })
+    await send({"type": "http.response.body", "body": response_body})
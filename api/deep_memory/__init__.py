@@ -1 +1,9 @@
-from .deep_memory import DeepMemory
\ No newline at end of file
+from .deep_memory import DeepMemory, key_namespace
+from .memorization_queue import MemorizationQueue, PartialFailure
+from .instance_cache import InstanceCache
+from .cache import MemoryCache, RedisCache, DiskCache, TieredCache
+from .query_router import QueryRouter
+from .metrics import Metrics, metrics, timed
+from .deadline import Deadline, DeadlineExceeded
+from .resilience import CircuitBreaker, CircuitOpenError, Hedge, get_circuit_breaker
+from .executors import configure_executors, executor_stats
@@ -1,21 +1,78 @@
 import json
 import re
 import textwrap
+from typing import List, Dict, Any, Optional, Union
 from ..tools import Tools
+from ..evidence_packer import EvidencePacker
+from ..deadline import Deadline
+from ..metrics import metrics
 
 
 #=======================================================================
 # Agent for integrating research evidence into factual summaries
 #=======================================================================
 class IntegrateAgent:
-    def __init__(self, tools: Tools):
+    def __init__(self, tools: Tools, packer: Optional[EvidencePacker] = None):
         self.tools = tools
 
+        # Packs evidence into the prompt's token budget
+        self.packer = packer or EvidencePacker()
+
+
+    #=======================================================================
+    # Packs evidence (ranked evidence items or a plain string) into the
+    # token budget, returning the packer's report
+    #=======================================================================
+    def pack_evidence(self, question: str, evidence: Union[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        return self.packer.pack(question, evidence)
+
 
     #=======================================================================
     # Integrates research evidence into a factual summary for a question
+    # (evidence beyond the token budget is trimmed or dropped, unless
+    # packed says it is already a packed context), optionally at a lower
+    # reasoning effort and within a deadline
+    #=======================================================================
+    def integrate_evidence(self, question: str, evidence: Union[str, List[Dict[str, Any]]], reasoning_effort: Optional[str] = None, deadline: Optional[Deadline] = None, packed: bool = False) -> str:
+        prompt = self._build_prompt(question, evidence, packed)
+
+        try:
+            with metrics.span("integration"):
+                response = self.tools.use_tool("generate_text", prompt=prompt, reasoning_effort=reasoning_effort, deadline=deadline)
+            return self._parse_response(response)
+        except Exception as e:
+            print(f"Integration failed: {e}")
+            return ""
+
+
     #=======================================================================
-    def integrate_evidence(self, question: str, evidence_context: str) -> str:
+    # Integrates research evidence without blocking the event loop
+    #=======================================================================
+    async def aintegrate_evidence(self, question: str, evidence: Union[str, List[Dict[str, Any]]], reasoning_effort: Optional[str] = None, deadline: Optional[Deadline] = None, packed: bool = False) -> str:
+        prompt = self._build_prompt(question, evidence, packed)
+
+        try:
+            with metrics.span("integration"):
+                response = await self.tools.ause_tool("generate_text", prompt=prompt, reasoning_effort=reasoning_effort, deadline=deadline)
+            return self._parse_response(response)
+        except Exception as e:
+            print(f"Integration failed: {e}")
+            return ""
+
+
+    #=======================================================================
+    # Packs the evidence (unless already packed) and builds the
+    # integration prompt
+    #=======================================================================
+    def _build_prompt(self, question: str, evidence: Union[str, List[Dict[str, Any]]], packed: bool = False) -> str:
+        if packed:
+            evidence_context = evidence
+        else:
+            packing = self.pack_evidence(question, evidence)
+            if packing["dropped"] or packing["trimmed"]:
+                print(f"Evidence packed into {packing['tokens']} tokens: {len(packing['trimmed'])} trimmed, {len(packing['dropped'])} dropped")
+            evidence_context = packing["context"]
+
         # Integration prompt
         prompt = textwrap.dedent(f"""
             You are the IntegrateAgent. Your job is to build an integrated factual summary for a QUESTION.
@@ -68,25 +125,25 @@ class IntegrateAgent:
             After the <think> section, return ONLY the JSON object. Do NOT output Markdown, comments, headings, or explanations outside the JSON.
             """).strip()
 
-        try:
-            response = self.tools.use_tool("generate_text", prompt=prompt)
-            
-            # Skip over the think section if it exists
-            think_end_pattern = r'</think>\s*(.*)'
-            think_match = re.search(think_end_pattern, response, re.DOTALL | re.IGNORECASE)
-            
-            if think_match:
-                json_candidate = think_match.group(1).strip()
-            else:
-                json_candidate = response.strip()
-            
-            # Try to parse as JSON
-            try:
-                result = json.loads(json_candidate)
-                return result.get("content", "")
-            except json.JSONDecodeError:
-                raise ValueError(f"Could not extract valid JSON from response: {json_candidate[:200]}...")
+        return prompt
 
-        except Exception as e:
-            print(f"Integration failed: {e}")
-            return ""
\ No newline at end of file
+
+    #=======================================================================
+    # Parses the integrated content from an integration response
+    #=======================================================================
+    def _parse_response(self, response: str) -> str:
+        # Skip over the think section if it exists
+        think_end_pattern = r'</think>\s*(.*)'
+        think_match = re.search(think_end_pattern, response, re.DOTALL | re.IGNORECASE)
+
+        if think_match:
+            json_candidate = think_match.group(1).strip()
+        else:
+            json_candidate = response.strip()
+
+        # Try to parse as JSON
+        try:
+            result = json.loads(json_candidate)
+            return result.get("content", "")
+        except json.JSONDecodeError:
+            raise ValueError(f"Could not extract valid JSON from response: {json_candidate[:200]}...")
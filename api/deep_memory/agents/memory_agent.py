@@ -1,97 +1,384 @@
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Any, Tuple, Optional
 from ..tools import Tools
-import uuid
+import asyncio
+import hashlib
+import json
 import textwrap
 
 
+# Indexes receiving abstracts (memo) and full content (page)
+MEMO_INDEXES = ["deep-memory-memo", "deep-memory-memo-sparse"]
+PAGE_INDEXES = ["deep-memory-page", "deep-memory-page-sparse"]
+
+
 #=======================================================================
 # Agent for processing and storing memories
 #=======================================================================
 class MemoryAgent:
-    def __init__(self, tools: Tools):
+    def __init__(
+            self,
+            tools: Tools,
+            pipelined: bool = True,
+            image_workers: int = 4,
+            abstract_workers: int = 4,
+            storage_workers: int = 4,
+            batch_size: int = 96,
+            max_batch_bytes: int = 2 * 1024 * 1024
+        ):
         self.tools = tools
 
+        # Pipeline stage worker limits (image descriptions, abstracts, upserts)
+        self.pipelined = pipelined
+        self.image_workers = image_workers
+        self.abstract_workers = abstract_workers
+        self.storage_workers = storage_workers
+
+        # Upsert chunk limits (Pinecone accepts up to 96 text records / 2MB per request)
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+
+
+    #=======================================================================
+    # Processes and stores current memories in Pinecone, returning a
+    # per-index report of upserted record counts and failures
+    #
+    # A memory that cannot be processed (e.g. its abstract fails) is
+    # reported under its record ids like a failed upsert, and the other
+    # memories are still stored. Record ids derive from the memory
+    # content and context window, so retrying a partly stored batch
+    # overwrites records instead of duplicating them.
+    #=======================================================================
+    def process_memories(self, memories: List[Dict[str, Any]], context_window: str) -> Dict[str, Dict[str, Any]]:
+        if not self.pipelined:
+            records = []
+            failures = []
+            for memory in memories:
+                try:
+                    descriptions = [self._describe_image(file_url) for file_url in memory['files']]
+                    records.append(self._create_records(memory, descriptions, context_window))
+                except Exception as e:
+                    failures.append((memory, e))
+            return self._add_failed_memories(self._store_records(records), failures, context_window)
+
+        return self._process_memories_pipelined(memories, context_window)
+
+
+    #=======================================================================
+    # Runs image description, abstract generation and storage as
+    # concurrent stages. Each memory's images are described in parallel,
+    # its abstract is generated once they finish, and records are flushed
+    # to storage in input order as soon as a full chunk is ready.
+    #=======================================================================
+    def _process_memories_pipelined(self, memories: List[Dict[str, Any]], context_window: str) -> Dict[str, Dict[str, Any]]:
+        with ThreadPoolExecutor(max_workers=self.image_workers) as image_executor, \
+                ThreadPoolExecutor(max_workers=self.abstract_workers) as abstract_executor, \
+                ThreadPoolExecutor(max_workers=self.storage_workers) as storage_executor:
+
+            def process(memory: Dict[str, Any], description_futures: List[Future]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+                descriptions = [future.result() for future in description_futures]
+                return self._create_records(memory, descriptions, context_window)
+
+            record_futures = []
+            for memory in memories:
+                description_futures = [image_executor.submit(self._describe_image, file_url) for file_url in memory['files']]
+                record_futures.append(abstract_executor.submit(process, memory, description_futures))
+
+            # Collect records in input order, flushing full chunks to storage
+            jobs = []
+            pending = []
+            failures = []
+            for memory, future in zip(memories, record_futures):
+                try:
+                    pending.append(future.result())
+                except Exception as e:
+                    failures.append((memory, e))
+                    continue
+                if len(pending) >= self.batch_size:
+                    jobs.extend(self._submit_upserts(storage_executor, pending))
+                    pending = []
+            if pending:
+                jobs.extend(self._submit_upserts(storage_executor, pending))
+
+            return self._add_failed_memories(self._collect_report(jobs), failures, context_window)
+
+
+    #=======================================================================
+    # Processes and stores memories without blocking the event loop,
+    # bounding each stage by the same worker limits as the pipeline
+    #=======================================================================
+    async def aprocess_memories(self, memories: List[Dict[str, Any]], context_window: str) -> Dict[str, Dict[str, Any]]:
+        image_semaphore = asyncio.Semaphore(self.image_workers)
+        abstract_semaphore = asyncio.Semaphore(self.abstract_workers)
+        storage_semaphore = asyncio.Semaphore(self.storage_workers)
+
+        async def describe(file_url: str) -> str:
+            async with image_semaphore:
+                return await self._adescribe_image(file_url)
+
+        async def process(memory: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+            descriptions = await asyncio.gather(*[describe(file_url) for file_url in memory['files']])
+            async with abstract_semaphore:
+                abstract = await self.tools.ause_tool("generate_text", prompt=self._abstract_prompt(memory, descriptions, context_window))
+            return self._build_records(memory, abstract, context_window)
+
+        async def upsert(index_name: str, chunk: List[Dict[str, Any]]) -> Optional[Exception]:
+            async with storage_semaphore:
+                try:
+                    await self.tools.ause_tool("upsert_records", index_name=index_name, records=chunk)
+                    return None
+                except Exception as e:
+                    return e
+
+        results = await asyncio.gather(*[process(memory) for memory in memories], return_exceptions=True)
+        records = [result for result in results if not isinstance(result, BaseException)]
+        failures = [(memory, result) for memory, result in zip(memories, results) if isinstance(result, BaseException)]
+
+        upserts = [
+            (index_name, chunk)
+            for index_names, index_records in self._index_records(records)
+            for chunk in self._chunk_records(index_records)
+            for index_name in index_names
+        ]
+        errors = await asyncio.gather(*[upsert(index_name, chunk) for index_name, chunk in upserts])
+
+        report = self._build_report([(index_name, chunk, error) for (index_name, chunk), error in zip(upserts, errors)])
+        return self._add_failed_memories(report, failures, context_window)
+
+
+    #=======================================================================
+    # Describes an image, returning an error note if description fails
+    #=======================================================================
+    def _describe_image(self, file_url: str) -> str:
+        try:
+            return self.tools.use_tool("describe_image", image_url=file_url)
+        except Exception as e:
+            print(f"Warning: Could not describe image {file_url}: {e}")
+            return f"[Could not generate description - {e}]"
+
+
+    #=======================================================================
+    # Describes an image without blocking the event loop
+    #=======================================================================
+    async def _adescribe_image(self, file_url: str) -> str:
+        try:
+            return await self.tools.ause_tool("describe_image", image_url=file_url)
+        except Exception as e:
+            print(f"Warning: Could not describe image {file_url}: {e}")
+            return f"[Could not generate description - {e}]"
+
+
+    #=======================================================================
+    # Generates the abstract for a memory and builds its memo and page records
+    #=======================================================================
+    def _create_records(self, memory: Dict[str, Any], descriptions: List[str], context_window: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        abstract = self.tools.use_tool("generate_text", prompt=self._abstract_prompt(memory, descriptions, context_window))
+        return self._build_records(memory, abstract, context_window)
+
+
+    #=======================================================================
+    # Builds the abstract prompt for a memory and its image descriptions
+    #=======================================================================
+    def _abstract_prompt(self, memory: Dict[str, Any], descriptions: List[str], context_window: str) -> str:
+        # Construct input message
+        input_message = memory['text']
+        input_message += " If there are any images associated with this message, their descriptions are as follows:"
+        if memory['files']:
+            input_message += " Associated images (preserve exact URLs):"
+            for file_url, description in zip(memory['files'], descriptions):
+                input_message += f" Image at URL {file_url}: {description}"
+        else:
+            input_message += " No images associated with this message."
+
+        # Generate abstract using the generate_text tool
+        abstract_prompt = textwrap.dedent(f"""
+            Your job is to write one concise abstract that can be stored as long-term memory.
+
+            MAIN OBJECTIVE:
+            Generate a concise, self-contained and coherent abstract of INPUT_MESSAGE that preserves ALL important information in INPUT_MESSAGE.
+            MEMORY_CONTEXT is provided so you can understand the broader situation such as people, modules, decisions, ongoing tasks and keep wording consistent.
+
+            INPUTS:
+            MEMORY_CONTEXT: {context_window}
+            INPUT_MESSAGE: {input_message}
+
+            YOUR TASK:
+            1. Read INPUT_MESSAGE and extract all specific, memory-relevant information, such as:
+            - plans, goals, decisions, requests, preferences
+            - actions taken, next steps, assignments, and responsibilities
+            - problems, blockers, bugs, questions that need follow-up
+            - specific facts such as names, dates, numbers, locations
+            2. Use MEMORY_CONTEXT to:
+            - resolve or disambiguate the entities, components, tasks, or resources mentioned in INPUT_MESSAGE,
+            - keep terminology (names of agents, modules, datasets, etc.) consistent with prior usage,
+            - include minimal background context if it is required for the abstract to be understandable.
+            You MUST NOT invent or add information that appears only in MEMORY_CONTEXT and is NOT implied or mentioned in INPUT_MESSAGE.
+            3. Your abstract MUST:
+            - summarize all important content from INPUT_MESSAGE,
+            - include the EXACT URLs of all images mentioned in INPUT_MESSAGE (do not modify or shorten URLs),
+            - summarize image contents while preserving their association with specific URLs,
+            - be understandable on its own without seeing INPUT_MESSAGE,
+            - be factual and specific.
+
+            STYLE RULES:
+            - Output exactly ONE concise paragraph. No bullet points.
+            - Do NOT include meta phrases like "The user said..." or "The conversation is about...".
+            - Do NOT give advice, opinions, or suggestions.
+            - Do NOT ask questions.
+            - Do NOT include anything that is not grounded in INPUT_MESSAGE.
+
+            OUTPUT FORMAT:
+            Return ONLY the single paragraph. Do NOT add any headings or labels.
+            """).strip()
+
+        return abstract_prompt
+
+
+    #=======================================================================
+    # Builds the memo (abstract) and page (full content) records of a memory
+    #=======================================================================
+    def _build_records(self, memory: Dict[str, Any], abstract: str, context_window: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        memo_id, page_id = self._record_ids(memory, context_window)
+
+        # Memo record (abstract)
+        memo_record = {
+            "_id": memo_id,
+            "chunk_text": abstract
+        }
+
+        # Page record (full content)
+        page_record = {
+            "_id": page_id,
+            "chunk_text": memory['text'],
+            "files": memory['files']
+        }
+
+        return memo_record, page_record
+
+
+    #=======================================================================
+    # Returns the memo and page record ids of a memory, derived from its
+    # text, files and the context window its abstract was written in, so
+    # that storing it again in the same context overwrites its records
+    # while the same message memorized in another conversation keeps its
+    # own abstract
+    #=======================================================================
+    def _record_ids(self, memory: Dict[str, Any], context_window: str) -> Tuple[str, str]:
+        content = json.dumps([memory['text'], memory['files'], context_window])
+        record_id = hashlib.sha256(content.encode("utf-8")).hexdigest()[:32]
+        return f"memo-{record_id}", f"page-{record_id}"
+
+
+    #=======================================================================
+    # Upserts memo and page records to all indexes in size-bounded chunks
+    # in parallel, collecting failures instead of aborting the batch
+    #=======================================================================
+    def _store_records(self, records: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        with ThreadPoolExecutor(max_workers=self.storage_workers) as executor:
+            return self._collect_report(self._submit_upserts(executor, records))
+
+
+    #=======================================================================
+    # Submits chunked upserts of (memo, page) record pairs to all indexes
+    #=======================================================================
+    def _submit_upserts(self, executor: ThreadPoolExecutor, records: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Tuple[str, List[Dict[str, Any]], Future]]:
+        jobs = []
+        for index_names, index_records in self._index_records(records):
+            for chunk in self._chunk_records(index_records):
+                for index_name in index_names:
+                    future = executor.submit(self.tools.use_tool, "upsert_records", index_name=index_name, records=chunk)
+                    jobs.append((index_name, chunk, future))
+
+        return jobs
+
+
+    #=======================================================================
+    # Splits (memo, page) record pairs into (index names, records) groups
+    #=======================================================================
+    def _index_records(self, records: List[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[Tuple[List[str], List[Dict[str, Any]]]]:
+        memo_records = [memo_record for memo_record, _ in records]
+        page_records = [page_record for _, page_record in records]
+        return [(MEMO_INDEXES, memo_records), (PAGE_INDEXES, page_records)]
+
+
+    #=======================================================================
+    # Waits for submitted upserts and builds the per-index report
+    #=======================================================================
+    def _collect_report(self, jobs: List[Tuple[str, List[Dict[str, Any]], Future]]) -> Dict[str, Dict[str, Any]]:
+        outcomes = []
+        for index_name, records, future in jobs:
+            try:
+                future.result()
+                outcomes.append((index_name, records, None))
+            except Exception as e:
+                outcomes.append((index_name, records, e))
+
+        return self._build_report(outcomes)
+
 
     #=======================================================================
-    # Processes and stores current memories in Pinecone
+    # Builds the per-index report from (index, records, error) outcomes
     #=======================================================================
-    def process_memories(self, memories: List[Dict[str, Any]], context_window: str) -> None:
-        for memory in memories:
+    def _build_report(self, outcomes: List[Tuple[str, List[Dict[str, Any]], Optional[Exception]]]) -> Dict[str, Dict[str, Any]]:
+        report = {
+            index_name: {"upserted": 0, "failed_ids": [], "errors": []}
+            for index_name in MEMO_INDEXES + PAGE_INDEXES
+        }
 
-            # Construct input message
-            input_message = memory['text']
-            input_message += " If there are any images associated with this message, their descriptions are as follows:"
-            if memory['files']:
-                input_message += " Associated images (preserve exact URLs):"
-                for file_url in memory['files']:
-                    try:
-                        description = self.tools.use_tool("describe_image", image_url=file_url)
-                        input_message += f" Image at URL {file_url}: {description}"
-                    except Exception as e:
-                        print(f"Warning: Could not describe image {file_url}: {e}")
-                        input_message += f" Image at URL {file_url}: [Could not generate description - {e}]"
+        for index_name, records, error in outcomes:
+            if error is None:
+                report[index_name]["upserted"] += len(records)
             else:
-                input_message += " No images associated with this message."
-
-            # Generate abstract using the generate_text tool
-            abstract_prompt = textwrap.dedent(f"""
-                Your job is to write one concise abstract that can be stored as long-term memory.
-
-                MAIN OBJECTIVE:
-                Generate a concise, self-contained and coherent abstract of INPUT_MESSAGE that preserves ALL important information in INPUT_MESSAGE.
-                MEMORY_CONTEXT is provided so you can understand the broader situation such as people, modules, decisions, ongoing tasks and keep wording consistent.
-
-                INPUTS:
-                MEMORY_CONTEXT: {context_window}
-                INPUT_MESSAGE: {input_message}
-
-                YOUR TASK:
-                1. Read INPUT_MESSAGE and extract all specific, memory-relevant information, such as:
-                - plans, goals, decisions, requests, preferences
-                - actions taken, next steps, assignments, and responsibilities
-                - problems, blockers, bugs, questions that need follow-up
-                - specific facts such as names, dates, numbers, locations
-                2. Use MEMORY_CONTEXT to:
-                - resolve or disambiguate the entities, components, tasks, or resources mentioned in INPUT_MESSAGE,
-                - keep terminology (names of agents, modules, datasets, etc.) consistent with prior usage,
-                - include minimal background context if it is required for the abstract to be understandable.
-                You MUST NOT invent or add information that appears only in MEMORY_CONTEXT and is NOT implied or mentioned in INPUT_MESSAGE.
-                3. Your abstract MUST:
-                - summarize all important content from INPUT_MESSAGE,
-                - include the EXACT URLs of all images mentioned in INPUT_MESSAGE (do not modify or shorten URLs),
-                - summarize image contents while preserving their association with specific URLs,
-                - be understandable on its own without seeing INPUT_MESSAGE,
-                - be factual and specific.
-
-                STYLE RULES:
-                - Output exactly ONE concise paragraph. No bullet points.
-                - Do NOT include meta phrases like "The user said..." or "The conversation is about...".
-                - Do NOT give advice, opinions, or suggestions.
-                - Do NOT ask questions.
-                - Do NOT include anything that is not grounded in INPUT_MESSAGE.
-
-                OUTPUT FORMAT:
-                Return ONLY the single paragraph. Do NOT add any headings or labels.
-                """).strip()
-
-            abstract = self.tools.use_tool("generate_text", prompt=abstract_prompt)
-
-            # Create and store records
-            record_id = str(uuid.uuid4())
-
-            # Store memo record (abstract)
-            memo_record = {
-                "_id": f"memo-{record_id}",
-                "chunk_text": abstract
-            }
-            self.tools.use_tool("upsert_records", index_name="deep-memory-memo", records=[memo_record])
-            self.tools.use_tool("upsert_records", index_name="deep-memory-memo-sparse", records=[memo_record])
-
-            # Store page record (full content)
-            page_record = {
-                "_id": f"page-{record_id}",
-                "chunk_text": memory['text'],
-                "files": memory['files']
-            }
-            self.tools.use_tool("upsert_records", index_name="deep-memory-page", records=[page_record])
-            self.tools.use_tool("upsert_records", index_name="deep-memory-page-sparse", records=[page_record])
\ No newline at end of file
+                print(f"Warning: Could not upsert {len(records)} records to {index_name}: {error}")
+                report[index_name]["failed_ids"].extend(record["_id"] for record in records)
+                report[index_name]["errors"].append(str(error))
+
+        return report
+
+
+    #=======================================================================
+    # Returns the memories whose memo or page records are among the
+    # failed ids of a report, i.e. those that have to be stored again
+    #=======================================================================
+    def failed_memories(self, memories: List[Dict[str, Any]], context_window: str, report: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        failed_ids = {record_id for result in report.values() for record_id in result["failed_ids"]}
+        return [memory for memory in memories if failed_ids.intersection(self._record_ids(memory, context_window))]
+
+
+    #=======================================================================
+    # Adds memories that could not be processed to the report, as failed
+    # ids of the records they would have produced
+    #=======================================================================
+    def _add_failed_memories(self, report: Dict[str, Dict[str, Any]], failures: List[Tuple[Dict[str, Any], BaseException]], context_window: str) -> Dict[str, Dict[str, Any]]:
+        for memory, error in failures:
+            print(f"Warning: Could not process memory: {error}")
+            memo_id, page_id = self._record_ids(memory, context_window)
+            for index_names, record_id in ((MEMO_INDEXES, memo_id), (PAGE_INDEXES, page_id)):
+                for index_name in index_names:
+                    report[index_name]["failed_ids"].append(record_id)
+                    report[index_name]["errors"].append(str(error))
+
+        return report
+
+
+    #=======================================================================
+    # Splits records into chunks bounded by record count and payload size
+    #=======================================================================
+    def _chunk_records(self, records: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        chunks = []
+        chunk = []
+        chunk_bytes = 0
+
+        for record in records:
+            record_bytes = len(json.dumps(record).encode("utf-8"))
+            if chunk and (len(chunk) >= self.batch_size or chunk_bytes + record_bytes > self.max_batch_bytes):
+                chunks.append(chunk)
+                chunk = []
+                chunk_bytes = 0
+            chunk.append(record)
+            chunk_bytes += record_bytes
+
+        if chunk:
+            chunks.append(chunk)
+
+        return chunks
\ No newline at end of file
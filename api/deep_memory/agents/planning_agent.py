@@ -1,8 +1,10 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import json
 import re
 import textwrap
 from ..tools import Tools
+from ..deadline import Deadline, MIN_ATTEMPT_SECONDS
+from ..metrics import metrics
 
 
 #=======================================================================
@@ -14,15 +16,67 @@ class PlanningAgent:
 
 
     #=======================================================================
-    # Plans a deep memory search
+    # Plans a deep memory search, optionally at a lower reasoning effort
+    # and with at most max_queries queries per retrieval approach. Falls
+    # back to searching the question when the deadline leaves no time to
+    # plan.
     #=======================================================================
-    def plan_search(self, question: str) -> Dict[str, Any]:
+    def plan_search(self, question: str, reasoning_effort: Optional[str] = None, max_queries: Optional[int] = None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        if deadline is not None and not deadline.allows(MIN_ATTEMPT_SECONDS):
+            return self._fallback_plan(question)
+
         # Get relevant memory context for planning
-        memory_context = self.tools.use_tool("memo_hybrid_search", query_text=question, top_k=5)
-        
+        try:
+            with metrics.span("memo_search"):
+                memory_context = self.tools.use_tool("memo_hybrid_search", query_text=question, top_k=5, deadline=deadline)
+        except Exception as e:
+            print(f"Memo search failed, planning without memory: {e}")
+            memory_context = "No relevant memory abstracts found."
+        prompt = self._build_prompt(question, memory_context, max_queries)
+
+        try:
+            with metrics.span("planning"):
+                response = self.tools.use_tool("generate_text", prompt=prompt, reasoning_effort=reasoning_effort, deadline=deadline)
+            return self._parse_plan(response, max_queries)
+        except Exception as e:
+            print(f"Planning failed, using fallback: {e}")
+            return self._fallback_plan(question)
+
+
+    #=======================================================================
+    # Plans a deep memory search without blocking the event loop
+    #=======================================================================
+    async def aplan_search(self, question: str, reasoning_effort: Optional[str] = None, max_queries: Optional[int] = None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        if deadline is not None and not deadline.allows(MIN_ATTEMPT_SECONDS):
+            return self._fallback_plan(question)
+
+        try:
+            with metrics.span("memo_search"):
+                memory_context = await self.tools.ause_tool("memo_hybrid_search", query_text=question, top_k=5, deadline=deadline)
+        except Exception as e:
+            print(f"Memo search failed, planning without memory: {e}")
+            memory_context = "No relevant memory abstracts found."
+        prompt = self._build_prompt(question, memory_context, max_queries)
+
+        try:
+            with metrics.span("planning"):
+                response = await self.tools.ause_tool("generate_text", prompt=prompt, reasoning_effort=reasoning_effort, deadline=deadline)
+            return self._parse_plan(response, max_queries)
+        except Exception as e:
+            print(f"Planning failed, using fallback: {e}")
+            return self._fallback_plan(question)
+
+
+    #=======================================================================
+    # Builds the planning prompt
+    #=======================================================================
+    def _build_prompt(self, question: str, memory_context: str, max_queries: Optional[int]) -> str:
         # Parse image URLs from memory context
         image_urls = self._extract_image_urls(memory_context)
 
+        # Optional cap on the number of queries per retrieval approach
+        query_limit_rule = f"\n            - Use at most {max_queries} queries per retrieval approach." if max_queries else ""
+
         # Planning prompt
         prompt = textwrap.dedent(f"""
             You are the PlanningAgent. Your job is to generate a concrete retrieval plan for how to gather information needed to answer the QUESTION.
@@ -86,7 +140,7 @@ class PlanningAgent:
             - For each image URL, it is critical that you do NOT modify or shorten the URL.
             - You may include multiple tools. Do NOT limit yourself to a single tool if more than one is useful.
             - Do NOT invent tools. Only use "keyword", "vector", "hybrid", "image".
-            - You are only planning retrieval. Do NOT answer the QUESTION here.
+            - You are only planning retrieval. Do NOT answer the QUESTION here.{query_limit_rule}
 
             THINKING STEP
             - Before producing the output, think through the procedure and choices inside <think>...</think>.
@@ -104,39 +158,50 @@ class PlanningAgent:
             After the <think> section, return ONLY the JSON object. Do NOT include any commentary or explanation outside the JSON.
             """).strip()
 
+        return prompt
+
+
+    #=======================================================================
+    # Parses the plan JSON from a planning response
+    #=======================================================================
+    def _parse_plan(self, response: str, max_queries: Optional[int]) -> Dict[str, Any]:
+        # Skip over the think section if it exists
+        think_end_pattern = r'</think>\s*(.*)'
+        think_match = re.search(think_end_pattern, response, re.DOTALL | re.IGNORECASE)
+
+        if think_match:
+            json_candidate = think_match.group(1).strip()
+        else:
+            json_candidate = response.strip()
+
+        # Try to parse as JSON
         try:
-            response = self.tools.use_tool("generate_text", prompt=prompt)
-            
-            # Skip over the think section if it exists
-            think_end_pattern = r'</think>\s*(.*)'
-            think_match = re.search(think_end_pattern, response, re.DOTALL | re.IGNORECASE)
-            
-            if think_match:
-                json_candidate = think_match.group(1).strip()
-            else:
-                json_candidate = response.strip()
-            
-            # Try to parse as JSON
-            try:
-                plan = json.loads(json_candidate)
-            except json.JSONDecodeError:
-                raise ValueError(f"Could not extract valid JSON from response: {json_candidate[:200]}...")
-
-            plan.setdefault("keyword_collection", [])
-            plan.setdefault("vector_queries", [])
-            plan.setdefault("hybrid_queries", [])
-            plan.setdefault("image_queries", [])
-
-            return plan
+            plan = json.loads(json_candidate)
+        except json.JSONDecodeError:
+            raise ValueError(f"Could not extract valid JSON from response: {json_candidate[:200]}...")
 
-        except Exception as e:
-            print(f"Planning failed, using fallback: {e}")
-            return {
-                "keyword_collection": [],
-                "vector_queries": [question],
-                "hybrid_queries": [question],
-                "image_queries": [],
-            }
+        plan.setdefault("keyword_collection", [])
+        plan.setdefault("vector_queries", [])
+        plan.setdefault("hybrid_queries", [])
+        plan.setdefault("image_queries", [])
+
+        if max_queries:
+            for key in ("keyword_collection", "vector_queries", "hybrid_queries", "image_queries"):
+                plan[key] = plan[key][:max_queries]
+
+        return plan
+
+
+    #=======================================================================
+    # Returns the plan used when planning fails
+    #=======================================================================
+    def _fallback_plan(self, question: str) -> Dict[str, Any]:
+        return {
+            "keyword_collection": [],
+            "vector_queries": [question],
+            "hybrid_queries": [question],
+            "image_queries": [],
+        }
 
 
     #=======================================================================
@@ -1,4 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor, Future, wait
+from typing import List, Dict, Any, Callable, Tuple, Optional
+import asyncio
+import hashlib
+import threading
 from ..tools import Tools
+from ..deadline import Deadline
+from ..metrics import metrics
+from ..providers.local_index import tokenize
+from ..query_router import RESEARCH_MODES
 from .planning_agent import PlanningAgent
 
 
@@ -6,66 +15,390 @@ from .planning_agent import PlanningAgent
 # Agent for executing research queries over stored memories
 #=======================================================================
 class ResearchAgent:
-    def __init__(self, tools: Tools):
+    def __init__(self, tools: Tools, max_workers: int = 8, rank_constant: int = 60, speculative: bool = True, duplicate_threshold: float = 0.8, optional_stage_seconds: float = 5.0):
         self.tools = tools
         self.planning_agent = PlanningAgent(tools)
 
+        # Run a hybrid search on the raw query while planning, skipping
+        # planned queries whose term overlap with it reaches duplicate_threshold
+        self.speculative = speculative
+        self.duplicate_threshold = duplicate_threshold
 
+        # Maximum number of planned searches in flight at once (1 runs them sequentially)
+        self.max_workers = max_workers
+
+        # Rank constant for scoring evidence across searches (sum of 1 / (k + rank))
+        self.rank_constant = rank_constant
+
+        # Image queries are skipped when a deadline leaves less than this many seconds
+        self.optional_stage_seconds = optional_stage_seconds
+
+
+    #=======================================================================
+    # Performs deep research for a given query, reporting progress
+    # events (stage, detail) to on_progress if given. Returns the
+    # deduplicated evidence texts, best first.
+    #=======================================================================
+    def research(self, query: str, on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None, mode: str = "deep", deadline: Optional[Deadline] = None) -> str:
+        evidence = self.gather_evidence(query, on_progress=on_progress, mode=mode, deadline=deadline)
+        return "\n".join(item["text"] for item in evidence)
+
+
+    #=======================================================================
+    # Performs deep research without blocking the event loop
+    #=======================================================================
+    async def aresearch(self, query: str, on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None, mode: str = "deep", deadline: Optional[Deadline] = None) -> str:
+        evidence = await self.agather_evidence(query, on_progress=on_progress, mode=mode, deadline=deadline)
+        return "\n".join(item["text"] for item in evidence)
+
+
+    #=======================================================================
+    # Runs the planned searches for a query and returns the evidence
+    # found, deduplicated across searches and ranked globally
+    #
+    # Each evidence item is {"id", "text", "files", "score", "hits",
+    # "queries"}. Pages are deduplicated by id and by content hash, and
+    # scored by the sum of 1 / (k + rank) over the searches that returned
+    # them, so pages found by many searches and ranked highly come first.
+    # In "fast" mode the query itself is run as a single hybrid search
+    # without planning. Otherwise, when speculative, that search runs
+    # while the plan is generated and counts as one of the searches. The
+    # planned dense queries are embedded in one batch before searching
+    # (when the storage backend embeds queries itself).
+    #
+    # With a deadline, planning falls back to the raw query when there is
+    # no time to plan, image queries are skipped when less than
+    # optional_stage_seconds remain, and searches still running at the
+    # deadline are abandoned (reported as a "degraded" progress event), so
+    # the evidence found so far is returned on time.
+    #=======================================================================
+    def gather_evidence(self, query: str, on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None, mode: str = "deep", deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        on_progress = on_progress or (lambda stage, detail: None)
+        settings = self._mode_settings(mode)
+
+        if not settings["plan"]:
+            searches = self._build_searches({"hybrid_queries": [query]}, deadline=deadline)
+            on_progress("searching", {"searches": len(searches)})
+            search_results = self._run_searches(searches, on_progress, deadline)
+            return self._rank_evidence([(query, search_results[0])])
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            # Search the raw query while the plan is generated
+            speculative_future = None
+            if self.speculative:
+                speculative_future = executor.submit(self._page_search("page_hybrid_search", query, deadline))
+
+            # Create and execute research plan
+            on_progress("planning", {})
+            plan = self.planning_agent.plan_search(query, reasoning_effort=settings["reasoning_effort"], max_queries=settings["max_queries"], deadline=deadline)
+
+            searches = self._build_searches(plan, deadline=deadline)
+            if speculative_future is not None:
+                searches = [entry for entry in searches if not (entry[0] == "hybrid" and self._is_near_duplicate(entry[1], query))]
+            searches = self._fit_searches(searches, on_progress, deadline)
+            self.tools.use_tool("embed_queries", query_texts=self._dense_queries(searches), deadline=deadline)
+
+            on_progress("searching", {"searches": len(searches) + (speculative_future is not None)})
+            search_results = self._run_searches(searches, on_progress, deadline)
+            ranked_inputs = [(search_query, results) for (_, search_query, _), results in zip(searches, search_results)]
+
+            if speculative_future is not None:
+                done, _ = wait([speculative_future], timeout=self._timeout(deadline))
+                if done:
+                    speculative_results = speculative_future.result()
+                    on_progress("search_done", {"type": "hybrid", "query": query, "results": len(speculative_results), "speculative": True})
+                    ranked_inputs.insert(0, (query, speculative_results))
+                else:
+                    self._report_abandoned(on_progress, 1)
+        finally:
+            # Don't wait for a speculative search abandoned at the deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return self._rank_evidence(ranked_inputs)
+
+
+    #=======================================================================
+    # Gathers ranked evidence without blocking the event loop
+    # (see gather_evidence)
+    #=======================================================================
+    async def agather_evidence(self, query: str, on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None, mode: str = "deep", deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        on_progress = on_progress or (lambda stage, detail: None)
+        settings = self._mode_settings(mode)
+
+        if not settings["plan"]:
+            searches = self._build_searches({"hybrid_queries": [query]}, self._apage_search, self._aimage_query, deadline)
+            on_progress("searching", {"searches": len(searches)})
+            search_results = await self._arun_searches(searches, on_progress, deadline)
+            return self._rank_evidence([(query, search_results[0])])
+
+        # Search the raw query while the plan is generated
+        speculative_task = None
+        if self.speculative:
+            speculative_task = asyncio.create_task(self._apage_search("page_hybrid_search", query, deadline)())
+
+        try:
+            # Create and execute research plan
+            on_progress("planning", {})
+            plan = await self.planning_agent.aplan_search(query, reasoning_effort=settings["reasoning_effort"], max_queries=settings["max_queries"], deadline=deadline)
+
+            searches = self._build_searches(plan, self._apage_search, self._aimage_query, deadline)
+            if speculative_task is not None:
+                searches = [entry for entry in searches if not (entry[0] == "hybrid" and self._is_near_duplicate(entry[1], query))]
+            searches = self._fit_searches(searches, on_progress, deadline)
+            await self.tools.ause_tool("embed_queries", query_texts=self._dense_queries(searches), deadline=deadline)
+
+            on_progress("searching", {"searches": len(searches) + (speculative_task is not None)})
+            search_results = await self._arun_searches(searches, on_progress, deadline)
+            ranked_inputs = [(search_query, results) for (_, search_query, _), results in zip(searches, search_results)]
+
+            if speculative_task is not None:
+                done, _ = await asyncio.wait({speculative_task}, timeout=self._timeout(deadline))
+                if done:
+                    speculative_results = speculative_task.result()
+                    on_progress("search_done", {"type": "hybrid", "query": query, "results": len(speculative_results), "speculative": True})
+                    ranked_inputs.insert(0, (query, speculative_results))
+                else:
+                    self._report_abandoned(on_progress, 1)
+        finally:
+            if speculative_task is not None and not speculative_task.done():
+                speculative_task.cancel()
+
+        return self._rank_evidence(ranked_inputs)
+
+
+    #=======================================================================
+    # Returns the settings of a research mode
+    #=======================================================================
+    def _mode_settings(self, mode: str) -> Dict[str, Any]:
+        if mode not in RESEARCH_MODES:
+            raise ValueError(f"Unknown research mode '{mode}'. Available modes: {list(RESEARCH_MODES)}")
+        return RESEARCH_MODES[mode]
+
+
+    #=======================================================================
+    # Drops the planned searches the deadline leaves no time for: all of
+    # them once it has passed, image queries once less than
+    # optional_stage_seconds remain
+    #=======================================================================
+    def _fit_searches(self, searches: List[Tuple[str, str, Callable]], on_progress: Callable[[str, Dict[str, Any]], None], deadline: Optional[Deadline]) -> List[Tuple[str, str, Callable]]:
+        if deadline is None:
+            return searches
+
+        if deadline.expired():
+            kept = []
+        elif not deadline.allows(self.optional_stage_seconds):
+            kept = [entry for entry in searches if entry[0] != "image"]
+        else:
+            kept = searches
+
+        if len(kept) < len(searches):
+            metrics.increment("deep_memory_stage_skipped_total", amount=len(searches) - len(kept), stage="search")
+            on_progress("degraded", {"stage": "searching", "skipped": len(searches) - len(kept)})
+        return kept
+
+
+    #=======================================================================
+    # Returns the distinct queries of the searches using a dense index,
+    # embedded together before searching (when the backend embeds them)
+    #=======================================================================
+    def _dense_queries(self, searches: List[Tuple[str, str, Callable]]) -> List[str]:
+        return list(dict.fromkeys(search_query for search_type, search_query, _ in searches if search_type in ("vector", "hybrid")))
+
+
+    #=======================================================================
+    # Reports searches abandoned at the deadline
+    #=======================================================================
+    def _report_abandoned(self, on_progress: Callable[[str, Dict[str, Any]], None], count: int) -> None:
+        metrics.increment("deep_memory_stage_skipped_total", amount=count, stage="search")
+        on_progress("degraded", {"stage": "searching", "abandoned": count})
+
+
+    #=======================================================================
+    # Returns the seconds left before a deadline (None if unbounded)
+    #=======================================================================
+    def _timeout(self, deadline: Optional[Deadline]) -> Optional[float]:
+        return deadline.remaining() if deadline is not None else None
+
+
+    #=======================================================================
+    # Returns whether two queries share nearly all of their terms
     #=======================================================================
-    # Performs deep research for a given query
+    def _is_near_duplicate(self, first: str, second: str) -> bool:
+        first_terms, second_terms = set(tokenize(first)), set(tokenize(second))
+        if not first_terms or not second_terms:
+            return first_terms == second_terms
+        return len(first_terms & second_terms) / len(first_terms | second_terms) >= self.duplicate_threshold
+
+
     #=======================================================================
-    def research(self, query: str) -> str:
-        # Create and execute research plan
-        plan = self.planning_agent.plan_search(query)
-        search_results = {"keyword": [], "vector": [], "hybrid": [], "image": []}
-        
-        # Execute keyword searches
+    # Deduplicates evidence from every search and ranks it globally
+    #=======================================================================
+    def _rank_evidence(self, search_results: List[Tuple[str, List[Dict[str, Any]]]]) -> List[Dict[str, Any]]:
+        evidence: List[Dict[str, Any]] = []
+        by_key: Dict[str, Dict[str, Any]] = {}
+
+        for search_query, results in search_results:
+            for rank, result in enumerate(results, 1):
+                content_key = "sha256:" + hashlib.sha256(result["text"].strip().encode("utf-8")).hexdigest()
+                keys = [content_key] if result.get("id") is None else ["id:" + result["id"], content_key]
+
+                item = next((by_key[key] for key in keys if key in by_key), None)
+                if item is None:
+                    item = {
+                        "id": result.get("id"),
+                        "text": result["text"],
+                        "files": result.get("files", []),
+                        "score": 0.0,
+                        "hits": 0,
+                        "queries": []
+                    }
+                    evidence.append(item)
+
+                for key in keys:
+                    by_key.setdefault(key, item)
+
+                item["score"] += 1 / (self.rank_constant + rank)
+                item["hits"] += 1
+                if search_query not in item["queries"]:
+                    item["queries"].append(search_query)
+
+        # Stable sort keeps plan order between equally ranked items
+        return sorted(evidence, key=lambda item: (item["score"], item["hits"]), reverse=True)
+
+
+    #=======================================================================
+    # Builds the ordered list of (search type, query, search function)
+    # entries for every search in the plan, using the given page search
+    # and image query factories (the sync ones by default)
+    #=======================================================================
+    def _build_searches(self, plan: Dict[str, Any], page_search: Optional[Callable] = None, image_query: Optional[Callable] = None, deadline: Optional[Deadline] = None) -> List[Tuple[str, str, Callable]]:
+        page_search = page_search or self._page_search
+        image_query = image_query or self._image_query
+        searches = []
+
         for keyword_query in plan.get("keyword_collection", []):
-            results = self.tools.use_tool("page_keyword_search", query_text=keyword_query, top_k=5)
-            text_results = [item["text"] for item in results]
-            search_results["keyword"].append({
-                "query": keyword_query,
-                "results": text_results
-            })
-
-        # Execute vector searches
+            searches.append(("keyword", keyword_query, page_search("page_keyword_search", keyword_query, deadline)))
+
         for vector_query in plan.get("vector_queries", []):
-            results = self.tools.use_tool("page_vector_search", query_text=vector_query, top_k=5)
-            text_results = [item["text"] for item in results]
-            search_results["vector"].append({
-                "query": vector_query,
-                "results": text_results
-            })
-
-        # Execute hybrid searches
+            searches.append(("vector", vector_query, page_search("page_vector_search", vector_query, deadline)))
+
         for hybrid_query in plan.get("hybrid_queries", []):
-            results = self.tools.use_tool("page_hybrid_search", query_text=hybrid_query, top_k=5)
-            text_results = [item["text"] for item in results]
-            search_results["hybrid"].append({
-                "query": hybrid_query,
-                "results": text_results
-            })
-
-        # Execute image queries
+            searches.append(("hybrid", hybrid_query, page_search("page_hybrid_search", hybrid_query, deadline)))
+
         for image_query_obj in plan.get("image_queries", []):
-            image_url = image_query_obj["url"]
-            question = image_query_obj["query"]
-            
+            searches.append(("image", image_query_obj["query"], image_query(image_query_obj["url"], image_query_obj["query"], deadline)))
+
+        return searches
+
+
+    #=======================================================================
+    # Runs searches concurrently and returns their results in input order
+    # (empty for searches abandoned at the deadline)
+    #=======================================================================
+    def _run_searches(self, searches: List[Tuple[str, str, Callable[[], List[Dict[str, Any]]]]], on_progress: Callable[[str, Dict[str, Any]], None], deadline: Optional[Deadline] = None) -> List[List[Dict[str, Any]]]:
+        abandoned = threading.Event()
+
+        def run(search_type: str, search_query: str, search: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+            results = search()
+            if not abandoned.is_set():
+                on_progress("search_done", {"type": search_type, "query": search_query, "results": len(results)})
+            return results
+
+        if deadline is None and (self.max_workers <= 1 or len(searches) <= 1):
+            return [run(*entry) for entry in searches]
+        if not searches:
+            return []
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(searches))))
+        try:
+            futures: List[Future] = [executor.submit(run, *entry) for entry in searches]
+            done, not_done = wait(futures, timeout=self._timeout(deadline))
+            if not_done:
+                abandoned.set()
+                self._report_abandoned(on_progress, len(not_done))
+            return [future.result() if future in done else [] for future in futures]
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+    #=======================================================================
+    # Runs async searches concurrently (at most max_workers at a time)
+    # and returns their results in input order
+    #=======================================================================
+    async def _arun_searches(self, searches: List[Tuple[str, str, Callable]], on_progress: Callable[[str, Dict[str, Any]], None], deadline: Optional[Deadline] = None) -> List[List[Dict[str, Any]]]:
+        semaphore = asyncio.Semaphore(max(self.max_workers, 1))
+
+        async def run(search_type: str, search_query: str, search: Callable) -> List[Dict[str, Any]]:
+            async with semaphore:
+                results = await search()
+            on_progress("search_done", {"type": search_type, "query": search_query, "results": len(results)})
+            return results
+
+        if not searches:
+            return []
+
+        tasks = [asyncio.create_task(run(*entry)) for entry in searches]
+        _, pending = await asyncio.wait(tasks, timeout=self._timeout(deadline))
+        if pending:
+            for task in pending:
+                task.cancel()
+            self._report_abandoned(on_progress, len(pending))
+        return [task.result() if task not in pending else [] for task in tasks]
+
+
+    #=======================================================================
+    # Creates a page search returning {"id", "text", "files"} results
+    # (empty on failure)
+    #=======================================================================
+    def _page_search(self, tool_name: str, query_text: str, deadline: Optional[Deadline] = None) -> Callable[[], List[Dict[str, Any]]]:
+        def search() -> List[Dict[str, Any]]:
+            try:
+                return self.tools.use_tool(tool_name, query_text=query_text, top_k=5, deadline=deadline)
+            except Exception as e:
+                print(f"Search {tool_name} failed for query '{query_text}': {e}")
+                return []
+
+        return search
+
+
+    #=======================================================================
+    # Creates an image query returning the answer (or error message)
+    #=======================================================================
+    def _image_query(self, image_url: str, question: str, deadline: Optional[Deadline] = None) -> Callable[[], List[Dict[str, Any]]]:
+        def search() -> List[Dict[str, Any]]:
+            try:
+                answer = self.tools.use_tool("query_image", image_url=image_url, question=question, deadline=deadline)
+                return [{"id": None, "text": answer, "files": [image_url]}]
+            except Exception as e:
+                return [{"id": None, "text": f"Could not query image - {e}", "files": [image_url]}]
+
+        return search
+
+
+    #=======================================================================
+    # Creates an async page search (see _page_search)
+    #=======================================================================
+    def _apage_search(self, tool_name: str, query_text: str, deadline: Optional[Deadline] = None) -> Callable:
+        async def search() -> List[Dict[str, Any]]:
+            try:
+                return await self.tools.ause_tool(tool_name, query_text=query_text, top_k=5, deadline=deadline)
+            except Exception as e:
+                print(f"Search {tool_name} failed for query '{query_text}': {e}")
+                return []
+
+        return search
+
+
+    #=======================================================================
+    # Creates an async image query (see _image_query)
+    #=======================================================================
+    def _aimage_query(self, image_url: str, question: str, deadline: Optional[Deadline] = None) -> Callable:
+        async def search() -> List[Dict[str, Any]]:
             try:
-                answer = self.tools.use_tool("query_image", image_url=image_url, question=question)
-                results = [answer]
+                answer = await self.tools.ause_tool("query_image", image_url=image_url, question=question, deadline=deadline)
+                return [{"id": None, "text": answer, "files": [image_url]}]
             except Exception as e:
-                results = [f"Could not query image - {e}"]
-            
-            search_results["image"].append({
-                "query": f"{question}",
-                "results": results
-            })
-
-        # Return compiled research
-        answer = []
-        for results in search_results.values():
-            for result in results:
-                answer.extend(result["results"])
-        
-        return "\n".join(answer)
\ No newline at end of file
+                return [{"id": None, "text": f"Could not query image - {e}", "files": [image_url]}]
+
+        return search
\ No newline at end of file
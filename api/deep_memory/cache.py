@@ -0,0 +1,246 @@
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+#=======================================================================
+# Builds a stable cache key from its parts
+#=======================================================================
+def make_key(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+#=======================================================================
+# Base class tracking hit/miss counters for cache tiers
+#=======================================================================
+class _CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+
+    #=======================================================================
+    # Returns hit/miss/eviction counters and hit rate
+    #=======================================================================
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+#=======================================================================
+# In-memory LRU cache with per-entry TTL
+#=======================================================================
+class MemoryCache(_CacheStats):
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = 3600):
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+
+            self._record(entry is not None)
+            if entry is None:
+                return None
+
+            self._entries.move_to_end(key)
+            return entry[0]
+
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["size"] = len(self._entries)
+        return stats
+
+
+#=======================================================================
+# Redis-backed cache storing JSON-encoded values with a TTL
+#=======================================================================
+class RedisCache(_CacheStats):
+    def __init__(self, client: Any, prefix: str = "deep-memory:cache:", ttl: Optional[int] = 86400):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            stored = self.client.get(self.prefix + key)
+        except Exception as e:
+            print(f"Warning: Redis cache read failed: {e}")
+            stored = None
+
+        self._record(stored is not None)
+        return json.loads(stored) if stored is not None else None
+
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        try:
+            self.client.set(self.prefix + key, json.dumps(value), ex=int(ttl) if ttl is not None else None)
+        except Exception as e:
+            print(f"Warning: Redis cache write failed: {e}")
+
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            print(f"Warning: Redis cache delete failed: {e}")
+
+
+#=======================================================================
+# On-disk cache storing one JSON file per entry, evicting the least
+# recently written entries once max_entries is exceeded
+#=======================================================================
+class DiskCache(_CacheStats):
+    def __init__(self, directory: str, max_entries: int = 10000, ttl: Optional[float] = 86400):
+        super().__init__()
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            entry = None
+
+        if entry is not None and entry["expires_at"] is not None and entry["expires_at"] < time.time():
+            self.delete(key)
+            self.evictions += 1
+            entry = None
+
+        self._record(entry is not None)
+        return entry["value"] if entry is not None else None
+
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = ttl if ttl is not None else self.ttl
+        entry = {"value": value, "expires_at": time.time() + ttl if ttl is not None else None}
+
+        # Write atomically so concurrent readers never see partial files
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            self._evict()
+
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+
+    def _evict(self) -> None:
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")]
+        if len(entries) <= self.max_entries:
+            return
+
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+                self.evictions += 1
+            except OSError:
+                pass
+
+
+#=======================================================================
+# Multi-tier cache checking tiers in order (fastest first) and
+# backfilling faster tiers on a hit in a slower one
+#=======================================================================
+class TieredCache(_CacheStats):
+    def __init__(self, tiers: List[Any]):
+        super().__init__()
+        self.tiers = tiers
+
+
+    def get(self, key: str) -> Optional[Any]:
+        for i, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster_tier in self.tiers[:i]:
+                    faster_tier.set(key, value)
+                self._record(True)
+                return value
+
+        self._record(False)
+        return None
+
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        for tier in self.tiers:
+            tier.set(key, value, ttl)
+
+
+    def delete(self, key: str) -> None:
+        for tier in self.tiers:
+            tier.delete(key)
+
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["tiers"] = [tier.stats() for tier in self.tiers]
+        return stats
\ No newline at end of file
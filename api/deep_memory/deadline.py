@@ -0,0 +1,115 @@
+from typing import Any, Optional
+import time
+from tenacity.stop import stop_base
+from tenacity.wait import wait_base
+
+
+# Least time worth starting a remote call (or retry) with
+MIN_ATTEMPT_SECONDS = 1.0
+
+
+#=======================================================================
+# Raised when a stage cannot start before its deadline
+#=======================================================================
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+#=======================================================================
+# Point in time by which a request must finish
+#
+# Created once per request and passed down through DeepMemory, the
+# agents, Tools and the providers. Retries stop once too little time is
+# left for another attempt, remote calls are given the remaining time as
+# their timeout, and optional stages are skipped or cut short. A
+# deadline of None seconds never expires.
+#=======================================================================
+class Deadline:
+    def __init__(self, seconds: Optional[float] = None):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+
+    #=======================================================================
+    # Returns the seconds left (None if unbounded)
+    #=======================================================================
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+    #=======================================================================
+    # Returns whether the deadline has passed
+    #=======================================================================
+    def expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+
+    #=======================================================================
+    # Returns whether at least the given seconds are left
+    #=======================================================================
+    def allows(self, seconds: float) -> bool:
+        remaining = self.remaining()
+        return remaining is None or remaining >= seconds
+
+
+    #=======================================================================
+    # Raises DeadlineExceeded if too little time is left to start a stage
+    #=======================================================================
+    def check(self, stage: str, seconds: float = 0.0) -> None:
+        if self.expired() or not self.allows(seconds):
+            raise DeadlineExceeded(f"Deadline exceeded before {stage}")
+
+
+    #=======================================================================
+    # Returns a deadline expiring the given seconds earlier, reserving
+    # time for later stages
+    #=======================================================================
+    def shortened(self, seconds: float) -> "Deadline":
+        deadline = Deadline()
+        if self.expires_at is not None:
+            deadline.expires_at = self.expires_at - seconds
+        return deadline
+
+
+#=======================================================================
+# Returns the deadline among a retried call's arguments, if any
+#=======================================================================
+def _find_deadline(retry_state: Any) -> Optional[Deadline]:
+    for value in (*retry_state.args, *retry_state.kwargs.values()):
+        if isinstance(value, Deadline):
+            return value
+    return None
+
+
+#=======================================================================
+# Tenacity stop condition ending retries when the call's deadline
+# leaves less than min_attempt seconds for another attempt
+#=======================================================================
+class stop_at_deadline(stop_base):
+    def __init__(self, min_attempt: float = MIN_ATTEMPT_SECONDS):
+        self.min_attempt = min_attempt
+
+
+    def __call__(self, retry_state: Any) -> bool:
+        deadline = _find_deadline(retry_state)
+        return deadline is not None and not deadline.allows(self.min_attempt)
+
+
+#=======================================================================
+# Tenacity wait capped so the next attempt still starts with at least
+# min_attempt seconds before the call's deadline
+#=======================================================================
+class wait_within_deadline(wait_base):
+    def __init__(self, wait: wait_base, min_attempt: float = MIN_ATTEMPT_SECONDS):
+        self.wait = wait
+        self.min_attempt = min_attempt
+
+
+    def __call__(self, retry_state: Any) -> float:
+        seconds = self.wait(retry_state)
+        deadline = _find_deadline(retry_state)
+        remaining = deadline.remaining() if deadline is not None else None
+        if remaining is not None:
+            seconds = min(seconds, max(0.0, remaining - self.min_attempt))
+        return seconds
@@ -1,7 +1,24 @@
-from typing import List, Dict, Any, Optional
-from .providers import OpenAIProvider, PineconeProvider
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from .providers import OpenAIProvider, AsyncOpenAIProvider, PineconeProvider, StorageBackend
 from .agents import ResearchAgent, MemoryAgent, IntegrateAgent
 from .tools import Tools
+from .hot_tier import HotTier
+from .evidence_packer import EvidencePacker
+from .query_router import QueryRouter, RESEARCH_MODES
+from .deadline import Deadline, MIN_ATTEMPT_SECONDS
+from .metrics import metrics
+from .resilience import Hedge
+import hashlib
+
+
+#=======================================================================
+# Returns the index namespace of a Pinecone API key
+#
+# Memories follow the key: rotating it (even within the same Pinecone
+# project) starts an empty namespace and leaves the old one orphaned.
+#=======================================================================
+def key_namespace(pinecone_api_key: str) -> str:
+    return "deep-memory-" + hashlib.sha256(pinecone_api_key.encode("utf-8")).hexdigest()[:16]
 
 
 #=======================================================================
@@ -11,25 +28,67 @@ class DeepMemory:
     def __init__(
             self,
             pinecone_api_key: str,
-            openai_api_key: str
+            openai_api_key: str,
+            max_search_workers: int = 8,
+            image_cache: Optional[Any] = None,
+            generation_cache: Optional[Any] = None,
+            storage_backend: Optional[StorageBackend] = None,
+            hot_tier_size: int = 200,
+            hot_tier_max_age: float = 3600,
+            hot_tier_redis: Optional[Any] = None,
+            namespace: Optional[str] = None,
+            fusion: str = "rrf",
+            rerank_policy: str = "ambiguous",
+            evidence_token_budget: int = 8000,
+            openai_provider: Optional[OpenAIProvider] = None,
+            async_openai_provider: Optional[AsyncOpenAIProvider] = None,
+            integration_reserve: float = 15.0,
+            search_hedge: Optional[Hedge] = None,
+            embedding: str = "integrated",
+            embedding_cache: Optional[Any] = None,
+            result_cache: Optional[Any] = None
         ):
 
         # API keys and configuration
         self.pinecone_api_key = pinecone_api_key
         self.openai_api_key = openai_api_key
 
+        # Namespace holding this user's records in every index (by default
+        # derived from the Pinecone API key, so instances never share one
+        # unless they share a key)
+        self.namespace = namespace or key_namespace(pinecone_api_key)
+
         # Session memory storage
         self.memories: List[Dict[str, Any]] = []
-        self.openai_provider = OpenAIProvider(self.openai_api_key)
-        self.pinecone_provider = PineconeProvider(self.pinecone_api_key)
+        self.openai_provider = openai_provider or OpenAIProvider(self.openai_api_key, generation_cache=generation_cache)
+        self.async_openai_provider = async_openai_provider or AsyncOpenAIProvider(self.openai_api_key, generation_cache=generation_cache)
+        self.pinecone_provider = storage_backend or PineconeProvider(
+            self.pinecone_api_key,
+            fusion=fusion,
+            rerank_policy=rerank_policy,
+            search_hedge=search_hedge,
+            embedding=embedding,
+            embedding_cache=embedding_cache,
+            result_cache=result_cache
+        )
 
         # Initialize tools
-        self.tools = Tools(self.pinecone_provider, self.openai_provider)
+        # Hot tier of recent writes (shared through Redis when given, so that
+        # writes made by a memorization worker process are seen here too)
+        hot_tier = HotTier(max_records=hot_tier_size, max_age=hot_tier_max_age, redis_client=hot_tier_redis, key_prefix=f"deep-memory:hot:{self.namespace}") if hot_tier_size > 0 else None
+        self.tools = Tools(self.pinecone_provider, self.openai_provider, image_cache=image_cache, hot_tier=hot_tier, namespace=self.namespace, async_openai_provider=self.async_openai_provider)
 
         # Initialize agents
-        self.research_agent = ResearchAgent(self.tools)
+        self.research_agent = ResearchAgent(self.tools, max_workers=max_search_workers)
         self.memory_agent = MemoryAgent(self.tools)
-        self.integrate_agent = IntegrateAgent(self.tools)
+        self.integrate_agent = IntegrateAgent(self.tools, packer=EvidencePacker(max_tokens=evidence_token_budget))
+
+        # Picks a research tier when none is requested
+        self.query_router = QueryRouter()
+
+        # Seconds of a research deadline kept back from searching for
+        # integration (at most half of the time left)
+        self.integration_reserve = integration_reserve
 
 
     #=======================================================================
@@ -40,28 +99,150 @@ class DeepMemory:
 
 
     #=======================================================================
-    # Processes and stores current memories in Pinecone
+    # Removes and returns the pending session memories
     #=======================================================================
-    def process_memories(self, context_window: str):
-        self.memory_agent.process_memories(self.memories, context_window)
-        self.memories = []
+    def take_memories(self) -> List[Dict[str, Any]]:
+        memories, self.memories = self.memories, []
+        return memories
+
+
+    #=======================================================================
+    # Processes and stores memories in Pinecone (the pending session
+    # memories by default), returning the per-index upsert report
+    #=======================================================================
+    def process_memories(self, context_window: str, memories: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        if memories is None:
+            memories = self.take_memories()
+        return self.memory_agent.process_memories(memories, context_window)
 
 
     #=======================================================================
-    # Clears all memories from Pinecone indexes and local storage
+    # Processes and stores memories without blocking the event loop
+    #=======================================================================
+    async def aprocess_memories(self, context_window: str, memories: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        if memories is None:
+            memories = self.take_memories()
+        return await self.memory_agent.aprocess_memories(memories, context_window)
+
+
+    #=======================================================================
+    # Clears this user's memories from Pinecone indexes and local storage
+    # (other users' namespaces are left untouched)
     #=======================================================================
     def clear_memories(self):
-        self.pinecone_provider.clear_all_indexes()
+        self.pinecone_provider.clear_namespace(self.namespace)
+        if self.tools.hot_tier is not None:
+            self.tools.hot_tier.clear()
         self.memories = []
 
 
     #=======================================================================
-    # Researches a query and returns a factual summary
+    # Researches a query and returns a factual summary, reporting
+    # progress events (stage, detail) to on_progress if given
+    #
+    # mode selects the research tier ("fast", "standard" or "deep"); by
+    # default the query router picks one. "fast" returns the packed
+    # evidence of a single hybrid search without integrating it.
+    #
+    # With a deadline, searching stops early enough to leave time for
+    # integration, and the packed evidence is returned instead of a
+    # summary when there is no time left to integrate it.
     #=======================================================================
-    def research(self, query: str) -> Dict[str, Any]:
-        evidence_context = self.research_agent.research(query)
-        
+    def research(self, query: str, on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None, mode: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        mode, settings = self._route(query, mode, on_progress)
+        search_deadline = self._search_deadline(deadline, settings)
+        evidence = self.research_agent.gather_evidence(query, on_progress=on_progress, mode=mode, deadline=search_deadline)
+
+        # Pack the ranked evidence into the integration token budget
+        packing = self._pack_evidence(query, evidence, on_progress if settings["integrate"] else None)
+        if not settings["integrate"] or not self._can_integrate(deadline, on_progress):
+            return packing["context"]
+
         # Integrate the evidence into a factual summary
-        integrated_summary = self.integrate_agent.integrate_evidence(query, evidence_context)
-        
-        return integrated_summary
\ No newline at end of file
+        integrated_summary = self.integrate_agent.integrate_evidence(query, packing["context"], reasoning_effort=settings["reasoning_effort"], deadline=deadline, packed=True)
+
+        return integrated_summary or self._unintegrated(packing, deadline)
+
+
+    #=======================================================================
+    # Researches a query without blocking the event loop (see research)
+    #=======================================================================
+    async def aresearch(self, query: str, on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None, mode: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        mode, settings = self._route(query, mode, on_progress)
+        search_deadline = self._search_deadline(deadline, settings)
+        evidence = await self.research_agent.agather_evidence(query, on_progress=on_progress, mode=mode, deadline=search_deadline)
+
+        packing = self._pack_evidence(query, evidence, on_progress if settings["integrate"] else None)
+        if not settings["integrate"] or not self._can_integrate(deadline, on_progress):
+            return packing["context"]
+
+        integrated_summary = await self.integrate_agent.aintegrate_evidence(query, packing["context"], reasoning_effort=settings["reasoning_effort"], deadline=deadline, packed=True)
+        return integrated_summary or self._unintegrated(packing, deadline)
+
+
+    #=======================================================================
+    # Returns the deadline for searching, which reserves part of the
+    # research deadline for integration when the tier integrates
+    #=======================================================================
+    def _search_deadline(self, deadline: Optional[Deadline], settings: Dict[str, Any]) -> Optional[Deadline]:
+        if deadline is None or not settings["integrate"]:
+            return deadline
+
+        remaining = deadline.remaining()
+        if remaining is None:
+            return deadline
+        return deadline.shortened(min(self.integration_reserve, remaining / 2))
+
+
+    #=======================================================================
+    # Returns whether the deadline leaves time to integrate, reporting a
+    # "degraded" progress event if not
+    #=======================================================================
+    def _can_integrate(self, deadline: Optional[Deadline], on_progress: Optional[Callable[[str, Dict[str, Any]], None]]) -> bool:
+        if deadline is None or deadline.allows(MIN_ATTEMPT_SECONDS):
+            return True
+
+        metrics.increment("deep_memory_stage_skipped_total", stage="integration")
+        if on_progress:
+            on_progress("degraded", {"stage": "integration"})
+        return False
+
+
+    #=======================================================================
+    # Returns the result of a failed integration: the packed evidence if
+    # it failed for lack of time, otherwise an empty summary
+    #=======================================================================
+    def _unintegrated(self, packing: Dict[str, Any], deadline: Optional[Deadline]) -> str:
+        if deadline is not None and not deadline.allows(MIN_ATTEMPT_SECONDS):
+            return packing["context"]
+        return ""
+
+
+    #=======================================================================
+    # Resolves the research mode (routing the query if none is given)
+    # and returns it with its settings
+    #=======================================================================
+    def _route(self, query: str, mode: Optional[str], on_progress: Optional[Callable[[str, Dict[str, Any]], None]]) -> Tuple[str, Dict[str, Any]]:
+        mode = mode or self.query_router.route(query)
+        if mode not in RESEARCH_MODES:
+            raise ValueError(f"Unknown research mode '{mode}'. Available modes: {list(RESEARCH_MODES)}")
+
+        if on_progress:
+            on_progress("routed", {"mode": mode})
+        return mode, RESEARCH_MODES[mode]
+
+
+    #=======================================================================
+    # Packs ranked evidence into the integration token budget, reporting
+    # the packing to on_progress if given
+    #=======================================================================
+    def _pack_evidence(self, query: str, evidence: List[Dict[str, Any]], on_progress: Optional[Callable[[str, Dict[str, Any]], None]]) -> Dict[str, Any]:
+        packing = self.integrate_agent.pack_evidence(query, evidence)
+        if on_progress:
+            on_progress("integrating", {
+                "tokens": packing["tokens"],
+                "included": len(packing["included"]),
+                "trimmed": len(packing["trimmed"]),
+                "dropped": len(packing["dropped"])
+            })
+        return packing
\ No newline at end of file
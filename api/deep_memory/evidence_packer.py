@@ -0,0 +1,155 @@
+from typing import List, Dict, Any, Tuple, Union
+import math
+import re
+from .providers.local_index import tokenize
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+#=======================================================================
+# Counts tokens locally
+#
+# Uses tiktoken's o200k_base encoding (used by the gpt-4o and gpt-5
+# families) when it is installed, and otherwise estimates about four
+# characters per token.
+#=======================================================================
+class TokenCounter:
+    def __init__(self, encoding: str = "o200k_base"):
+        self._encoding = tiktoken.get_encoding(encoding) if tiktoken is not None else None
+
+
+    def __call__(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / 4)
+
+
+#=======================================================================
+# Packs ranked evidence into a token budget for the integration prompt
+#
+# Evidence is taken in rank order. Each item is trimmed to the passages
+# that share the most terms with the query (at most max_item_tokens),
+# and items are added until max_tokens is reached. The last item is
+# trimmed to fit if at least min_item_tokens remain; everything after
+# it is dropped.
+#=======================================================================
+class EvidencePacker:
+    def __init__(self, max_tokens: int = 8000, max_item_tokens: int = 1000, min_item_tokens: int = 64):
+        self.max_tokens = max_tokens
+        self.max_item_tokens = max_item_tokens
+        self.min_item_tokens = min_item_tokens
+        self.count_tokens = TokenCounter()
+
+
+    #=======================================================================
+    # Packs evidence (ranked {"id", "text", ...} items or a plain string)
+    # for a query. A plain string is one item that may fill the budget.
+    #
+    # Returns {"context", "tokens", "included", "trimmed", "dropped"},
+    # where included/trimmed list item ids (or ranks for items without
+    # an id) and dropped lists {"id", "tokens", "reason"} entries.
+    #=======================================================================
+    def pack(self, query: str, evidence: Union[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+        max_item_tokens = self.max_item_tokens
+        if isinstance(evidence, str):
+            evidence = [{"id": None, "text": evidence}] if evidence.strip() else []
+            max_item_tokens = self.max_tokens
+
+        query_terms = set(tokenize(query))
+        blocks = []
+        included, trimmed, dropped = [], [], []
+        used = 0
+
+        for rank, item in enumerate(evidence, 1):
+            item_id = item.get("id") or rank
+            header = f"[{item['id']}] " if item.get("id") else ""
+            separator = 1 if blocks else 0
+            remaining = self.max_tokens - used - separator - self.count_tokens(header)
+
+            text = item["text"]
+            tokens = self.count_tokens(text)
+            if remaining < min(tokens, self.min_item_tokens):
+                dropped.append({"id": item_id, "tokens": tokens, "reason": "budget"})
+                continue
+
+            limit = min(max_item_tokens, remaining)
+            if tokens > limit:
+                text = self._trim(text, query_terms, limit)
+                if not text:
+                    dropped.append({"id": item_id, "tokens": tokens, "reason": "budget"})
+                    continue
+                trimmed.append(item_id)
+
+            block = header + text
+            block_tokens = self.count_tokens(block)
+            if used + separator + block_tokens > self.max_tokens:
+                dropped.append({"id": item_id, "tokens": tokens, "reason": "budget"})
+                continue
+
+            blocks.append(block)
+            included.append(item_id)
+            used += separator + block_tokens
+
+        return {
+            "context": "\n\n".join(blocks),
+            "tokens": used,
+            "included": included,
+            "trimmed": trimmed,
+            "dropped": dropped
+        }
+
+
+    #=======================================================================
+    # Trims text to the passages most relevant to the query that fit in
+    # the token limit, kept in their original order
+    #=======================================================================
+    def _trim(self, text: str, query_terms: set, limit: int) -> str:
+        passages = [p for p in re.split(r"(?<=[.!?])\s+|\n+", text) if p.strip()]
+        scored: List[Tuple[int, int, str]] = [
+            (len(query_terms & set(tokenize(passage))), position, passage)
+            for position, passage in enumerate(passages)
+        ]
+
+        # Most relevant passages first, earlier passages breaking ties
+        selected = []
+        used = 0
+        for _, position, passage in sorted(scored, key=lambda entry: (-entry[0], entry[1])):
+            tokens = self.count_tokens(passage) + 1
+            if used + tokens > limit:
+                continue
+            selected.append((position, passage))
+            used += tokens
+
+        if not selected and passages:
+            # A single passage larger than the limit is cut at the character level
+            best = min(scored, key=lambda entry: (-entry[0], entry[1]))
+            return self._truncate(best[2], limit)
+
+        # Mark gaps where passages were left out
+        parts = []
+        previous = -1
+        for position, passage in sorted(selected):
+            if parts and position != previous + 1:
+                parts.append("...")
+            parts.append(passage)
+            previous = position
+
+        trimmed = " ".join(parts)
+        return trimmed if self.count_tokens(trimmed) <= limit else self._truncate(trimmed, limit)
+
+
+    #=======================================================================
+    # Cuts text to at most limit tokens
+    #=======================================================================
+    def _truncate(self, text: str, limit: int) -> str:
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(text[:middle]) <= limit:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low]
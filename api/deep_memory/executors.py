@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any
+import threading
+
+
+# Default thread counts of the process-wide pools
+#
+# - "search_legs": dense and sparse legs of hybrid searches
+# - "search_tools": blocking search tools awaited by async research
+# - "write_tools": blocking write tools (upserts) awaited by async memorization
+# - "hedged_requests": primary and duplicate calls of hedged searches
+DEFAULT_POOL_SIZES = {
+    "search_legs": 32,
+    "search_tools": 64,
+    "write_tools": 16,
+    "hedged_requests": 32,
+}
+
+_pool_sizes: Dict[str, int] = dict(DEFAULT_POOL_SIZES)
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+#=======================================================================
+# Returns a process-wide pool, creating it on first use
+#
+# The pools nest: an async hybrid search holds a search_tools thread
+# while its two legs hold search_legs threads (and, when hedged, up to
+# two hedged_requests threads each). A process therefore runs at most
+# min(search_tools, search_legs / 2) hybrid searches at once from async
+# research; further ones queue. Writes have their own pool, so a burst
+# of memorization never queues ahead of research.
+#=======================================================================
+def get_executor(name: str) -> ThreadPoolExecutor:
+    with _lock:
+        executor = _executors.get(name)
+        if executor is None:
+            if name not in _pool_sizes:
+                raise ValueError(f"Unknown executor '{name}'. Available executors: {list(_pool_sizes)}")
+            executor = ThreadPoolExecutor(max_workers=_pool_sizes[name], thread_name_prefix=name.replace("_", "-"))
+            _executors[name] = executor
+        return executor
+
+
+#=======================================================================
+# Sets the thread counts of pools by name (e.g. search_legs=64)
+#
+# Pools already created are replaced; work submitted to them finishes
+# on their existing threads. Call at startup, before serving requests.
+#=======================================================================
+def configure_executors(**sizes: int) -> None:
+    for name, size in sizes.items():
+        if name not in DEFAULT_POOL_SIZES:
+            raise ValueError(f"Unknown executor '{name}'. Available executors: {list(DEFAULT_POOL_SIZES)}")
+        if size < 1:
+            raise ValueError(f"Executor '{name}' needs at least one thread, got {size}")
+
+    with _lock:
+        for name, size in sizes.items():
+            _pool_sizes[name] = size
+            replaced = _executors.pop(name, None)
+            if replaced is not None:
+                replaced.shutdown(wait=False)
+
+
+#=======================================================================
+# Returns the size and backlog (tasks waiting for a thread) of each pool
+#=======================================================================
+def executor_stats() -> Dict[str, Any]:
+    with _lock:
+        executors = dict(_executors)
+        sizes = dict(_pool_sizes)
+
+    stats = {}
+    for name, size in sizes.items():
+        stats[f"{name}_threads"] = size
+        executor = executors.get(name)
+        stats[f"{name}_queued"] = executor._work_queue.qsize() if executor is not None else 0
+    return stats
@@ -0,0 +1,223 @@
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Union
+import json
+import threading
+import time
+from .providers.local_index import DenseIndex, SparseIndex, HashingEmbedder
+
+
+#=======================================================================
+# Write-through hot tier of recently written records
+#
+# Keeps the most recent records written to each index in local dense
+# and BM25 indexes so research can see them immediately, before the
+# remote indexes catch up. Records are evicted once an index holds more
+# than max_records or once they are older than max_age seconds.
+#
+# With a Redis client, written records are also published to Redis lists
+# under key_prefix, and searches first pick up records other processes
+# published, so writes made by a separate memorization worker are seen
+# by the web process. A version counter per index keeps that to a single
+# GET per search while nothing new has been written.
+#=======================================================================
+class HotTier:
+    def __init__(self, max_records: int = 200, max_age: float = 3600, min_dense_score: float = 0.1, redis_client: Optional[Any] = None, key_prefix: str = "deep-memory:hot"):
+        self.max_records = max_records
+        self.max_age = max_age
+
+        # Optional Redis lists shared with other processes
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+
+        # Minimum cosine similarity for dense matches (sparse matches need any keyword overlap)
+        self.min_dense_score = min_dense_score
+        self.embed = HashingEmbedder()
+
+        self._indexes: Dict[str, Union[DenseIndex, SparseIndex]] = {}
+        self._written_at: Dict[str, "OrderedDict[str, float]"] = {}
+        self._lock = threading.Lock()
+
+        # Wall-clock write time of each record held, and the last Redis
+        # version synced, per index
+        self._published_at: Dict[str, Dict[str, float]] = {}
+        self._synced_version: Dict[str, Any] = {}
+
+
+    #=======================================================================
+    # Adds records written to an index
+    #=======================================================================
+    def add(self, index_name: str, records: List[Dict[str, Any]]) -> None:
+        published_at = time.time()
+        with self._lock:
+            self._add(index_name, records, published_at)
+
+        if self.redis is not None:
+            self._publish(index_name, records, published_at)
+
+
+    #=======================================================================
+    # Searches an index, returning {"id", "text", "files", "score"} dicts
+    #=======================================================================
+    def search(self, index_name: str, query_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        if self.redis is not None:
+            self._sync(index_name)
+
+        with self._lock:
+            if index_name not in self._indexes:
+                return []
+
+            self._evict(index_name)
+            index = self._indexes[index_name]
+            matches = index.search(query_text, top_k)
+            min_score = self.min_dense_score if isinstance(index, DenseIndex) else 0
+
+        return [{
+            "id": record["_id"],
+            "text": record["chunk_text"],
+            "files": record.get("files", []),
+            "score": score
+        } for record, score in matches if score > min_score]
+
+
+    #=======================================================================
+    # Searches a dense and a sparse index, merging results by rank
+    #=======================================================================
+    def hybrid_search(self, query_text: str, dense_index: str, sparse_index: str, top_k: int = 5) -> List[Dict[str, Any]]:
+        return interleave_results(
+            self.search(dense_index, query_text, top_k),
+            self.search(sparse_index, query_text, top_k),
+            top_k
+        )
+
+
+    #=======================================================================
+    # Removes all records
+    #=======================================================================
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._written_at.clear()
+            self._published_at.clear()
+            self._synced_version.clear()
+
+        if self.redis is not None:
+            try:
+                for key in list(self.redis.scan_iter(match=f"{self.key_prefix}:*")):
+                    self.redis.delete(key)
+            except Exception as e:
+                print(f"Warning: Could not clear shared hot tier: {e}")
+
+
+    #=======================================================================
+    # Adds records written at a wall-clock time, skipping ones already held
+    # from that write or a later one (caller holds the lock)
+    #=======================================================================
+    def _add(self, index_name: str, records: List[Dict[str, Any]], published_at: float) -> None:
+        index = self._indexes.get(index_name)
+        if index is None:
+            index = SparseIndex() if index_name.endswith("-sparse") else DenseIndex(self.embed)
+            self._indexes[index_name] = index
+            self._written_at[index_name] = OrderedDict()
+            self._published_at[index_name] = {}
+
+        known = self._published_at[index_name]
+        records = [record for record in records if known.get(record["_id"], float("-inf")) < published_at]
+        if not records:
+            return
+
+        index.upsert(records)
+        written_at = self._written_at[index_name]
+        added_at = time.monotonic() - max(time.time() - published_at, 0.0)
+        for record in records:
+            written_at[record["_id"]] = added_at
+            written_at.move_to_end(record["_id"])
+            known[record["_id"]] = published_at
+
+        self._evict(index_name)
+
+
+    #=======================================================================
+    # Publishes records to the shared Redis list of an index, keeping at
+    # most max_records for at most max_age seconds
+    #=======================================================================
+    def _publish(self, index_name: str, records: List[Dict[str, Any]], published_at: float) -> None:
+        records_key, version_key = self._redis_keys(index_name)
+        try:
+            for record in records:
+                self.redis.rpush(records_key, json.dumps({"published_at": published_at, "record": record}))
+            self.redis.ltrim(records_key, -self.max_records, -1)
+            self.redis.expire(records_key, int(self.max_age))
+            self.redis.incr(version_key)
+            self.redis.expire(version_key, int(self.max_age))
+        except Exception as e:
+            print(f"Warning: Could not publish to shared hot tier: {e}")
+
+
+    #=======================================================================
+    # Adds records other processes published to an index since the last
+    # sync
+    #=======================================================================
+    def _sync(self, index_name: str) -> None:
+        records_key, version_key = self._redis_keys(index_name)
+        try:
+            version = self.redis.get(version_key)
+            if version is None or version == self._synced_version.get(index_name):
+                return
+            entries = [json.loads(entry) for entry in self.redis.lrange(records_key, 0, -1)]
+        except Exception as e:
+            print(f"Warning: Could not read shared hot tier: {e}")
+            return
+
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            for entry in entries:
+                if entry["published_at"] >= cutoff:
+                    self._add(index_name, [entry["record"]], entry["published_at"])
+            self._synced_version[index_name] = version
+
+
+    #=======================================================================
+    # Redis keys of an index's shared records and version counter
+    #=======================================================================
+    def _redis_keys(self, index_name: str) -> tuple:
+        return f"{self.key_prefix}:{index_name}:records", f"{self.key_prefix}:{index_name}:version"
+
+
+    #=======================================================================
+    # Evicts records over the size limit or past the age limit
+    # (caller holds the lock)
+    #=======================================================================
+    def _evict(self, index_name: str) -> None:
+        written_at = self._written_at[index_name]
+        cutoff = time.monotonic() - self.max_age
+
+        evicted = []
+        while written_at:
+            record_id, timestamp = next(iter(written_at.items()))
+            if len(written_at) <= self.max_records and timestamp >= cutoff:
+                break
+            written_at.popitem(last=False)
+            evicted.append(record_id)
+
+        if evicted:
+            self._indexes[index_name].delete(evicted)
+            known = self._published_at[index_name]
+            for record_id in evicted:
+                known.pop(record_id, None)
+
+
+#=======================================================================
+# Merges two ranked result lists by alternating ranks, skipping
+# duplicate ids, since their scores are not on comparable scales
+#=======================================================================
+def interleave_results(first: List[Dict[str, Any]], second: List[Dict[str, Any]], top_k: int, id_key: str = "id") -> List[Dict[str, Any]]:
+    merged = []
+    seen = set()
+
+    for rank in range(max(len(first), len(second))):
+        for results in (first, second):
+            if rank < len(results) and results[rank][id_key] not in seen:
+                seen.add(results[rank][id_key])
+                merged.append(results[rank])
+
+    return merged[:top_k]
\ No newline at end of file
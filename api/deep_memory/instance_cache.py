@@ -0,0 +1,181 @@
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable, Tuple, List
+import threading
+import time
+
+
+#=======================================================================
+# Size- and idle-time-bounded LRU cache of per-user instances
+#
+# Entries idle for longer than idle_ttl seconds are expired, and the
+# least recently used entry is evicted once max_size is reached. The
+# on_evict callback receives each evicted (key, value) so pending state
+# can be flushed or persisted.
+#=======================================================================
+class InstanceCache:
+    def __init__(
+            self,
+            max_size: int = 256,
+            idle_ttl: float = 3600,
+            on_evict: Optional[Callable[[str, Any], None]] = None
+        ):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.on_evict = on_evict
+
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+    #=======================================================================
+    # Returns the value for a key, creating it with factory on a miss
+    #
+    # Concurrent misses may each run factory, but only one value is
+    # inserted and returned to all of them. on_insert is called with
+    # that value alone, so side effects such as restoring persisted
+    # state belong there rather than in factory.
+    #=======================================================================
+    def get_or_create(self, key: str, factory: Callable[[], Any], on_insert: Optional[Callable[[Any], None]] = None) -> Any:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        value = factory()
+        with self._lock:
+            # Another request may have created the entry meanwhile
+            if key in self._entries:
+                value = self._entries[key][0]
+                self._entries[key] = (value, time.monotonic())
+                self._entries.move_to_end(key)
+                return value
+            self._entries[key] = (value, time.monotonic())
+            evicted = self._evict_locked()
+
+        if on_insert is not None:
+            on_insert(value)
+        self._notify(evicted)
+        return value
+
+
+    #=======================================================================
+    # Returns the value for a key (refreshing its recency), or None
+    #=======================================================================
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            evicted = self._expire_locked()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                value = None
+            else:
+                self.hits += 1
+                value = entry[0]
+                self._entries[key] = (value, time.monotonic())
+                self._entries.move_to_end(key)
+
+        self._notify(evicted)
+        return value
+
+
+    #=======================================================================
+    # Returns the value for a key without refreshing it, or None
+    #=======================================================================
+    def peek(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[0] if entry else None
+
+
+    #=======================================================================
+    # Removes a key without calling on_evict and returns its value
+    #=======================================================================
+    def pop(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+
+    #=======================================================================
+    # Evicts every entry, calling on_evict for each
+    #=======================================================================
+    def clear(self) -> None:
+        with self._lock:
+            evicted = list((key, entry[0]) for key, entry in self._entries.items())
+            self._entries.clear()
+            self.evictions += len(evicted)
+
+        self._notify(evicted)
+
+
+    #=======================================================================
+    # Returns cache size and hit/miss/eviction counters
+    #=======================================================================
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+    #=======================================================================
+    # Removes idle and over-capacity entries (caller holds the lock)
+    #=======================================================================
+    def _evict_locked(self) -> List[Tuple[str, Any]]:
+        evicted = self._expire_locked()
+        while len(self._entries) > self.max_size:
+            key, (value, _) = self._entries.popitem(last=False)
+            evicted.append((key, value))
+            self.evictions += 1
+        return evicted
+
+
+    #=======================================================================
+    # Removes entries idle for longer than idle_ttl (caller holds the lock)
+    #=======================================================================
+    def _expire_locked(self) -> List[Tuple[str, Any]]:
+        evicted = []
+        cutoff = time.monotonic() - self.idle_ttl
+
+        # Entries are ordered by last access, so expired ones are at the front
+        while self._entries:
+            key, (value, last_access) = next(iter(self._entries.items()))
+            if last_access >= cutoff:
+                break
+            self._entries.popitem(last=False)
+            evicted.append((key, value))
+            self.evictions += 1
+
+        return evicted
+
+
+    #=======================================================================
+    # Calls on_evict for evicted entries outside the lock
+    #=======================================================================
+    def _notify(self, evicted: List[Tuple[str, Any]]) -> None:
+        if self.on_evict is None:
+            return
+
+        for key, value in evicted:
+            try:
+                self.on_evict(key, value)
+            except Exception as e:
+                print(f"Warning: Eviction callback failed for {key}: {e}")
\ No newline at end of file
@@ -0,0 +1,311 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+
+
+# Seconds between scans dropping expired jobs from the local status table
+PRUNE_INTERVAL = 60.0
+
+# Seconds a Redis worker's heartbeat lasts without being renewed; the
+# processing lists of workers without a heartbeat are returned to the queue
+HEARTBEAT_TTL = 30
+
+# Seconds between scans for processing lists of dead workers
+RECOVERY_INTERVAL = 60.0
+
+
+#=======================================================================
+# Raised by a queue's process callable when only some memories of a job
+# were stored, carrying the upsert report and the memories to retry
+#=======================================================================
+class PartialFailure(RuntimeError):
+    def __init__(self, report: Dict[str, Any], remaining: List[Dict[str, Any]], message: str):
+        super().__init__(message)
+        self.report = report
+        self.remaining = remaining
+
+
+#=======================================================================
+# Background queue for processing memories off the request path
+#
+# Jobs are run by an in-process worker pool, or, when a Redis client is
+# given, pushed onto a Redis list so that any process running
+# run_worker() can drain them. Job status is kept locally for the
+# in-process pool, and only in Redis (readable from any process) for the
+# Redis queue.
+#
+# A job whose process callable raises PartialFailure is retried with only
+# the memories that were not stored, and ends as "partial" (some memories
+# stored) or "failed" (none stored) when it runs out of attempts.
+#
+# Redis workers take a job only when one of their max_workers slots is
+# free, moving it atomically onto a per-worker processing list that it
+# leaves once the job has finished. Each worker renews a heartbeat key
+# while it runs, and returns the processing lists of workers whose
+# heartbeat has expired (crashed workers) to the queue, at startup and
+# every RECOVERY_INTERVAL. A job can run twice if a live worker misses
+# its heartbeat, which is harmless as record ids are content-derived.
+#=======================================================================
+class MemorizationQueue:
+    def __init__(
+            self,
+            process: Callable[[str, List[Dict[str, Any]], str], Dict[str, Any]],
+            max_workers: int = 4,
+            max_attempts: int = 3,
+            retry_delay: float = 2.0,
+            redis_client: Optional[Any] = None,
+            queue_key: str = "deep-memory:memorize",
+            status_ttl: int = 3600,
+            worker_id: Optional[str] = None
+        ):
+
+        # Callable that stores memories for a user and returns the upsert report
+        self.process = process
+
+        # Retry configuration
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+        # Optional Redis backing
+        self.redis = redis_client
+        self.queue_key = queue_key
+        self.status_ttl = status_ttl
+
+        # Redis list holding the jobs this worker has taken but not finished
+        # (unique per process by default, so workers on one host never share it)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.processing_key = self._processing_key(self.worker_id)
+
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="memorize")
+        self._slots = threading.Semaphore(max_workers)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._last_pruned = time.time()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+
+    #=======================================================================
+    # Enqueues memories for a user and returns the job id
+    #=======================================================================
+    def submit(self, user_id: str, memories: List[Dict[str, Any]], context_window: str = "") -> str:
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "status": "queued",
+            "attempts": 0,
+            "error": None,
+            "report": None,
+            "submitted_at": time.time(),
+        }
+        self._save_status(job)
+
+        payload = {"job": job, "memories": memories, "context_window": context_window}
+        if self.redis is not None:
+            self.redis.rpush(self.queue_key, json.dumps(payload))
+        else:
+            self._executor.submit(self._run, payload)
+
+        return job["id"]
+
+
+    #=======================================================================
+    # Returns the status of a job, or None if it is unknown
+    #=======================================================================
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self.redis is not None:
+            stored = self.redis.get(self._status_key(job_id))
+            return json.loads(stored) if stored else None
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+
+    #=======================================================================
+    # Drains jobs from the Redis list until shutdown() is called
+    #
+    # A job is taken only when a slot is free, so jobs this worker cannot
+    # start yet stay in the queue for other workers.
+    #=======================================================================
+    def run_worker(self, poll_timeout: int = 5) -> None:
+        if self.redis is None:
+            raise ValueError("run_worker requires a Redis-backed queue")
+
+        # Renew the heartbeat well within its TTL (at least every poll)
+        poll_timeout = min(poll_timeout, HEARTBEAT_TTL / 3)
+        self._heartbeat()
+        self._requeue_unfinished(self.processing_key, self.worker_id)
+        self._recover_orphaned()
+        last_recovered = time.monotonic()
+
+        while not self._stopped.is_set():
+            self._heartbeat()
+            if time.monotonic() - last_recovered >= RECOVERY_INTERVAL:
+                self._recover_orphaned()
+                last_recovered = time.monotonic()
+
+            if not self._slots.acquire(timeout=poll_timeout):
+                continue
+
+            item = self.redis.blmove(self.queue_key, self.processing_key, poll_timeout, src="LEFT", dest="RIGHT")
+            if item is None:
+                self._slots.release()
+                continue
+            if self._stopped.is_set():
+                # Return the job to the front of the queue for another worker
+                self.redis.lrem(self.processing_key, 1, item)
+                self.redis.lpush(self.queue_key, item)
+                self._slots.release()
+                break
+
+            self._executor.submit(self._run_taken, item)
+
+
+    #=======================================================================
+    # Returns jobs left on a worker's processing list (by a crash) to the
+    # front of the queue
+    #=======================================================================
+    def _requeue_unfinished(self, processing_key: str, worker_id: str) -> None:
+        requeued = 0
+        while self.redis.lmove(processing_key, self.queue_key, src="RIGHT", dest="LEFT") is not None:
+            requeued += 1
+        if requeued:
+            print(f"Requeued {requeued} unfinished memorization jobs of worker {worker_id}")
+
+
+    #=======================================================================
+    # Returns the jobs of workers whose heartbeat has expired to the queue
+    #=======================================================================
+    def _recover_orphaned(self) -> None:
+        prefix = self._processing_key("")
+        try:
+            for processing_key in list(self.redis.scan_iter(match=f"{prefix}*")):
+                worker_id = processing_key[len(prefix):]
+                if worker_id != self.worker_id and not self.redis.exists(self._heartbeat_key(worker_id)):
+                    self._requeue_unfinished(processing_key, worker_id)
+        except Exception as e:
+            print(f"Warning: Could not recover orphaned memorization jobs: {e}")
+
+
+    #=======================================================================
+    # Renews this worker's heartbeat
+    #=======================================================================
+    def _heartbeat(self) -> None:
+        try:
+            self.redis.set(self._heartbeat_key(self.worker_id), time.time(), ex=HEARTBEAT_TTL)
+        except Exception as e:
+            print(f"Warning: Could not renew memorization worker heartbeat: {e}")
+
+
+    #=======================================================================
+    # Runs a job taken from the Redis queue, then removes it from the
+    # processing list and frees its slot
+    #=======================================================================
+    def _run_taken(self, item: Any) -> None:
+        try:
+            self._run(json.loads(item))
+        finally:
+            try:
+                self.redis.lrem(self.processing_key, 1, item)
+            except Exception as e:
+                print(f"Warning: Could not acknowledge memorization job: {e}")
+            self._slots.release()
+
+
+    #=======================================================================
+    # Stops the worker loop and waits for in-flight jobs to finish
+    #=======================================================================
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._executor.shutdown(wait=True)
+        if self.redis is not None:
+            try:
+                self.redis.delete(self._heartbeat_key(self.worker_id))
+            except Exception as e:
+                print(f"Warning: Could not remove memorization worker heartbeat: {e}")
+
+
+    #=======================================================================
+    # Runs a job with retries, recording its status as it progresses
+    #=======================================================================
+    def _run(self, payload: Dict[str, Any]) -> None:
+        job = payload["job"]
+        memories = payload["memories"]
+
+        while True:
+            job["attempts"] += 1
+            job["status"] = "running"
+            self._save_status(job)
+
+            try:
+                job["report"] = self.process(job["user_id"], memories, payload["context_window"])
+                job["status"] = "succeeded"
+                job["error"] = None
+                self._save_status(job)
+                return
+            except Exception as e:
+                if isinstance(e, PartialFailure):
+                    job["report"] = e.report
+                    memories = e.remaining
+
+                job["error"] = str(e)
+                if job["attempts"] >= self.max_attempts:
+                    print(f"Memorization job {job['id']} failed: {e}")
+                    stored_some = isinstance(e, PartialFailure) and len(memories) < len(payload["memories"])
+                    job["status"] = "partial" if stored_some else "failed"
+                    self._save_status(job)
+                    return
+
+                job["status"] = "retrying"
+                self._save_status(job)
+                time.sleep(self.retry_delay * 2 ** (job["attempts"] - 1))
+
+
+    #=======================================================================
+    # Records job status in Redis when available, otherwise locally
+    #=======================================================================
+    def _save_status(self, job: Dict[str, Any]) -> None:
+        if self.redis is not None:
+            try:
+                self.redis.set(self._status_key(job["id"]), json.dumps(job), ex=self.status_ttl)
+            except Exception as e:
+                print(f"Warning: Could not save memorization job status: {e}")
+            return
+
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+            # Forget jobs older than the status TTL (scanned once per PRUNE_INTERVAL)
+            now = time.time()
+            if now - self._last_pruned >= PRUNE_INTERVAL:
+                self._last_pruned = now
+                cutoff = now - self.status_ttl
+                for job_id in [job_id for job_id, stored in self._jobs.items() if stored["submitted_at"] < cutoff]:
+                    del self._jobs[job_id]
+
+
+    #=======================================================================
+    # Redis key holding a job's status
+    #=======================================================================
+    def _status_key(self, job_id: str) -> str:
+        return f"{self.queue_key}:job:{job_id}"
+
+
+    #=======================================================================
+    # Redis key of a worker's processing list
+    #=======================================================================
+    def _processing_key(self, worker_id: str) -> str:
+        return f"{self.queue_key}:processing:{worker_id}"
+
+
+    #=======================================================================
+    # Redis key of a worker's heartbeat
+    #=======================================================================
+    def _heartbeat_key(self, worker_id: str) -> str:
+        return f"{self.queue_key}:worker:{worker_id}"
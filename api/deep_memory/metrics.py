@@ -0,0 +1,246 @@
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+import functools
+import inspect
+import threading
+import time
+
+
+# Histogram bucket upper bounds in seconds (remote calls take ~10ms to ~1min)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+#=======================================================================
+# Latency histogram with cumulative Prometheus-style buckets
+#=======================================================================
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+#=======================================================================
+# Process-wide registry of stage latencies, errors and retries
+#
+# Stages are timed with span() (a context manager, usable around sync
+# code and awaits alike) or the timed() decorator. Each span records a
+# deep_memory_stage_seconds histogram sample labelled with the stage,
+# and a deep_memory_stage_errors_total count when it raises. Retries
+# inside tenacity decorators are counted through retry_hook().
+#
+# External tracers are callables (stage, labels) returning a context
+# manager that is entered for the duration of every span, e.g. for
+# OpenTelemetry: lambda stage, labels: tracer.start_as_current_span(stage, attributes=labels)
+#=======================================================================
+class Metrics:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._gauges: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._tracers: List[Callable[[str, Dict[str, str]], Any]] = []
+        self._lock = threading.Lock()
+
+
+    #=======================================================================
+    # Times a stage, recording its latency and any error it raises
+    #=======================================================================
+    @contextmanager
+    def span(self, stage: str, **labels: Any) -> Iterator[None]:
+        labels = {name: str(value) for name, value in labels.items()}
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for tracer in list(self._tracers):
+                try:
+                    stack.enter_context(tracer(stage, labels))
+                except Exception as e:
+                    print(f"Warning: Tracer failed for stage {stage}: {e}")
+
+            try:
+                yield
+            except Exception as e:
+                self.record_error(stage, e, **labels)
+                raise
+            finally:
+                self.observe(stage, time.perf_counter() - start, **labels)
+
+
+    #=======================================================================
+    # Records a stage latency sample in seconds
+    #=======================================================================
+    def observe(self, stage: str, seconds: float, **labels: Any) -> None:
+        key = ("deep_memory_stage_seconds", self._label_key(stage=stage, **labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(seconds)
+
+
+    #=======================================================================
+    # Increments a counter
+    #=======================================================================
+    def increment(self, name: str, amount: float = 1, **labels: Any) -> None:
+        key = (name, self._label_key(**labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+
+    #=======================================================================
+    # Counts an error raised (or handled) in a stage by exception type
+    #=======================================================================
+    def record_error(self, stage: str, error: Exception, **labels: Any) -> None:
+        self.increment("deep_memory_stage_errors_total", stage=stage, error=type(error).__name__, **labels)
+
+
+    #=======================================================================
+    # Returns a tenacity before_sleep callback counting retries of a call
+    #=======================================================================
+    def retry_hook(self, call: str) -> Callable[[Any], None]:
+        def before_sleep(retry_state: Any) -> None:
+            error = retry_state.outcome.exception() if retry_state.outcome is not None else None
+            self.increment("deep_memory_retries_total", call=call, error=type(error).__name__ if error else "none")
+
+        return before_sleep
+
+
+    #=======================================================================
+    # Registers a callable returning numeric stats (e.g. cache hit/miss
+    # counters), exported as deep_memory_<name>_<stat> gauges
+    #=======================================================================
+    def register_gauges(self, name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+        with self._lock:
+            self._gauges[name] = stats
+
+
+    #=======================================================================
+    # Adds or removes an external tracer
+    #=======================================================================
+    def add_tracer(self, tracer: Callable[[str, Dict[str, str]], Any]) -> None:
+        self._tracers.append(tracer)
+
+
+    def remove_tracer(self, tracer: Callable[[str, Dict[str, str]], Any]) -> None:
+        self._tracers.remove(tracer)
+
+
+    #=======================================================================
+    # Drops every recorded sample and counter
+    #=======================================================================
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+    #=======================================================================
+    # Returns per-stage sample counts and total seconds, and counters,
+    # keyed by their Prometheus label strings
+    #=======================================================================
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                "stages": {
+                    self._format_labels(labels): {"count": h.count, "seconds": h.sum}
+                    for (_, labels), h in sorted(self._histograms.items())
+                },
+                "counters": {
+                    name + self._format_labels(labels): value
+                    for (name, labels), value in sorted(self._counters.items())
+                }
+            }
+
+
+    #=======================================================================
+    # Renders all metrics in the Prometheus text exposition format
+    #=======================================================================
+    def render_prometheus(self) -> str:
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines = []
+        if histograms:
+            lines.append("# HELP deep_memory_stage_seconds Latency of deep memory stages and remote calls")
+            lines.append("# TYPE deep_memory_stage_seconds histogram")
+            for (name, labels), (counts, total, count) in sorted(histograms.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{name}_bucket{self._format_labels(labels + (('le', repr(bound)),))} {bucket_count}")
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+
+        for counter_name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {counter_name} counter")
+            for (name, labels), value in sorted(counters.items()):
+                if name == counter_name:
+                    lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+
+        for gauge_name, stats in sorted(gauges.items()):
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"Warning: Could not collect {gauge_name} stats: {e}")
+                continue
+            for stat, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE deep_memory_{gauge_name}_{stat} gauge")
+                    lines.append(f"deep_memory_{gauge_name}_{stat} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+    #=======================================================================
+    # Returns labels as a sorted, hashable tuple
+    #=======================================================================
+    def _label_key(self, **labels: Any) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+    #=======================================================================
+    # Formats labels as {name="value",...} with Prometheus escaping
+    #=======================================================================
+    def _format_labels(self, labels: Tuple[Tuple[str, str], ...]) -> str:
+        if not labels:
+            return ""
+        escaped = [
+            (name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+            for name, value in labels
+        ]
+        return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+# Registry shared by every DeepMemory instance in the process
+metrics = Metrics()
+
+
+#=======================================================================
+# Decorator timing every call of a sync or async function as a stage
+#=======================================================================
+def timed(stage: str, registry: Optional[Metrics] = None, **labels: Any) -> Callable:
+    def decorate(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with (registry or metrics).span(stage, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with (registry or metrics).span(stage, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
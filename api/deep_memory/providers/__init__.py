@@ -1,4 +1,10 @@
 from .openai_provider import OpenAIProvider
+from .async_openai_provider import AsyncOpenAIProvider
+from .storage_backend import StorageBackend
 from .pinecone_provider import PineconeProvider
+from .pinecone_registry import PineconeRegistry, pinecone_registry
+from .pinecone_embedder import PineconeEmbedder
+from .local_provider import LocalProvider
+from .fake_providers import FakeOpenAIProvider, FakeAsyncOpenAIProvider, FakePineconeProvider
 
-__all__ = ["OpenAIProvider", "PineconeProvider"]
\ No newline at end of file
+__all__ = ["OpenAIProvider", "AsyncOpenAIProvider", "StorageBackend", "PineconeProvider", "PineconeRegistry", "pinecone_registry", "PineconeEmbedder", "LocalProvider", "FakeOpenAIProvider", "FakeAsyncOpenAIProvider", "FakePineconeProvider"]
\ No newline at end of file
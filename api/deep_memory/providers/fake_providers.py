@@ -0,0 +1,331 @@
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Tuple
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from .local_provider import LocalProvider
+from ..cache import make_key
+from ..deadline import Deadline
+from ..metrics import metrics, timed
+from ..resilience import Hedge, get_circuit_breaker, resilient
+
+
+#=======================================================================
+# Injects latency and failures into fake provider calls
+#
+# Each call sleeps for latency +/- jitter seconds (uniformly) and then
+# fails with probability error_rate. A seed makes runs repeatable.
+#=======================================================================
+class FaultInjector:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+
+    #=======================================================================
+    # Draws the delay of one call and whether it fails
+    #=======================================================================
+    def draw(self, latency: Optional[float] = None) -> Tuple[float, bool]:
+        latency = self.latency if latency is None else latency
+        with self._lock:
+            delay = max(0.0, latency + self._random.uniform(-self.jitter, self.jitter))
+            fails = self._random.random() < self.error_rate
+        return delay, fails
+
+
+    #=======================================================================
+    # Sleeps for one call's delay, then raises if the call fails. With a
+    # deadline, calls outlasting it time out when it passes, like remote
+    # calls given the remaining time as their timeout.
+    #=======================================================================
+    def inject(self, call: str, latency: Optional[float] = None, deadline: Optional[Deadline] = None) -> None:
+        delay, fails = self.draw(latency)
+        timeout = deadline.remaining() if deadline is not None else None
+        if timeout is not None and timeout < delay:
+            time.sleep(timeout)
+            raise TimeoutError(f"Injected timeout in {call}")
+        time.sleep(delay)
+        if fails:
+            raise ConnectionError(f"Injected failure in {call}")
+
+
+    #=======================================================================
+    # Async counterpart of inject
+    #=======================================================================
+    async def ainject(self, call: str, latency: Optional[float] = None, deadline: Optional[Deadline] = None) -> None:
+        delay, fails = self.draw(latency)
+        timeout = deadline.remaining() if deadline is not None else None
+        if timeout is not None and timeout < delay:
+            await asyncio.sleep(timeout)
+            raise TimeoutError(f"Injected timeout in {call}")
+        await asyncio.sleep(delay)
+        if fails:
+            raise ConnectionError(f"Injected failure in {call}")
+
+
+#=======================================================================
+# Returns a canned response for an agent prompt
+#
+# Planning prompts get a plan searching the question, integration
+# prompts get the start of their evidence, abstract prompts get the
+# input message and anything else gets a short answer.
+#=======================================================================
+def canned_response(prompt: str) -> str:
+    if "You are the PlanningAgent" in prompt:
+        question = _prompt_field(prompt, "QUESTION")
+        keywords = sorted(set(re.findall(r"[A-Za-z0-9]{4,}", question)), key=len, reverse=True)[:3]
+        image_urls = re.findall(r"https?://[^\s'\",\]]+", _prompt_field(prompt, "AVAILABLE_IMAGE_URLS"))
+        plan = {
+            "keyword_collection": keywords,
+            "vector_queries": [question],
+            "hybrid_queries": [question],
+            "image_queries": [{"url": url, "query": question} for url in image_urls[:1]]
+        }
+        return f"<think>Search the question.</think>\n{json.dumps(plan)}"
+
+    if "You are the IntegrateAgent" in prompt:
+        match = re.search(r"^\s*EVIDENCE_CONTEXT: (.*?)\n\s*INSTRUCTIONS:", prompt, re.MULTILINE | re.DOTALL)
+        evidence = match.group(1) if match else ""
+        return json.dumps({"content": evidence[:500].strip()})
+
+    if "INPUT_MESSAGE: " in prompt:
+        return _prompt_field(prompt, "INPUT_MESSAGE")[:300]
+
+    return f"Answer to: {prompt.strip().splitlines()[-1][:200]}"
+
+
+#=======================================================================
+# Returns the first line of a "FIELD: value" prompt line
+#=======================================================================
+def _prompt_field(prompt: str, field: str) -> str:
+    match = re.search(rf"^\s*{field}: (.*)$", prompt, re.MULTILINE)
+    return match.group(1).strip() if match else ""
+
+
+#=======================================================================
+# Fake OpenAI provider
+#
+# Drop-in stand-in for OpenAIProvider returning canned responses after
+# injected latency (text_latency for text calls, image_latency for
+# vision calls). Calls are retried and timed like the real provider.
+#=======================================================================
+class FakeOpenAIProvider:
+    def __init__(
+            self,
+            text_latency: float = 1.0,
+            image_latency: float = 0.5,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            seed: Optional[int] = None,
+            generation_cache: Optional[Any] = None
+        ):
+        self.text_model = "fake-text"
+        self.reasoning_effort = "medium"
+        self.vision_model = "fake-vision"
+        self.text_latency = text_latency
+        self.image_latency = image_latency
+        self.faults = FaultInjector(text_latency, jitter, error_rate, seed)
+        self.generation_cache = generation_cache
+
+
+    #=======================================================================
+    # Generates canned text, serving repeated prompts from the generation
+    # cache when one is configured
+    #=======================================================================
+    def generate_text(self, prompt: str, use_cache: bool = True, reasoning_effort: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        reasoning_effort = reasoning_effort or self.reasoning_effort
+        if self.generation_cache is None or not use_cache:
+            return self._generate_text(prompt, reasoning_effort, deadline=deadline)
+
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        key = make_key("generate_text", self.text_model, reasoning_effort, prompt_hash)
+        text = self.generation_cache.get(key)
+        if text is None:
+            text = self._generate_text(prompt, reasoning_effort, deadline=deadline)
+            self.generation_cache.set(key, text)
+
+        return text
+
+
+    #=======================================================================
+    # Generates a canned response after the injected latency
+    #=======================================================================
+    @timed("generation")
+    @resilient("fake.generate_text", "fake_openai")
+    def _generate_text(self, prompt: str, reasoning_effort: str, deadline: Optional[Deadline] = None) -> str:
+        if deadline is not None:
+            deadline.check("generation")
+        self.faults.inject("generate_text", self.text_latency, deadline)
+        return canned_response(prompt)
+
+
+    #=======================================================================
+    # Streams a canned response word by word, ending early once deadline
+    # expires
+    #=======================================================================
+    def stream_text(self, prompt: str, deadline: Optional[Deadline] = None) -> Iterator[str]:
+        if deadline is not None:
+            deadline.check("stream")
+        self.faults.inject("stream_text", self.text_latency, deadline)
+        for word in canned_response(prompt).split(" "):
+            yield word + " "
+            if deadline is not None and deadline.expired():
+                break
+
+
+    #=======================================================================
+    # Returns a fixed-size pseudo-random embedding of the text
+    #=======================================================================
+    def generate_embedding(self, text: str) -> list[float]:
+        self.faults.inject("generate_embedding", self.text_latency / 10)
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        return [rng.uniform(-1, 1) for _ in range(64)]
+
+
+    #=======================================================================
+    # Returns a canned image description after the injected latency
+    #=======================================================================
+    @timed("image")
+    @resilient("fake.describe_image", "fake_openai")
+    def describe_image(self, image_url: str, prompt: str = "Describe what is in this image.", deadline: Optional[Deadline] = None) -> str:
+        if deadline is not None:
+            deadline.check("image")
+        self.faults.inject("describe_image", self.image_latency, deadline)
+        return f"An image at {image_url.rsplit('/', 1)[-1]}."
+
+
+#=======================================================================
+# Fake async OpenAI provider (asyncio counterpart of FakeOpenAIProvider)
+#=======================================================================
+class FakeAsyncOpenAIProvider(FakeOpenAIProvider):
+    #=======================================================================
+    # Generates canned text without blocking the event loop
+    #=======================================================================
+    async def generate_text(self, prompt: str, use_cache: bool = True, reasoning_effort: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        reasoning_effort = reasoning_effort or self.reasoning_effort
+        if self.generation_cache is None or not use_cache:
+            return await self._agenerate_text(prompt, reasoning_effort, deadline=deadline)
+
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        key = make_key("generate_text", self.text_model, reasoning_effort, prompt_hash)
+        text = self.generation_cache.get(key)
+        if text is None:
+            text = await self._agenerate_text(prompt, reasoning_effort, deadline=deadline)
+            self.generation_cache.set(key, text)
+
+        return text
+
+
+    #=======================================================================
+    # Generates a canned response after the injected latency
+    #=======================================================================
+    @timed("generation")
+    @resilient("fake.generate_text", "fake_openai")
+    async def _agenerate_text(self, prompt: str, reasoning_effort: str, deadline: Optional[Deadline] = None) -> str:
+        if deadline is not None:
+            deadline.check("generation")
+        await self.faults.ainject("generate_text", self.text_latency, deadline)
+        return canned_response(prompt)
+
+
+    #=======================================================================
+    # Streams a canned response word by word, ending early once deadline
+    # expires
+    #=======================================================================
+    async def stream_text(self, prompt: str, deadline: Optional[Deadline] = None) -> AsyncIterator[str]:
+        if deadline is not None:
+            deadline.check("stream")
+        await self.faults.ainject("stream_text", self.text_latency, deadline)
+        for word in canned_response(prompt).split(" "):
+            yield word + " "
+            if deadline is not None and deadline.expired():
+                break
+
+
+    #=======================================================================
+    # Returns a canned image description after the injected latency
+    #=======================================================================
+    @timed("image")
+    @resilient("fake.describe_image", "fake_openai")
+    async def describe_image(self, image_url: str, prompt: str = "Describe what is in this image.", deadline: Optional[Deadline] = None) -> str:
+        if deadline is not None:
+            deadline.check("image")
+        await self.faults.ainject("describe_image", self.image_latency, deadline)
+        return f"An image at {image_url.rsplit('/', 1)[-1]}."
+
+
+#=======================================================================
+# Fake Pinecone provider
+#
+# An in-memory LocalProvider whose upserts, searches and reranks wait
+# for injected latency (and fail at error_rate) like remote Pinecone
+# calls, so hits come from the records actually upserted. Upserts and
+# searches are retried, circuit-broken and optionally hedged like
+# PineconeProvider; rerank failures fall back to the fused order.
+#=======================================================================
+class FakePineconeProvider(LocalProvider):
+    def __init__(
+            self,
+            search_latency: float = 0.05,
+            upsert_latency: float = 0.1,
+            rerank_latency: float = 0.1,
+            jitter: float = 0.0,
+            error_rate: float = 0.0,
+            seed: Optional[int] = None,
+            search_hedge: Optional[Hedge] = None,
+            **fusion_options
+        ):
+        super().__init__(**fusion_options)
+        self.search_latency = search_latency
+        self.upsert_latency = upsert_latency
+        self.rerank_latency = rerank_latency
+        self.faults = FaultInjector(search_latency, jitter, error_rate, seed)
+        self.search_hedge = search_hedge
+
+
+    #=======================================================================
+    # Upserts records after the injected latency
+    #=======================================================================
+    @resilient("fake.upsert_records", "fake_pinecone")
+    def upsert_records(self, index_name: str, records: List[Dict[str, Any]], namespace: str = "deep-memory"):
+        self.faults.inject("upsert_records", self.upsert_latency)
+        super().upsert_records(index_name, records, namespace)
+
+
+    #=======================================================================
+    # Searches an index (hedged if a search hedge is configured)
+    #=======================================================================
+    def search_text(self, index_name: str, query_text: str, top_k: int = 5, namespace: str = "deep-memory", deadline: Optional[Deadline] = None):
+        if self.search_hedge is not None:
+            return self.search_hedge.call(self._search_text, index_name, query_text, top_k, namespace, deadline=deadline)
+        return self._search_text(index_name, query_text, top_k, namespace, deadline=deadline)
+
+
+    #=======================================================================
+    # Searches an index after the injected latency
+    #=======================================================================
+    @resilient("fake.search_text", "fake_pinecone")
+    def _search_text(self, index_name: str, query_text: str, top_k: int = 5, namespace: str = "deep-memory", deadline: Optional[Deadline] = None):
+        if deadline is not None:
+            deadline.check("search")
+        self.faults.inject("search_text", self.search_latency)
+        return super().search_text(index_name, query_text, top_k, namespace)
+
+
+    #=======================================================================
+    # Reranks results locally after the injected latency (keeping the
+    # fused order if it fails or its circuit is open)
+    #=======================================================================
+    def _rerank_results(self, query_text: str, documents: List[Dict[str, Any]], top_n: int = 10) -> List[Dict[str, Any]]:
+        try:
+            get_circuit_breaker("fake_pinecone_inference").call(self.faults.inject, "rerank", self.rerank_latency)
+        except Exception as e:
+            metrics.record_error("rerank", e)
+            print(f"Reranking failed: {e}")
+        return super()._rerank_results(query_text, documents, top_n)
@@ -0,0 +1,109 @@
+from typing import List, Dict, Any, Optional
+
+
+# Supported fusion methods and rerank policies
+FUSION_METHODS = ["rrf", "weighted"]
+RERANK_POLICIES = ["always", "never", "ambiguous"]
+
+# Default fused score gap below which the top two results count as tied.
+# RRF scores are compressed (1/61 vs 1/62 for adjacent ranks), so only
+# near-equal scores signal that the legs disagree.
+DEFAULT_MARGINS = {"rrf": 0.01, "weighted": 0.1}
+
+
+#=======================================================================
+# Converts a Pinecone-shaped search response into
+# {"_id", "chunk_text", "files", "_score"} documents in rank order
+#=======================================================================
+def hits_to_documents(search_results: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{
+        '_id': hit['_id'],
+        'chunk_text': hit['fields']['chunk_text'],
+        'files': hit['fields'].get('files', []),
+        '_score': hit['_score']
+    } for hit in search_results['result']['hits']]
+
+
+#=======================================================================
+# Reciprocal rank fusion
+#
+# Scores each document by the sum of weight / (k + rank) over the lists
+# it appears in, so only ranks matter and raw scores on different scales
+# (cosine similarity, BM25) never get compared directly. Scores are
+# scaled to [0, 1], where 1 means ranked first in every list.
+#=======================================================================
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], weights: Optional[List[float]] = None, k: int = 60) -> List[Dict[str, Any]]:
+    weights = weights or [1.0] * len(result_lists)
+    documents: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+
+    for results, weight in zip(result_lists, weights):
+        for rank, document in enumerate(results, 1):
+            documents.setdefault(document['_id'], document)
+            scores[document['_id']] = scores.get(document['_id'], 0.0) + weight / (k + rank)
+
+    best_possible = sum(weights) / (k + 1)
+    return _sorted_by_score(documents, {doc_id: score / best_possible for doc_id, score in scores.items()})
+
+
+#=======================================================================
+# Weighted normalized score fusion
+#
+# Min-max normalizes each list's scores to [0, 1] and sums them with the
+# given weights, keeping how far apart results are within each list.
+# Scores are scaled to [0, 1] by the total weight.
+#=======================================================================
+def weighted_score_fusion(result_lists: List[List[Dict[str, Any]]], weights: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    weights = weights or [1.0] * len(result_lists)
+    documents: Dict[str, Dict[str, Any]] = {}
+    scores: Dict[str, float] = {}
+
+    for results, weight in zip(result_lists, weights):
+        if not results:
+            continue
+
+        low = min(document['_score'] for document in results)
+        high = max(document['_score'] for document in results)
+        for document in results:
+            normalized = (document['_score'] - low) / (high - low) if high > low else 1.0
+            documents.setdefault(document['_id'], document)
+            scores[document['_id']] = scores.get(document['_id'], 0.0) + weight * normalized
+
+    total_weight = sum(weights)
+    return _sorted_by_score(documents, {doc_id: score / total_weight for doc_id, score in scores.items()})
+
+
+#=======================================================================
+# Fuses ranked result lists with the named method
+#=======================================================================
+def fuse_results(method: str, result_lists: List[List[Dict[str, Any]]], weights: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+    if method == "rrf":
+        return reciprocal_rank_fusion(result_lists, weights)
+    if method == "weighted":
+        return weighted_score_fusion(result_lists, weights)
+    raise ValueError(f"Unknown fusion method '{method}'. Available methods: {FUSION_METHODS}")
+
+
+#=======================================================================
+# Returns whether a fused ranking is too uncertain to skip reranking
+#
+# The ranking is ambiguous when the leader's fused score is below
+# min_confidence (the lists do not agree on it) or the runner-up is
+# within margin of it.
+#=======================================================================
+def is_ambiguous(fused: List[Dict[str, Any]], margin: float, min_confidence: float = 0.75) -> bool:
+    if not fused:
+        return False
+
+    if fused[0]['_score'] < min_confidence:
+        return True
+
+    return len(fused) > 1 and fused[0]['_score'] - fused[1]['_score'] < margin
+
+
+#=======================================================================
+# Rebuilds documents in score order with their fused scores
+#=======================================================================
+def _sorted_by_score(documents: Dict[str, Dict[str, Any]], scores: Dict[str, float]) -> List[Dict[str, Any]]:
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [{**documents[doc_id], '_score': score} for doc_id, score in ranked]
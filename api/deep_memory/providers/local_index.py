@@ -0,0 +1,213 @@
+from collections import Counter
+from typing import List, Dict, Any, Callable, Tuple, Optional
+import math
+import re
+import zlib
+import numpy as np
+
+
+#=======================================================================
+# Splits text into lowercase word tokens
+#=======================================================================
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+#=======================================================================
+# Deterministic feature-hashing embedder for offline dense search
+#
+# Hashes word unigrams and bigrams into a fixed number of signed
+# buckets and L2-normalizes the result. No model or network is needed,
+# and vectors are stable across processes so they can be persisted.
+#=======================================================================
+class HashingEmbedder:
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                digest = zlib.crc32(feature.encode("utf-8"))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dim] += sign
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+#=======================================================================
+# In-memory dense index using cosine similarity over a NumPy matrix
+#=======================================================================
+class DenseIndex:
+    def __init__(self, embed: Callable[[List[str]], np.ndarray]):
+        self.embed = embed
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+
+
+    #=======================================================================
+    # Embeds and stores records, replacing records with the same _id
+    #=======================================================================
+    def upsert(self, records: List[Dict[str, Any]], vectors: Optional[np.ndarray] = None) -> None:
+        if not records:
+            return
+
+        if vectors is None:
+            vectors = self.embed([record["chunk_text"] for record in records])
+        vectors = self._normalize(np.asarray(vectors, dtype=np.float32))
+
+        new_rows = []
+        for record, vector in zip(records, vectors):
+            record_id = record["_id"]
+            self.records[record_id] = record
+            if record_id in self._positions:
+                self._vectors[self._positions[record_id]] = vector
+            else:
+                self._positions[record_id] = len(self._ids)
+                self._ids.append(record_id)
+                new_rows.append(vector)
+
+        if new_rows:
+            new_rows = np.stack(new_rows)
+            self._vectors = new_rows if self._vectors is None else np.vstack([self._vectors, new_rows])
+
+
+    #=======================================================================
+    # Returns the top_k (record, score) pairs for a query
+    #=======================================================================
+    def search(self, query_text: str, top_k: int = 5, query_vector: Optional[np.ndarray] = None) -> List[Tuple[Dict[str, Any], float]]:
+        if not self._ids:
+            return []
+
+        if query_vector is None:
+            query_vector = self.embed([query_text])[0]
+        query_vector = self._normalize(np.asarray(query_vector, dtype=np.float32)[None, :])[0]
+
+        scores = self._vectors @ query_vector
+        top_k = min(top_k, len(self._ids))
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+
+        return [(self.records[self._ids[i]], float(scores[i])) for i in top]
+
+
+    #=======================================================================
+    # Removes records by id
+    #=======================================================================
+    def delete(self, ids: List[str]) -> None:
+        ids = [record_id for record_id in ids if record_id in self._positions]
+        if not ids:
+            return
+
+        removed = set(ids)
+        keep = [i for i, record_id in enumerate(self._ids) if record_id not in removed]
+        for record_id in ids:
+            del self.records[record_id]
+
+        self._ids = [self._ids[i] for i in keep]
+        self._positions = {record_id: i for i, record_id in enumerate(self._ids)}
+        self._vectors = self._vectors[keep] if keep else None
+
+
+    #=======================================================================
+    # Returns stored ids and vectors (for persistence)
+    #=======================================================================
+    def state(self) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        return [self.records[record_id] for record_id in self._ids], self._vectors
+
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+#=======================================================================
+# In-memory sparse keyword index scored with BM25 over an inverted index
+#=======================================================================
+class SparseIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+
+    #=======================================================================
+    # Indexes records, replacing records with the same _id
+    #=======================================================================
+    def upsert(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            record_id = record["_id"]
+            if record_id in self.records:
+                self.delete([record_id])
+
+            term_counts = Counter(tokenize(record["chunk_text"]))
+            for term, count in term_counts.items():
+                self._postings.setdefault(term, {})[record_id] = count
+
+            length = sum(term_counts.values())
+            self.records[record_id] = record
+            self._doc_lengths[record_id] = length
+            self._total_length += length
+
+
+    #=======================================================================
+    # Returns the top_k (record, score) pairs for a query
+    #=======================================================================
+    def search(self, query_text: str, top_k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        if not self.records:
+            return []
+
+        doc_count = len(self.records)
+        avg_length = self._total_length / doc_count or 1
+        scores: Dict[str, float] = {}
+
+        for term in set(tokenize(query_text)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for record_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[record_id] / avg_length)
+                scores[record_id] = scores.get(record_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.records[record_id], score) for record_id, score in top]
+
+
+    #=======================================================================
+    # Removes records by id
+    #=======================================================================
+    def delete(self, ids: List[str]) -> None:
+        for record_id in ids:
+            record = self.records.pop(record_id, None)
+            if record is None:
+                continue
+
+            for term in set(tokenize(record["chunk_text"])):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(record_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+            self._total_length -= self._doc_lengths.pop(record_id)
+
+
+    def __len__(self) -> int:
+        return len(self.records)
\ No newline at end of file
@@ -0,0 +1,221 @@
+from typing import List, Dict, Any, Callable, Optional, Set, Tuple, Union
+from urllib.parse import quote, unquote
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from .local_index import DenseIndex, SparseIndex, HashingEmbedder
+from .storage_backend import StorageBackend
+from ..deadline import Deadline
+
+
+# Local mirrors of the Pinecone indexes
+DENSE_INDEXES = ["deep-memory-memo", "deep-memory-page"]
+SPARSE_INDEXES = ["deep-memory-memo-sparse", "deep-memory-page-sparse"]
+
+
+#=======================================================================
+# Local in-process storage backend
+#
+# Mirrors the four deep-memory-* indexes with NumPy dense indexes and
+# BM25 sparse indexes, optionally persisted under a directory. Useful
+# for small tenants and for running the agents offline.
+#
+# Writes are persisted in batches: an upsert marks its index namespace
+# dirty, and dirty ones are saved together save_delay seconds after the
+# first of them (or on flush), outside the lock searches take.
+#=======================================================================
+class LocalProvider(StorageBackend):
+    def __init__(self, path: Optional[str] = None, embed: Optional[Callable[[List[str]], np.ndarray]] = None, save_delay: float = 2.0, **fusion_options):
+        super().__init__(**fusion_options)
+
+        # Directory for persistence (None keeps everything in memory)
+        self.path = path
+        self.embed = embed or HashingEmbedder()
+        self.save_delay = save_delay
+
+        self._indexes: Dict[Tuple[str, str], Union[DenseIndex, SparseIndex]] = {}
+        self._lock = threading.RLock()
+
+        # Index namespaces written since the last save, and the pending save
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._save_timer: Optional[threading.Timer] = None
+        self._save_lock = threading.Lock()
+
+        if self.path:
+            self._load()
+
+
+    #=======================================================================
+    # Upserts records into indexes
+    #=======================================================================
+    def upsert_records(self, index_name: str, records: List[Dict[str, Any]], namespace: str = "deep-memory"):
+        with self._lock:
+            index = self._get_index(index_name, namespace)
+            index.upsert(records)
+            self._schedule_save(index_name, namespace)
+
+
+    #=======================================================================
+    # Searches indexes with text queries
+    #=======================================================================
+    def search_text(self, index_name: str, query_text: str, top_k: int = 5, namespace: str = "deep-memory", deadline: Optional[Deadline] = None):
+        with self._lock:
+            matches = self._get_index(index_name, namespace).search(query_text, top_k)
+
+        return {
+            "result": {
+                "hits": [{
+                    "_id": record["_id"],
+                    "_score": score,
+                    "fields": {key: value for key, value in record.items() if key != "_id"}
+                } for record, score in matches]
+            }
+        }
+
+
+    #=======================================================================
+    # Clears all deep memory indexes
+    #=======================================================================
+    def clear_all_indexes(self):
+        with self._save_lock, self._lock:
+            self._indexes.clear()
+            self._dirty.clear()
+            if self.path:
+                for index_name in DENSE_INDEXES + SPARSE_INDEXES:
+                    shutil.rmtree(os.path.join(self.path, index_name), ignore_errors=True)
+
+
+    #=======================================================================
+    # Deletes a namespace from all deep memory indexes
+    #=======================================================================
+    def clear_namespace(self, namespace: str):
+        with self._save_lock, self._lock:
+            for index_name in DENSE_INDEXES + SPARSE_INDEXES:
+                self._indexes.pop((index_name, namespace), None)
+                self._dirty.discard((index_name, namespace))
+                if self.path:
+                    base = os.path.join(self.path, index_name, quote(namespace, safe=""))
+                    for suffix in (".json", ".npy"):
+                        if os.path.exists(base + suffix):
+                            os.remove(base + suffix)
+
+
+    #=======================================================================
+    # Keeps the fused order (no cross-encoder is available locally)
+    #=======================================================================
+    def _rerank_results(self, query_text: str, documents: List[Dict[str, Any]], top_n: int = 10):
+        return self._format_results(documents, top_n)
+
+
+    #=======================================================================
+    # Returns the index for a name and namespace, creating it if needed
+    #=======================================================================
+    def _get_index(self, index_name: str, namespace: str) -> Union[DenseIndex, SparseIndex]:
+        if index_name not in DENSE_INDEXES + SPARSE_INDEXES:
+            raise ValueError(f"Unknown index '{index_name}'. Available indexes: {DENSE_INDEXES + SPARSE_INDEXES}")
+
+        key = (index_name, namespace)
+        if key not in self._indexes:
+            self._indexes[key] = DenseIndex(self.embed) if index_name in DENSE_INDEXES else SparseIndex()
+        return self._indexes[key]
+
+
+    #=======================================================================
+    # Saves every index namespace written since the last save
+    #=======================================================================
+    def flush(self):
+        if not self.path:
+            return
+
+        with self._save_lock:
+            # Snapshot the dirty indexes, then write them without blocking searches
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                snapshots = [(key, self._snapshot(self._indexes[key])) for key in self._dirty if key in self._indexes]
+                self._dirty.clear()
+
+            for (index_name, namespace), (records, vectors) in snapshots:
+                self._save(index_name, namespace, records, vectors)
+
+
+    #=======================================================================
+    # Marks an index namespace dirty and schedules a save if none is
+    # pending (caller holds the lock)
+    #=======================================================================
+    def _schedule_save(self, index_name: str, namespace: str):
+        if not self.path:
+            return
+
+        self._dirty.add((index_name, namespace))
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self._save_pending)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+
+    #=======================================================================
+    # Runs a scheduled save
+    #=======================================================================
+    def _save_pending(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Warning: Could not save local indexes: {e}")
+
+
+    #=======================================================================
+    # Returns copies of an index's records and vectors (vectors are None
+    # for sparse indexes) for saving
+    #=======================================================================
+    def _snapshot(self, index: Union[DenseIndex, SparseIndex]) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        if isinstance(index, DenseIndex):
+            records, vectors = index.state()
+            return records, vectors.copy() if vectors is not None else None
+        return list(index.records.values()), None
+
+
+    #=======================================================================
+    # Persists an index's records (and vectors for dense indexes)
+    #=======================================================================
+    def _save(self, index_name: str, namespace: str, records: List[Dict[str, Any]], vectors: Optional[np.ndarray]):
+        directory = os.path.join(self.path, index_name)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, quote(namespace, safe=""))
+
+        if vectors is not None:
+            with open(base + ".npy.tmp", "wb") as f:
+                np.save(f, vectors)
+            os.replace(base + ".npy.tmp", base + ".npy")
+
+        with open(base + ".json.tmp", "w", encoding="utf-8") as f:
+            json.dump(records, f)
+        os.replace(base + ".json.tmp", base + ".json")
+
+
+    #=======================================================================
+    # Loads persisted indexes
+    #=======================================================================
+    def _load(self):
+        for index_name in DENSE_INDEXES + SPARSE_INDEXES:
+            directory = os.path.join(self.path, index_name)
+            if not os.path.isdir(directory):
+                continue
+
+            for filename in os.listdir(directory):
+                if not filename.endswith(".json"):
+                    continue
+
+                base = os.path.join(directory, filename[:-len(".json")])
+                with open(base + ".json", "r", encoding="utf-8") as f:
+                    records = json.load(f)
+
+                index = self._get_index(index_name, unquote(filename[:-len(".json")]))
+                if isinstance(index, DenseIndex):
+                    vectors = np.load(base + ".npy") if os.path.exists(base + ".npy") else None
+                    index.upsert(records, vectors=vectors)
+                else:
+                    index.upsert(records)
\ No newline at end of file
@@ -1,39 +1,112 @@
-from openai import OpenAI
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_random_exponential,
-)
+from openai import OpenAI, NOT_GIVEN
+from typing import Any, Optional, Iterator
+from ..cache import make_key
+from ..deadline import Deadline
+from ..metrics import timed
+from ..resilience import resilient
+import hashlib
 
 
 #=======================================================================
 # OpenAI provider
 #=======================================================================
 class OpenAIProvider:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
+    def __init__(self, api_key: str, generation_cache: Optional[Any] = None):
+        self.api_key = api_key
+        self.client = OpenAI(api_key=api_key, max_retries=0)
+        self.text_model = "gpt-5.1"
+        self.reasoning_effort = "medium"
+        self.vision_model = "gpt-4o-mini"
+
+        # Optional cache of generated text keyed by (model, reasoning effort, prompt hash)
+        self.generation_cache = generation_cache
+
+
+    #=======================================================================
+    # Generates text, serving repeated prompts from the generation cache
+    # when one is configured (use_cache=False bypasses it for this call).
+    # reasoning_effort overrides the provider default for this call, and
+    # the call (with its retries) is bounded by deadline if given.
+    #=======================================================================
+    def generate_text(self, prompt: str, use_cache: bool = True, reasoning_effort: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        reasoning_effort = reasoning_effort or self.reasoning_effort
+        if self.generation_cache is None or not use_cache:
+            return self._generate_text(prompt, reasoning_effort, deadline=deadline)
+
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        key = make_key("generate_text", self.text_model, reasoning_effort, prompt_hash)
+        text = self.generation_cache.get(key)
+        if text is None:
+            text = self._generate_text(prompt, reasoning_effort, deadline=deadline)
+            self.generation_cache.set(key, text)
+
+        return text
 
 
     #=======================================================================
     # Generates text using OpenAI's responses API
     #=======================================================================
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
-    def generate_text(self, prompt: str) -> str:
+    @timed("generation")
+    @resilient("openai.generate_text", "openai")
+    def _generate_text(self, prompt: str, reasoning_effort: str, deadline: Optional[Deadline] = None) -> str:
+        if deadline is not None:
+            deadline.check("generation")
         try:
             response = self.client.responses.create(
-                model="gpt-5.1",
+                model=self.text_model,
                 input=prompt,
-                reasoning={"effort": "medium"}
+                reasoning={"effort": reasoning_effort},
+                timeout=self._request_timeout(deadline)
             )
             return response.output_text.strip()
         except Exception as e:
-            raise RuntimeError(f"Failed to generate text: {e}")
+            raise RuntimeError(f"Failed to generate text: {e}") from e
+
+
+    #=======================================================================
+    # Streams generated text deltas as they arrive, ending the stream
+    # early (with the text so far) once deadline expires
+    #=======================================================================
+    def stream_text(self, prompt: str, deadline: Optional[Deadline] = None) -> Iterator[str]:
+        stream = self._create_text_stream(prompt, deadline=deadline)
+        try:
+            for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type in ("error", "response.failed"):
+                    raise RuntimeError(f"Failed to stream text: {event}")
+                if deadline is not None and deadline.expired():
+                    print("Warning: Text stream cut short by deadline")
+                    break
+        finally:
+            stream.close()
+
+
+    #=======================================================================
+    # Opens a streaming response (retried until the stream is established)
+    #=======================================================================
+    @timed("stream_open")
+    @resilient("openai.stream_text", "openai")
+    def _create_text_stream(self, prompt: str, deadline: Optional[Deadline] = None) -> Any:
+        if deadline is not None:
+            deadline.check("stream")
+        try:
+            return self.client.responses.create(
+                model=self.text_model,
+                input=prompt,
+                reasoning={"effort": self.reasoning_effort},
+                stream=True,
+                timeout=self._request_timeout(deadline)
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to start text stream: {e}") from e
 
 
     #=======================================================================
     # Generates vector embeddings for the given text
     #=======================================================================
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
+    @timed("embedding")
+    @resilient("openai.generate_embedding", "openai")
     def generate_embedding(self, text: str) -> list[float]:
         try:
             response = self.client.embeddings.create(
@@ -42,17 +115,20 @@ class OpenAIProvider:
             )
             return response.data[0].embedding
         except Exception as e:
-            raise RuntimeError(f"Failed to generate embedding: {e}")
+            raise RuntimeError(f"Failed to generate embedding: {e}") from e
 
 
     #=======================================================================
     # Describes an image using OpenAI's vision API
     #=======================================================================
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
-    def describe_image(self, image_url: str, prompt: str = "Describe what is in this image.") -> str:
+    @timed("image")
+    @resilient("openai.describe_image", "openai")
+    def describe_image(self, image_url: str, prompt: str = "Describe what is in this image.", deadline: Optional[Deadline] = None) -> str:
+        if deadline is not None:
+            deadline.check("image")
         try:
             response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
+                model=self.vision_model,
                 messages=[
                     {
                         "role": "user",
@@ -66,7 +142,17 @@ class OpenAIProvider:
                     }
                 ],
                 max_tokens=300,
+                timeout=self._request_timeout(deadline)
             )
             return response.choices[0].message.content.strip()
         except Exception as e:
-            raise RuntimeError(f"Failed to describe image: {e}")
\ No newline at end of file
+            raise RuntimeError(f"Failed to describe image: {e}") from e
+
+
+    #=======================================================================
+    # Returns the request timeout for a deadline (the client default if
+    # there is none)
+    #=======================================================================
+    def _request_timeout(self, deadline: Optional[Deadline]) -> Any:
+        remaining = deadline.remaining() if deadline is not None else None
+        return NOT_GIVEN if remaining is None else remaining
\ No newline at end of file
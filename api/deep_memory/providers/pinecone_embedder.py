@@ -0,0 +1,129 @@
+from concurrent.futures import Future
+from typing import List, Dict, Any, Optional
+import hashlib
+import threading
+from ..cache import MemoryCache, make_key
+from ..deadline import Deadline
+from ..metrics import metrics, timed
+from ..resilience import resilient
+
+
+# Embedding model of the dense deep memory indexes
+EMBED_MODEL = "llama-text-embed-v2"
+
+# Most inputs the model accepts in one embed request
+EMBED_BATCH_SIZE = 96
+
+
+#=======================================================================
+# Client-side embedder for the dense Pinecone indexes
+#
+# Embeds texts with Pinecone Inference using the model the dense
+# indexes were created with, so the vectors can be searched and upserted
+# in place of the index's integrated embedding. Texts are embedded in
+# batches, only once: vectors are cached per (model, input type, text),
+# and a text already being embedded by another thread is waited for
+# instead of embedded again.
+#=======================================================================
+class PineconeEmbedder:
+    def __init__(self, pc: Any, model: str = EMBED_MODEL, cache: Optional[Any] = None, batch_size: int = EMBED_BATCH_SIZE, api_key: Optional[str] = None):
+        self.pc = pc
+        self.api_key = api_key
+        self.model = model
+        self.batch_size = batch_size
+
+        # Vector cache (embeddings of a text never change for a model)
+        self.cache = cache if cache is not None else MemoryCache(max_size=4096, ttl=86400)
+
+        # Futures of texts being embedded, keyed like the cache
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+
+    #=======================================================================
+    # Returns the query embeddings of texts, in input order
+    #=======================================================================
+    def embed_queries(self, texts: List[str], deadline: Optional[Deadline] = None) -> List[List[float]]:
+        return self._embed(texts, "query", deadline)
+
+
+    #=======================================================================
+    # Returns the document (passage) embeddings of texts, in input order
+    #=======================================================================
+    def embed_documents(self, texts: List[str], deadline: Optional[Deadline] = None) -> List[List[float]]:
+        return self._embed(texts, "passage", deadline)
+
+
+    #=======================================================================
+    # Embeds the distinct texts missing from the cache in batches and
+    # returns every text's vector
+    #=======================================================================
+    def _embed(self, texts: List[str], input_type: str, deadline: Optional[Deadline]) -> List[List[float]]:
+        keys = {text: self._cache_key(text, input_type) for text in texts}
+        vectors: Dict[str, List[float]] = {}
+        owned: Dict[str, Future] = {}
+        waiting: Dict[str, Future] = {}
+
+        with self._lock:
+            for text, key in keys.items():
+                vector = self.cache.get(key)
+                if vector is not None:
+                    vectors[text] = vector
+                elif key in self._inflight:
+                    waiting[text] = self._inflight[key]
+                else:
+                    owned[text] = self._inflight[key] = Future()
+
+        metrics.increment("deep_memory_embedding_texts_total", amount=len(vectors), source="cache", input_type=input_type)
+        metrics.increment("deep_memory_embedding_texts_total", amount=len(owned), source="model", input_type=input_type)
+
+        try:
+            pending = list(owned)
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                for text, vector in zip(batch, self._embed_batch(batch, input_type, deadline)):
+                    self.cache.set(keys[text], vector)
+                    owned[text].set_result(vector)
+                    vectors[text] = vector
+        except Exception as e:
+            for future in owned.values():
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                for text in owned:
+                    self._inflight.pop(keys[text], None)
+
+        remaining = deadline.remaining() if deadline is not None else None
+        for text, future in waiting.items():
+            vectors[text] = future.result(timeout=remaining)
+
+        return [vectors[text] for text in texts]
+
+
+    #=======================================================================
+    # Embeds one batch of texts with Pinecone Inference
+    #=======================================================================
+    @timed("embedding")
+    @resilient("pinecone.embed", "pinecone_inference")
+    def _embed_batch(self, texts: List[str], input_type: str, deadline: Optional[Deadline] = None) -> List[List[float]]:
+        if deadline is not None:
+            deadline.check("embedding")
+        embeddings = self.pc.inference.embed(
+            model=self.model,
+            inputs=texts,
+            parameters={
+                "input_type": input_type,
+                "truncate": "END"
+            }
+        )
+        return [list(embedding["values"]) for embedding in embeddings]
+
+
+    #=======================================================================
+    # Returns the cache key of a text's embedding
+    #=======================================================================
+    def _cache_key(self, text: str, input_type: str) -> str:
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return make_key("embedding", self.model, input_type, text_hash)
@@ -1,19 +1,80 @@
-from pinecone import Pinecone
-from typing import List, Dict, Any
-from tenacity import (
-    retry,
-    stop_after_attempt,
-    wait_random_exponential,
-)
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+from pinecone.exceptions import NotFoundException
+from .pinecone_registry import PineconeRegistry, pinecone_registry
+from .pinecone_embedder import PineconeEmbedder, EMBED_MODEL
+from .storage_backend import StorageBackend
+from ..cache import MemoryCache, make_key
+from ..deadline import Deadline
+from ..metrics import metrics
+from ..resilience import Hedge, get_circuit_breaker, resilient
+import hashlib
+
+
+# Deep memory indexes
+INDEX_NAMES = [
+    "deep-memory-memo",
+    "deep-memory-page",
+    "deep-memory-memo-sparse",
+    "deep-memory-page-sparse"
+]
+
+# Indexes embedding their records with EMBED_MODEL
+DENSE_INDEX_NAMES = ["deep-memory-memo", "deep-memory-page"]
+
+# Where dense index queries and records are embedded
+EMBEDDING_MODES = ["integrated", "client"]
+
+# Seconds Pinecone may take to make upserted or deleted records searchable
+INDEXING_DELAY = 10.0
+
+# Records copied per fetch and upsert when migrating a namespace
+MIGRATION_BATCH_SIZE = 50
 
 
 #=======================================================================
 # Pinecone provider
+#
+# With embedding="integrated" the dense indexes embed query and record
+# text themselves. With embedding="client" the provider embeds them with
+# the same model through Pinecone Inference (see PineconeEmbedder) and
+# searches and upserts vectors, so each distinct query is embedded once
+# per process however many indexes, legs and searches use it.
 #=======================================================================
-class PineconeProvider:
-    def __init__(self, api_key: str):
-        self.pc = Pinecone(api_key=api_key)
-        self._initialize_indexes()
+class PineconeProvider(StorageBackend):
+    def __init__(
+            self,
+            api_key: str,
+            registry: PineconeRegistry = pinecone_registry,
+            result_cache: Optional[Any] = None,
+            search_hedge: Optional[Hedge] = None,
+            embedding: str = "integrated",
+            embedding_cache: Optional[Any] = None,
+            indexing_delay: float = INDEXING_DELAY,
+            **fusion_options
+        ):
+        if embedding not in EMBEDDING_MODES:
+            raise ValueError(f"Unknown embedding mode '{embedding}'. Available modes: {EMBEDDING_MODES}")
+
+        super().__init__(**fusion_options)
+        self.api_key = api_key
+        self.registry = registry
+        self.pc = registry.get_client(api_key)
+        registry.ensure_indexes(api_key, self._initialize_indexes)
+
+        # Search result cache, invalidated by per-index write generations
+        # (the TTL bounds staleness from writes made by other processes).
+        # Writes are indexed asynchronously, so searches within
+        # indexing_delay of a write are not cached.
+        self.result_cache = result_cache if result_cache is not None else MemoryCache(max_size=1024, ttl=300)
+        self.indexing_delay = indexing_delay
+        self._key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+        # Optional hedging of slow searches with a duplicate request
+        self.search_hedge = search_hedge
+
+        # Client-side embedder for the dense indexes (None for integrated embedding)
+        self.embedder = PineconeEmbedder(self.pc, cache=embedding_cache, api_key=api_key) if embedding == "client" else None
 
 
     #=======================================================================
@@ -29,7 +90,7 @@ class PineconeProvider:
                 cloud="aws",
                 region="us-east-1",
                 embed={
-                    "model": "llama-text-embed-v2",
+                    "model": EMBED_MODEL,
                     "field_map": {"text": "chunk_text"}
                 }
             )
@@ -39,7 +100,7 @@ class PineconeProvider:
                 cloud="aws",
                 region="us-east-1",
                 embed={
-                    "model": "llama-text-embed-v2",
+                    "model": EMBED_MODEL,
                     "field_map": {"text": "chunk_text"}
                 }
             )
@@ -68,94 +129,244 @@ class PineconeProvider:
 
 
     #=======================================================================
-    # Upserts records into indexes
+    # Upserts records into indexes (as vectors embedded in one batch when
+    # embedding client-side, falling back to integrated embedding if that
+    # fails)
     #=======================================================================
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
     def upsert_records(self, index_name: str, records: List[Dict[str, Any]], namespace: str = "deep-memory"):
-        index = self.pc.Index(index_name)
+        vectors = None
+        if self._embeds(index_name):
+            try:
+                vectors = self.embedder.embed_documents([record["chunk_text"] for record in records])
+            except Exception as e:
+                print(f"Warning: Record embedding failed, upserting text: {e}")
+
+        if vectors is not None:
+            self._upsert_vectors(index_name, records, vectors, namespace)
+        else:
+            self._upsert_records(index_name, records, namespace)
+        self.registry.bump_generation(self.api_key, index_name, namespace)
+
+
+    #=======================================================================
+    # Upserts records for the index to embed
+    #=======================================================================
+    @resilient("pinecone.upsert_records", "pinecone")
+    def _upsert_records(self, index_name: str, records: List[Dict[str, Any]], namespace: str):
+        index = self.registry.get_index(self.api_key, index_name)
         index.upsert_records(records=records, namespace=namespace)
 
 
     #=======================================================================
-    # Searches indexes with text queries
+    # Upserts records with their embeddings, storing their other fields
+    # as metadata like integrated upserts do
+    #=======================================================================
+    @resilient("pinecone.upsert_vectors", "pinecone")
+    def _upsert_vectors(self, index_name: str, records: List[Dict[str, Any]], vectors: List[List[float]], namespace: str):
+        index = self.registry.get_index(self.api_key, index_name)
+        index.upsert(
+            vectors=[{
+                "id": record["_id"],
+                "values": vector,
+                "metadata": {field: value for field, value in record.items() if field != "_id"}
+            } for record, vector in zip(records, vectors)],
+            namespace=namespace
+        )
+
+
+    #=======================================================================
+    # Embeds the distinct query texts of a research run in one batch, so
+    # their searches find the vectors cached (no-op for integrated
+    # embedding; on failure each search embeds its own query)
+    #=======================================================================
+    def prepare_queries(self, query_texts: List[str], deadline: Optional[Deadline] = None) -> None:
+        if self.embedder is None or not query_texts:
+            return
+        try:
+            self.embedder.embed_queries(list(dict.fromkeys(query_texts)), deadline=deadline)
+        except Exception as e:
+            print(f"Warning: Batched query embedding failed: {e}")
+
+
+    #=======================================================================
+    # Searches indexes with text queries, serving repeated searches from
+    # the result cache until the index is written to (hedged if a search
+    # hedge is configured). Results are not cached while a recent write
+    # may still be indexing.
+    #=======================================================================
+    def search_text(self, index_name: str, query_text: str, top_k: int = 5, namespace: str = "deep-memory", deadline: Optional[Deadline] = None):
+        key = make_key(
+            "search_text", self._key_hash, index_name, namespace, query_text, top_k,
+            self.registry.generation(self.api_key, index_name, namespace)
+        )
+        results = self.result_cache.get(key)
+        if results is None:
+            query = self._search_query(index_name, query_text, top_k, deadline)
+            if self.search_hedge is not None:
+                results = self.search_hedge.call(self._search_text, index_name, query, namespace, deadline=deadline)
+            else:
+                results = self._search_text(index_name, query, namespace, deadline=deadline)
+            if not self._indexing(index_name, namespace):
+                self.result_cache.set(key, results)
+
+        return results
+
+
     #=======================================================================
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
-    def search_text(self, index_name: str, query_text: str, top_k: int = 5, namespace: str = "deep-memory"):
-        index = self.pc.Index(index_name)
+    # Returns the search query for a text: its embedding when embedding
+    # client-side (falling back to the text if embedding fails), else the
+    # text for the index to embed
+    #=======================================================================
+    def _search_query(self, index_name: str, query_text: str, top_k: int, deadline: Optional[Deadline]) -> Dict[str, Any]:
+        if self._embeds(index_name):
+            try:
+                vector = self.embedder.embed_queries([query_text], deadline=deadline)[0]
+                return {"top_k": top_k, "vector": {"values": vector}}
+            except Exception as e:
+                print(f"Warning: Query embedding failed, searching by text: {e}")
+
+        return {"top_k": top_k, "inputs": {"text": query_text}}
+
+
+    #=======================================================================
+    # Searches indexes with a text or vector query
+    #=======================================================================
+    @resilient("pinecone.search_text", "pinecone")
+    def _search_text(self, index_name: str, query: Dict[str, Any], namespace: str = "deep-memory", deadline: Optional[Deadline] = None):
+        if deadline is not None:
+            deadline.check("search")
+        index = self.registry.get_index(self.api_key, index_name)
         results = index.search(
-            query={
-                "top_k": top_k,
-                "inputs": {
-                    "text": query_text
-                }
-            },
+            query=query,
             namespace=namespace
         )
         return results
 
 
+    #=======================================================================
+    # Returns whether an index namespace was written to recently enough
+    # that Pinecone may not have indexed the write yet
+    #=======================================================================
+    def _indexing(self, index_name: str, namespace: str) -> bool:
+        return self.registry.written_within(self.api_key, index_name, namespace, self.indexing_delay)
+
+
+    #=======================================================================
+    # Returns whether records and queries of an index are embedded here
+    #=======================================================================
+    def _embeds(self, index_name: str) -> bool:
+        return self.embedder is not None and index_name in DENSE_INDEX_NAMES
+
+
     #=======================================================================
     # Clears and recreates all deep memory indexes
     #=======================================================================
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
+    @resilient("pinecone.clear_all_indexes", "pinecone")
     def clear_all_indexes(self):
         """Delete and recreate all deep memory indexes"""
-        index_names = [
-            "deep-memory-memo",
-            "deep-memory-page", 
-            "deep-memory-memo-sparse",
-            "deep-memory-page-sparse"
-        ]
-        
         # Delete existing indexes
         existing_indexes = [index.name for index in self.pc.list_indexes()]
-        for index_name in index_names:
+        for index_name in INDEX_NAMES:
             if index_name in existing_indexes:
                 self.pc.delete_index(index_name)
         
-        # Recreate indexes
-        self._initialize_indexes()
+        # Drop stale index handles and cached results, and recreate indexes
+        self.registry.invalidate(self.api_key)
+        self.registry.bump_all_generations(self.api_key)
+        self.registry.ensure_indexes(self.api_key, self._initialize_indexes)
 
 
     #=======================================================================
-    # Performs hybrid search across dense and sparse indexes with reranking
+    # Deletes a namespace from all deep memory indexes in parallel
+    #=======================================================================
+    def clear_namespace(self, namespace: str):
+        def delete_namespace(index_name: str):
+            index = self.registry.get_index(self.api_key, index_name)
+            try:
+                index.delete_namespace(namespace=namespace)
+            except NotFoundException:
+                # Nothing was ever written to this namespace
+                pass
+            self.registry.bump_generation(self.api_key, index_name, namespace)
+
+        with ThreadPoolExecutor(max_workers=len(INDEX_NAMES)) as executor:
+            for future in [executor.submit(delete_namespace, index_name) for index_name in INDEX_NAMES]:
+                future.result()
+
+
+    #=======================================================================
+    # Moves every record of a namespace into another one in all deep
+    # memory indexes, returning the number of records moved. Records are
+    # copied with their stored vectors and metadata, and the source
+    # namespace is deleted only once every index has been copied, so an
+    # interrupted migration can simply be run again.
     #=======================================================================
-    @retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(6))
-    def hybrid_search(self, query_text: str, dense_index: str, sparse_index: str, top_k: int = 10) -> Dict[str, Any]:
-        dense_results = self.search_text(dense_index, query_text, top_k=top_k*2)
-        sparse_results = self.search_text(sparse_index, query_text, top_k=top_k*2)
-        merged_results = self._merge_search_results(dense_results, sparse_results)
-        reranked_results = self._rerank_results(query_text, merged_results, top_n=top_k)
+    def migrate_namespace(self, source: str, target: str) -> int:
+        moved = 0
+        for index_name in INDEX_NAMES:
+            index = self.registry.get_index(self.api_key, index_name)
+            try:
+                pages = list(index.list(namespace=source, limit=MIGRATION_BATCH_SIZE))
+            except NotFoundException:
+                continue
+
+            for ids in pages:
+                if ids:
+                    moved += self._copy_records(index_name, list(ids), source, target)
+            self.registry.bump_generation(self.api_key, index_name, target)
+
+        for index_name in INDEX_NAMES:
+            try:
+                self.registry.get_index(self.api_key, index_name).delete_namespace(namespace=source)
+            except NotFoundException:
+                pass
+            self.registry.bump_generation(self.api_key, index_name, source)
 
-        return {
-            "query": query_text,
-            "results": reranked_results,
-            "total_found": len(merged_results)
-        }
+        return moved
 
 
     #=======================================================================
-    # Merges and deduplicates search results from dense and sparse indexes
+    # Copies records of an index from one namespace to another
     #=======================================================================
-    def _merge_search_results(self, dense_results, sparse_results) -> List[Dict[str, Any]]:
-        deduped_hits = {hit['_id']: hit for hit in dense_results['result']['hits'] + sparse_results['result']['hits']}.values()
-        sorted_hits = sorted(deduped_hits, key=lambda x: x['_score'], reverse=True)
-        result = [{
-            '_id': hit['_id'],
-            'chunk_text': hit['fields']['chunk_text'],
-            'files': hit['fields'].get('files', []),
-            '_score': hit['_score']
-        } for hit in sorted_hits]
+    @resilient("pinecone.copy_records", "pinecone")
+    def _copy_records(self, index_name: str, ids: List[str], source: str, target: str) -> int:
+        index = self.registry.get_index(self.api_key, index_name)
+        vectors = list(index.fetch(ids=ids, namespace=source).vectors.values())
+        if vectors:
+            index.upsert(vectors=vectors, namespace=target, show_progress=False)
+        return len(vectors)
 
-        return result
+
+    #=======================================================================
+    # Performs hybrid search across dense and sparse indexes with reranking
+    # (results degraded by the deadline, or searched while a write may be
+    # indexing, are not cached). Each leg is
+    # retried on its own, so the search as a whole is not.
+    #=======================================================================
+    def hybrid_search(self, query_text: str, dense_index: str, sparse_index: str, top_k: int = 10, namespace: str = "deep-memory", deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        key = make_key(
+            "hybrid_search", self._key_hash, dense_index, sparse_index, namespace, query_text, top_k,
+            self.fusion, self.fusion_weights, self.rerank_policy, self.rerank_margin, self.rerank_min_confidence,
+            self.registry.generation(self.api_key, dense_index, namespace),
+            self.registry.generation(self.api_key, sparse_index, namespace)
+        )
+        results = self.result_cache.get(key)
+        if results is None:
+            results = super().hybrid_search(query_text, dense_index, sparse_index, top_k, namespace, deadline=deadline)
+            if not results["degraded"] and not self._indexing(dense_index, namespace) and not self._indexing(sparse_index, namespace):
+                self.result_cache.set(key, results)
+
+        return results
 
 
     #=======================================================================
-    # Reranks search results using Pinecone's reranking API
+    # Reranks search results using Pinecone's reranking API, keeping the
+    # fused order if it fails or its circuit is open
     #=======================================================================
     def _rerank_results(self, query_text: str, documents: List[Dict[str, Any]], top_n: int = 10):
         try:
-            reranked = self.pc.inference.rerank(
+            reranked = get_circuit_breaker("pinecone_inference", self.api_key).call(
+                self.pc.inference.rerank,
                 model="bge-reranker-v2-m3",
                 query=query_text,
                 documents=documents,
@@ -175,10 +386,6 @@ class PineconeProvider:
             } for doc in reranked.data]
 
         except Exception as e:
+            metrics.record_error("rerank", e)
             print(f"Reranking failed: {e}")
-            return [{
-                'id': doc['_id'],
-                'text': doc['chunk_text'],
-                'files': doc.get('files', []),
-                'score': doc['_score']
-            } for doc in documents[:top_n]]
\ No newline at end of file
+            return self._format_results(documents, top_n)
\ No newline at end of file
@@ -0,0 +1,125 @@
+import threading
+import time
+from pinecone import Pinecone
+from typing import Dict, Tuple, Callable, Set, Any
+
+
+#=======================================================================
+# Process-wide registry of Pinecone clients and index handles
+#
+# Clients and index handles are cached per API key so that every
+# DeepMemory instance sharing a key reuses the same keep-alive HTTP
+# connection pools, and index existence is checked once per process.
+#=======================================================================
+class PineconeRegistry:
+    def __init__(self, pool_threads: int = 16, connection_pool_maxsize: int = 32):
+        self.pool_threads = pool_threads
+        self.connection_pool_maxsize = connection_pool_maxsize
+
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Pinecone] = {}
+        self._indexes: Dict[Tuple[str, str], Any] = {}
+        self._initialized: Set[str] = set()
+        self._init_locks: Dict[str, threading.Lock] = {}
+        self._generations: Dict[Tuple[str, str, str], int] = {}
+        self._written_at: Dict[Tuple[str, str, str], float] = {}
+        self._epochs: Dict[str, int] = {}
+
+
+    #=======================================================================
+    # Returns the shared Pinecone client for an API key
+    #=======================================================================
+    def get_client(self, api_key: str) -> Pinecone:
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = Pinecone(api_key=api_key, pool_threads=self.pool_threads)
+                self._clients[api_key] = client
+            return client
+
+
+    #=======================================================================
+    # Returns the shared index handle for an API key and index name
+    #=======================================================================
+    def get_index(self, api_key: str, index_name: str) -> Any:
+        key = (api_key, index_name)
+        index = self._indexes.get(key)
+        if index is not None:
+            return index
+
+        # Resolving the index host is a control-plane call, so do it outside the lock
+        index = self.get_client(api_key).Index(
+            index_name,
+            pool_threads=self.pool_threads,
+            connection_pool_maxsize=self.connection_pool_maxsize
+        )
+        with self._lock:
+            return self._indexes.setdefault(key, index)
+
+
+    #=======================================================================
+    # Runs the index initializer once per API key per process
+    #=======================================================================
+    def ensure_indexes(self, api_key: str, initializer: Callable[[], None]) -> None:
+        if api_key in self._initialized:
+            return
+
+        with self._lock:
+            init_lock = self._init_locks.setdefault(api_key, threading.Lock())
+
+        with init_lock:
+            if api_key in self._initialized:
+                return
+            initializer()
+            self._initialized.add(api_key)
+
+
+    #=======================================================================
+    # Returns the write generation of an index namespace as
+    # (API key epoch, namespace write count)
+    #=======================================================================
+    def generation(self, api_key: str, index_name: str, namespace: str) -> Tuple[int, int]:
+        return self._epochs.get(api_key, 0), self._generations.get((api_key, index_name, namespace), 0)
+
+
+    #=======================================================================
+    # Increments the write generation of an index namespace, invalidating
+    # search results cached under earlier generations
+    #=======================================================================
+    def bump_generation(self, api_key: str, index_name: str, namespace: str) -> None:
+        key = (api_key, index_name, namespace)
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            self._written_at[key] = time.monotonic()
+
+
+    #=======================================================================
+    # Returns whether an index namespace was written to in the last
+    # seconds (by this process)
+    #=======================================================================
+    def written_within(self, api_key: str, index_name: str, namespace: str, seconds: float) -> bool:
+        written_at = self._written_at.get((api_key, index_name, namespace))
+        return written_at is not None and time.monotonic() - written_at < seconds
+
+
+    #=======================================================================
+    # Advances the epoch of an API key, invalidating cached results for
+    # every index namespace
+    #=======================================================================
+    def bump_all_generations(self, api_key: str) -> None:
+        with self._lock:
+            self._epochs[api_key] = self._epochs.get(api_key, 0) + 1
+
+
+    #=======================================================================
+    # Drops cached index handles and initialization state for an API key
+    #=======================================================================
+    def invalidate(self, api_key: str) -> None:
+        with self._lock:
+            for key in [key for key in self._indexes if key[0] == api_key]:
+                del self._indexes[key]
+            self._initialized.discard(api_key)
+
+
+# Default registry shared by all providers in the process
+pinecone_registry = PineconeRegistry()
\ No newline at end of file
@@ -0,0 +1,158 @@
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Tuple
+from .fusion import FUSION_METHODS, RERANK_POLICIES, DEFAULT_MARGINS, hits_to_documents, fuse_results, is_ambiguous
+from ..deadline import Deadline, MIN_ATTEMPT_SECONDS
+from ..metrics import metrics
+from ..executors import get_executor
+
+
+#=======================================================================
+# Storage backend interface for the deep memory indexes
+#
+# Backends store records in the four deep-memory-* indexes and answer
+# text searches with Pinecone-shaped responses
+# ({"result": {"hits": [{"_id", "_score", "fields"}]}}). Hybrid search
+# is built on top of search_text and _rerank_results: the dense and
+# sparse legs are fused (reciprocal rank or weighted normalized fusion)
+# and reranked according to rerank_policy ("always", "never", or
+# "ambiguous" to rerank only when the fused ranking is too close to call).
+# Searches take an optional Deadline; the rerank is skipped (and the
+# result marked "degraded") when too little time is left for it.
+#=======================================================================
+class StorageBackend(ABC):
+    def __init__(
+            self,
+            fusion: str = "rrf",
+            fusion_weights: Tuple[float, float] = (1.0, 1.0),
+            rerank_policy: str = "ambiguous",
+            rerank_margin: Optional[float] = None,
+            rerank_min_confidence: float = 0.75
+        ):
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion method '{fusion}'. Available methods: {FUSION_METHODS}")
+        if rerank_policy not in RERANK_POLICIES:
+            raise ValueError(f"Unknown rerank policy '{rerank_policy}'. Available policies: {RERANK_POLICIES}")
+
+        self.fusion = fusion
+        # (dense, sparse) weights
+        self.fusion_weights = list(fusion_weights)
+        self.rerank_policy = rerank_policy
+        # Thresholds on fused scores (in [0, 1]) for the "ambiguous" policy
+        self.rerank_margin = DEFAULT_MARGINS[fusion] if rerank_margin is None else rerank_margin
+        self.rerank_min_confidence = rerank_min_confidence
+
+
+    #=======================================================================
+    # Upserts records into an index
+    #=======================================================================
+    @abstractmethod
+    def upsert_records(self, index_name: str, records: List[Dict[str, Any]], namespace: str = "deep-memory"):
+        pass
+
+
+    #=======================================================================
+    # Prepares to search the given query texts, e.g. by embedding them in
+    # one batch (no-op unless the backend embeds queries itself)
+    #=======================================================================
+    def prepare_queries(self, query_texts: List[str], deadline: Optional[Deadline] = None) -> None:
+        pass
+
+
+    #=======================================================================
+    # Searches an index with a text query (within deadline, if given)
+    #=======================================================================
+    @abstractmethod
+    def search_text(self, index_name: str, query_text: str, top_k: int = 5, namespace: str = "deep-memory", deadline: Optional[Deadline] = None):
+        pass
+
+
+    #=======================================================================
+    # Clears all deep memory indexes
+    #=======================================================================
+    @abstractmethod
+    def clear_all_indexes(self):
+        pass
+
+
+    #=======================================================================
+    # Deletes every record in a namespace of all deep memory indexes
+    #=======================================================================
+    @abstractmethod
+    def clear_namespace(self, namespace: str):
+        pass
+
+
+    #=======================================================================
+    # Reranks merged search results, returning the top_n as
+    # {"id", "text", "files", "score"} dicts
+    #=======================================================================
+    @abstractmethod
+    def _rerank_results(self, query_text: str, documents: List[Dict[str, Any]], top_n: int = 10) -> List[Dict[str, Any]]:
+        pass
+
+
+    #=======================================================================
+    # Performs hybrid search across dense and sparse indexes with reranking
+    #=======================================================================
+    def hybrid_search(self, query_text: str, dense_index: str, sparse_index: str, top_k: int = 10, namespace: str = "deep-memory", deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        # Run the dense and sparse legs in parallel
+        executor = get_executor("search_legs")
+        dense_future = executor.submit(self._search_leg, dense_index, query_text, top_k*2, namespace, deadline)
+        sparse_future = executor.submit(self._search_leg, sparse_index, query_text, top_k*2, namespace, deadline)
+        merged_results = self._merge_search_results(dense_future.result(), sparse_future.result())
+        reranked_results, degraded = self._rank_results(query_text, merged_results, top_n=top_k, deadline=deadline)
+
+        return {
+            "query": query_text,
+            "results": reranked_results,
+            "total_found": len(merged_results),
+            "degraded": degraded
+        }
+
+
+    #=======================================================================
+    # Runs one retrieval leg of a hybrid search, timed per index
+    #=======================================================================
+    def _search_leg(self, index_name: str, query_text: str, top_k: int, namespace: str, deadline: Optional[Deadline] = None):
+        with metrics.span("search_leg", index=index_name):
+            return self.search_text(index_name, query_text, top_k, namespace, deadline=deadline)
+
+
+    #=======================================================================
+    # Fuses the dense and sparse results of a search into one ranking
+    #=======================================================================
+    def _merge_search_results(self, dense_results, sparse_results) -> List[Dict[str, Any]]:
+        return fuse_results(
+            self.fusion,
+            [hits_to_documents(dense_results), hits_to_documents(sparse_results)],
+            self.fusion_weights
+        )
+
+
+    #=======================================================================
+    # Returns the top_n fused results, reranking them if the rerank
+    # policy calls for it, and whether a rerank was skipped because the
+    # deadline left too little time for it
+    #=======================================================================
+    def _rank_results(self, query_text: str, fused: List[Dict[str, Any]], top_n: int = 10, deadline: Optional[Deadline] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        if self.rerank_policy == "always" or (self.rerank_policy == "ambiguous" and is_ambiguous(fused, self.rerank_margin, self.rerank_min_confidence)):
+            if deadline is None or deadline.allows(MIN_ATTEMPT_SECONDS):
+                with metrics.span("rerank"):
+                    return self._rerank_results(query_text, fused, top_n=top_n), False
+
+            metrics.increment("deep_memory_stage_skipped_total", stage="rerank")
+            return self._format_results(fused, top_n), True
+
+        return self._format_results(fused, top_n), False
+
+
+    #=======================================================================
+    # Formats the top_n documents as {"id", "text", "files", "score"} dicts
+    #=======================================================================
+    def _format_results(self, documents: List[Dict[str, Any]], top_n: int = 10) -> List[Dict[str, Any]]:
+        return [{
+            'id': doc['_id'],
+            'text': doc['chunk_text'],
+            'files': doc.get('files', []),
+            'score': doc['_score']
+        } for doc in documents[:top_n]]
@@ -0,0 +1,79 @@
+from typing import Dict, Any
+import re
+from .providers.local_index import tokenize
+
+
+#=======================================================================
+# Research tiers
+#
+# - "fast": a single page hybrid search, no planning or integration
+# - "standard": a low-effort plan capped at two queries per retrieval
+#   approach, integrated at low effort
+# - "deep": the full plan and integration at the default effort
+#=======================================================================
+RESEARCH_MODES: Dict[str, Dict[str, Any]] = {
+    "fast": {"plan": False, "integrate": False, "reasoning_effort": None, "max_queries": None},
+    "standard": {"plan": True, "integrate": True, "reasoning_effort": "low", "max_queries": 2},
+    "deep": {"plan": True, "integrate": True, "reasoning_effort": None, "max_queries": None},
+}
+
+# Words that signal a question needs explanation or comparison
+REASONING_TERMS = {
+    "why", "explain", "compare", "comparison", "difference", "differences", "versus", "vs",
+    "tradeoff", "tradeoffs", "analyze", "analyse", "evaluate"
+}
+
+# Words that signal a question needs some synthesis
+SYNTHESIS_TERMS = {
+    "how", "relationship", "pros", "cons", "summarize", "summarise", "summary", "overview",
+    "plan", "should", "impact", "cause", "causes"
+}
+
+# Words that signal a question spans many memories
+AGGREGATE_TERMS = {"all", "every", "each", "history", "timeline", "everything", "across", "over", "since", "changes", "evolved"}
+
+# Words that signal a question about stored images (fast mode cannot query images)
+IMAGE_TERMS = {"image", "images", "picture", "pictures", "photo", "photos", "screenshot", "screenshots", "diagram", "chart"}
+
+# Words that open simple lookups
+LOOKUP_TERMS = {"what", "who", "when", "where", "which", "is", "did", "does", "do", "was"}
+
+
+#=======================================================================
+# Picks a research tier for a query from cheap local features
+#
+# Short questions that open like lookups go to "fast". Queries that ask
+# for explanation, comparison, synthesis or aggregation over history,
+# or that are long or span several clauses, score points toward
+# "standard" and "deep".
+#=======================================================================
+class QueryRouter:
+    def __init__(self, fast_max_words: int = 12, deep_min_score: int = 3):
+        self.fast_max_words = fast_max_words
+        self.deep_min_score = deep_min_score
+
+
+    #=======================================================================
+    # Returns "fast", "standard" or "deep" for a query
+    #=======================================================================
+    def route(self, query: str) -> str:
+        words = tokenize(query)
+        if not words:
+            return "fast"
+
+        terms = set(words)
+        score = 2 * len(terms & REASONING_TERMS)
+        score += bool(terms & SYNTHESIS_TERMS)
+        score += bool(terms & AGGREGATE_TERMS)
+        score += len(words) > 2 * self.fast_max_words
+
+        # Several questions or clauses in one query
+        score += query.count("?") > 1 or len(re.findall(r"[;,]|\band\b|\bthen\b", query.lower())) >= 2
+
+        if score >= self.deep_min_score:
+            return "deep"
+
+        if score == 0 and len(words) <= self.fast_max_words and words[0] in LOOKUP_TERMS and not terms & IMAGE_TERMS:
+            return "fast"
+
+        return "standard"
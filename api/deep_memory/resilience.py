@@ -0,0 +1,435 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from openai import APIConnectionError
+from urllib3.exceptions import HTTPError as TransportError
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+from tenacity.wait import wait_base
+from .deadline import DeadlineExceeded, stop_at_deadline, wait_within_deadline
+from .metrics import metrics
+from .executors import get_executor
+
+
+# HTTP statuses worth retrying besides 5xx (request timeout, too early, rate limited)
+RETRYABLE_STATUSES = {408, 425, 429}
+
+# Errors raised when a dependency could not be reached (OpenAI's client
+# raises APIConnectionError and APITimeoutError, Pinecone's urllib3 errors)
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError, APIConnectionError, TransportError)
+
+# Longest Retry-After honoured: calls asked to wait longer give up instead of retrying
+MAX_RETRY_AFTER = 120.0
+
+
+#=======================================================================
+# Raised instead of calling a dependency whose circuit is open
+#=======================================================================
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+#=======================================================================
+# Returns an error and the errors it was raised from, outermost first
+#=======================================================================
+def _error_chain(error: BaseException) -> Iterator[BaseException]:
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        yield error
+        error = error.__cause__ or error.__context__
+
+
+#=======================================================================
+# Returns the HTTP status of a failed request, if the error carries one
+# (OpenAI errors have status_code, Pinecone errors have status)
+#=======================================================================
+def error_status(error: BaseException) -> Optional[int]:
+    for cause in _error_chain(error):
+        status = getattr(cause, "status_code", None) or getattr(cause, "status", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+
+#=======================================================================
+# Returns whether a failed call is worth retrying
+#
+# Server errors, timeouts, rate limits and connection failures are
+# retried. Client errors (invalid keys, bad requests, missing indexes),
+# unknown errors, expired deadlines and open circuits are not.
+#=======================================================================
+def is_retryable(error: BaseException) -> bool:
+    for cause in _error_chain(error):
+        if isinstance(cause, (DeadlineExceeded, CircuitOpenError)):
+            return False
+
+    status = error_status(error)
+    if status is not None:
+        return status >= 500 or status in RETRYABLE_STATUSES
+
+    return any(isinstance(cause, TRANSIENT_ERRORS) for cause in _error_chain(error))
+
+
+#=======================================================================
+# Returns whether a failed call should be retried by resilient calls:
+# it is retryable and doesn't ask to wait longer than MAX_RETRY_AFTER
+#=======================================================================
+def should_retry(error: BaseException) -> bool:
+    if not is_retryable(error):
+        return False
+    seconds = retry_after(error)
+    return seconds is None or seconds <= MAX_RETRY_AFTER
+
+
+#=======================================================================
+# Returns whether a failed call suggests its dependency is down (rate
+# limits are per API key, so they don't count against the dependency)
+#=======================================================================
+def is_outage(error: BaseException) -> bool:
+    return is_retryable(error) and error_status(error) != 429
+
+
+#=======================================================================
+# Returns the seconds a failed request asked to wait before retrying
+# (its Retry-After or retry-after-ms header), if any
+#=======================================================================
+def retry_after(error: BaseException) -> Optional[float]:
+    for cause in _error_chain(error):
+        headers = getattr(getattr(cause, "response", None), "headers", None) or getattr(cause, "headers", None)
+        if not headers:
+            continue
+        headers = {str(name).lower(): value for name, value in dict(headers).items()}
+
+        try:
+            if "retry-after-ms" in headers:
+                return max(0.0, float(headers["retry-after-ms"]) / 1000)
+            if "retry-after" in headers:
+                value = headers["retry-after"]
+                try:
+                    return max(0.0, float(value))
+                except ValueError:
+                    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+#=======================================================================
+# Tenacity wait honouring the failed request's Retry-After, falling
+# back to another wait when there is none
+#=======================================================================
+class wait_retry_after(wait_base):
+    def __init__(self, fallback: wait_base, max_wait: float = MAX_RETRY_AFTER):
+        self.fallback = fallback
+        self.max_wait = max_wait
+
+
+    def __call__(self, retry_state: Any) -> float:
+        error = retry_state.outcome.exception() if retry_state.outcome is not None else None
+        seconds = retry_after(error) if error is not None else None
+        if seconds is None:
+            return self.fallback(retry_state)
+        return min(seconds, self.max_wait)
+
+
+#=======================================================================
+# Circuit breaker for one dependency (as used with one API key)
+#
+# Opens after failure_threshold consecutive outage errors (see
+# is_outage), making calls fail fast with CircuitOpenError instead of
+# adding retries to an outage. After reset_timeout seconds one probe
+# call is let through: its success closes the circuit, its failure
+# opens it again.
+#=======================================================================
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0, scope: str = ""):
+        self.name = name
+        self.scope = scope
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+
+    #=======================================================================
+    # Returns whether a call may go ahead (in half-open state, only the
+    # first call after reset_timeout)
+    #=======================================================================
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+
+    #=======================================================================
+    # Raises CircuitOpenError if a call may not go ahead
+    #=======================================================================
+    def before_call(self) -> None:
+        if not self.allow():
+            metrics.increment("deep_memory_circuit_rejections_total", dependency=self.name)
+            raise CircuitOpenError(f"Circuit open for {self.label()}")
+
+
+    #=======================================================================
+    # Records a call that reached the dependency
+    #=======================================================================
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                print(f"Circuit closed for {self.label()}")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+
+    #=======================================================================
+    # Records a failed call, opening the circuit on outage errors past
+    # the threshold (other errors show the dependency is reachable).
+    # Calls cancelled or stopped by their deadline tell nothing either way.
+    #=======================================================================
+    def record_failure(self, error: BaseException) -> None:
+        if not isinstance(error, Exception) or isinstance(error, DeadlineExceeded):
+            with self._lock:
+                self._probing = False
+            return
+        if not is_outage(error):
+            self.record_success()
+            return
+
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+                metrics.increment("deep_memory_circuit_opened_total", dependency=self.name)
+                print(f"Warning: Circuit opened for {self.label()} after {self.failures} failures: {error}")
+
+
+    #=======================================================================
+    # Calls a function through the breaker
+    #=======================================================================
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+
+    #=======================================================================
+    # Awaits a coroutine function through the breaker
+    #=======================================================================
+    async def acall(self, func: Callable, *args, **kwargs) -> Any:
+        self.before_call()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+
+    #=======================================================================
+    # Returns the breaker name for log messages (the dependency and the
+    # API key hash it is scoped to, if any)
+    #=======================================================================
+    def label(self) -> str:
+        return f"{self.name} ({self.scope})" if self.scope else self.name
+
+
+# Circuit breakers by (dependency, API key hash), shared by every provider in the process
+_circuit_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+#=======================================================================
+# Returns the breaker scope of an API key (a short hash, so keys are
+# never logged)
+#=======================================================================
+def key_scope(api_key: Optional[str]) -> str:
+    if not api_key:
+        return ""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+#=======================================================================
+# Returns the process-wide circuit breaker of a dependency used with an
+# API key, creating it on first use
+#
+# Breakers are per API key so that one tenant's failing or rate-limited
+# key does not make calls with every other key fail fast. Each
+# dependency's breakers are exported together as
+# deep_memory_circuit_<name>_* gauges.
+#=======================================================================
+def get_circuit_breaker(name: str, api_key: Optional[str] = None) -> CircuitBreaker:
+    scope = key_scope(api_key)
+    with _circuit_breakers_lock:
+        breaker = _circuit_breakers.get((name, scope))
+        if breaker is None:
+            breaker = _circuit_breakers[(name, scope)] = CircuitBreaker(name, scope=scope)
+            metrics.register_gauges(f"circuit_{name}", functools.partial(_circuit_stats, name))
+        return breaker
+
+
+#=======================================================================
+# Returns the number of open breakers and of breakers of a dependency
+#=======================================================================
+def _circuit_stats(name: str) -> Dict[str, int]:
+    with _circuit_breakers_lock:
+        breakers = [breaker for (dependency, _), breaker in _circuit_breakers.items() if dependency == name]
+    return {"open": sum(breaker.state == "open" for breaker in breakers), "breakers": len(breakers)}
+
+
+#=======================================================================
+# Returns the API key of the provider a method is called on, if any
+#=======================================================================
+def _provider_key(args: tuple) -> Optional[str]:
+    return getattr(args[0], "api_key", None) if args else None
+
+
+#=======================================================================
+# Decorator making a provider call resilient (sync or async)
+#
+# Each attempt goes through the circuit breaker of the dependency and
+# the provider's API key (its api_key attribute). Failed attempts are
+# retried only if should_retry, after the request's Retry-After or else
+# a random exponential backoff, for up to attempts tries and within the
+# call's deadline. The last error is re-raised.
+#=======================================================================
+def resilient(call: str, dependency: str, attempts: int = 6) -> Callable:
+    def decorate(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def guarded(*args, **kwargs):
+                return await get_circuit_breaker(dependency, _provider_key(args)).acall(func, *args, **kwargs)
+        else:
+            @functools.wraps(func)
+            def guarded(*args, **kwargs):
+                return get_circuit_breaker(dependency, _provider_key(args)).call(func, *args, **kwargs)
+
+        return retry(
+            retry=retry_if_exception(should_retry),
+            wait=wait_within_deadline(wait_retry_after(wait_random_exponential(min=1, max=60))),
+            stop=stop_after_attempt(attempts) | stop_at_deadline(),
+            before_sleep=metrics.retry_hook(call),
+            reraise=True
+        )(guarded)
+
+    return decorate
+
+
+#=======================================================================
+# Hedged requests for a tail-latency-sensitive call
+#
+# When a call has not returned after the hedge delay, a duplicate is
+# sent and whichever finishes first successfully wins. The delay is
+# fixed if given, otherwise the given quantile of recent latencies (no
+# hedging until min_samples calls have been seen), so about 1 - quantile
+# of calls are duplicated. Calls are not hedged while the circuit of
+# the dependency (for the API key of the called method's provider) is
+# not closed.
+#=======================================================================
+class Hedge:
+    def __init__(self, call: str, dependency: Optional[str] = None, delay: Optional[float] = None, quantile: float = 0.95, window: int = 200, min_samples: int = 20):
+        self.call_name = call
+        self.dependency = dependency
+        self.fixed_delay = delay
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+
+    #=======================================================================
+    # Returns the current hedge delay (None while there are too few
+    # latency samples)
+    #=======================================================================
+    def delay(self) -> Optional[float]:
+        if self.fixed_delay is not None:
+            return self.fixed_delay
+
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+
+    #=======================================================================
+    # Calls a function, hedging it with a duplicate if it is slow
+    #=======================================================================
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        delay = self.delay()
+        start = time.perf_counter()
+        if delay is None or not self._circuit_closed(func):
+            result = func(*args, **kwargs)
+            self._record(time.perf_counter() - start)
+            return result
+
+        executor = get_executor("hedged_requests")
+        primary = executor.submit(func, *args, **kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            result = primary.result()
+            self._record(time.perf_counter() - start)
+            return result
+
+        # The call is slow: send a duplicate and take the first success
+        metrics.increment("deep_memory_hedged_requests_total", call=self.call_name)
+        pending = {primary, executor.submit(func, *args, **kwargs)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        metrics.increment("deep_memory_hedge_wins_total", call=self.call_name)
+                    self._record(time.perf_counter() - start)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+    #=======================================================================
+    # Returns whether the dependency's circuit for a call is closed
+    #=======================================================================
+    def _circuit_closed(self, func: Callable) -> bool:
+        if self.dependency is None:
+            return True
+        api_key = getattr(getattr(func, "__self__", None), "api_key", None)
+        return get_circuit_breaker(self.dependency, api_key).state == "closed"
+
+
+    #=======================================================================
+    # Records a call latency sample
+    #=======================================================================
+    def _record(self, seconds: float) -> None:
+        with self._lock:
+            self._latencies.append(seconds)
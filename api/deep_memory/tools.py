@@ -1,15 +1,47 @@
-from typing import List, Dict, Any
-from .providers import PineconeProvider, OpenAIProvider
+from typing import List, Dict, Any, Optional
+from .providers import StorageBackend, OpenAIProvider, AsyncOpenAIProvider
+from .cache import make_key
+from .hot_tier import HotTier, interleave_results
+from .deadline import Deadline
+from .metrics import metrics
+from .executors import get_executor
+import asyncio
+import functools
+import hashlib
+
+
+# Storage tools that write, run on their own pool so they never delay searches
+WRITE_TOOLS = {"upsert_records"}
 
 
 #=======================================================================
 # Tools for agents to interact with Pinecone and OpenAI providers
 #=======================================================================
 class Tools:
-    def __init__(self, pinecone_provider: PineconeProvider, openai_provider: OpenAIProvider):
+    def __init__(
+            self,
+            pinecone_provider: StorageBackend,
+            openai_provider: OpenAIProvider,
+            image_cache: Optional[Any] = None,
+            hot_tier: Optional[HotTier] = None,
+            namespace: str = "deep-memory",
+            async_openai_provider: Optional[AsyncOpenAIProvider] = None
+        ):
         self.pinecone_provider = pinecone_provider
         self.openai_provider = openai_provider
 
+        # Optional asyncio provider used by ause_tool for LLM tools
+        self.async_openai_provider = async_openai_provider
+
+        # Namespace isolating this user's records in every index
+        self.namespace = namespace
+
+        # Optional write-through tier of recently written records
+        self.hot_tier = hot_tier
+
+        # Optional cache for image descriptions and image queries
+        self.image_cache = image_cache
+
 
     #=======================================================================
     # Executes a tool by name with given parameters
@@ -23,6 +55,10 @@ class Tools:
     # - "page_hybrid_search": Search page content using hybrid search
     # - "page_vector_search": Search page content using vector search only
     # - "page_keyword_search": Search page content using keyword search only
+    # - "embed_queries": Embed search queries in one batch ahead of searching
+    #
+    # Generation, image query and search tools take an optional deadline
+    # bounding the provider calls (and their retries).
     #=======================================================================
     def use_tool(self, tool_name: str, **kwargs) -> Any:
         tools = {
@@ -34,6 +70,7 @@ class Tools:
             "page_hybrid_search": self._page_hybrid_search_tool,
             "page_vector_search": self._page_vector_search_tool,
             "page_keyword_search": self._page_keyword_search_tool,
+            "embed_queries": self._embed_queries_tool,
         }
 
         if tool_name not in tools:
@@ -44,50 +81,157 @@ class Tools:
         return tool_func(**kwargs)
 
 
+    #=======================================================================
+    # Executes a tool by name without blocking the event loop
+    #
+    # LLM tools ("generate_text", "describe_image", "query_image") await
+    # the async OpenAI provider when one is set. Storage tools run on the
+    # pooled, thread-safe storage clients in the process-wide
+    # "write_tools" or "search_tools" pool (see executors).
+    #=======================================================================
+    async def ause_tool(self, tool_name: str, **kwargs) -> Any:
+        async_tools = {
+            "generate_text": self._agenerate_text_tool,
+            "describe_image": self._adescribe_image_tool,
+            "query_image": self._aquery_image_tool,
+        }
+
+        if tool_name in async_tools and self.async_openai_provider is not None:
+            return await async_tools[tool_name](**kwargs)
+
+        loop = asyncio.get_running_loop()
+        executor = get_executor("write_tools" if tool_name in WRITE_TOOLS else "search_tools")
+        return await loop.run_in_executor(executor, functools.partial(self.use_tool, tool_name, **kwargs))
+
+
     #=======================================================================
     # Generate text using OpenAI
     #=======================================================================
-    def _generate_text_tool(self, prompt: str) -> str:
-        return self.openai_provider.generate_text(prompt)
+    def _generate_text_tool(self, prompt: str, use_cache: bool = True, reasoning_effort: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        return self.openai_provider.generate_text(prompt, use_cache=use_cache, reasoning_effort=reasoning_effort, deadline=deadline)
 
 
     #=======================================================================
     # Describes an image from a URL
     #=======================================================================
     def _describe_image_tool(self, image_url: str) -> str:
-        return self.openai_provider.describe_image(image_url, "What's in this image?")
+        return self._cached_describe_image(image_url, "What's in this image?")
 
 
     #=======================================================================
     # Asks a specific question about an image
     #=======================================================================
-    def _query_image_tool(self, image_url: str, question: str) -> str:
-        return self.openai_provider.describe_image(image_url, question)
+    def _query_image_tool(self, image_url: str, question: str, deadline: Optional[Deadline] = None) -> str:
+        return self._cached_describe_image(image_url, question, deadline)
+
+
+    #=======================================================================
+    # Describes an image with a prompt, using the image cache if set
+    #=======================================================================
+    def _cached_describe_image(self, image_url: str, prompt: str, deadline: Optional[Deadline] = None) -> str:
+        if self.image_cache is None:
+            return self.openai_provider.describe_image(image_url, prompt, deadline=deadline)
+
+        key = self._image_cache_key(image_url, prompt)
+        description = self.image_cache.get(key)
+        if description is None:
+            description = self.openai_provider.describe_image(image_url, prompt, deadline=deadline)
+            self.image_cache.set(key, description)
+
+        return description
+
+
+    #=======================================================================
+    # Generate text using the async OpenAI provider
+    #=======================================================================
+    async def _agenerate_text_tool(self, prompt: str, use_cache: bool = True, reasoning_effort: Optional[str] = None, deadline: Optional[Deadline] = None) -> str:
+        return await self.async_openai_provider.generate_text(prompt, use_cache=use_cache, reasoning_effort=reasoning_effort, deadline=deadline)
+
+
+    #=======================================================================
+    # Describes an image from a URL (async)
+    #=======================================================================
+    async def _adescribe_image_tool(self, image_url: str) -> str:
+        return await self._acached_describe_image(image_url, "What's in this image?")
+
+
+    #=======================================================================
+    # Asks a specific question about an image (async)
+    #=======================================================================
+    async def _aquery_image_tool(self, image_url: str, question: str, deadline: Optional[Deadline] = None) -> str:
+        return await self._acached_describe_image(image_url, question, deadline)
+
+
+    #=======================================================================
+    # Describes an image with a prompt using the async provider, sharing
+    # the image cache with the sync tools
+    #=======================================================================
+    async def _acached_describe_image(self, image_url: str, prompt: str, deadline: Optional[Deadline] = None) -> str:
+        if self.image_cache is None:
+            return await self.async_openai_provider.describe_image(image_url, prompt, deadline=deadline)
+
+        key = self._image_cache_key(image_url, prompt)
+        description = self.image_cache.get(key)
+        if description is None:
+            description = await self.async_openai_provider.describe_image(image_url, prompt, deadline=deadline)
+            self.image_cache.set(key, description)
+
+        return description
+
+
+    #=======================================================================
+    # Builds the image cache key. Inline (data:) images are keyed by a
+    # hash of their content.
+    #=======================================================================
+    def _image_cache_key(self, image_url: str, prompt: str) -> str:
+        image_ref = image_url
+        if image_url.startswith("data:"):
+            image_ref = "sha256:" + hashlib.sha256(image_url.encode("utf-8")).hexdigest()
+
+        return make_key("describe_image", image_ref, prompt, self.openai_provider.vision_model)
     
 
     #=======================================================================
     # Upsert records into a Pinecone index
     #=======================================================================
-    def _upsert_records_tool(self, index_name: str, records: List[Dict[str, Any]], namespace: str = "deep-memory") -> None:
-        self.pinecone_provider.upsert_records(index_name, records, namespace)
+    def _upsert_records_tool(self, index_name: str, records: List[Dict[str, Any]]) -> None:
+        with metrics.span("upsert", index=index_name):
+            self.pinecone_provider.upsert_records(index_name, records, self.namespace)
+        if self.hot_tier is not None:
+            self.hot_tier.add(index_name, records)
 
 
     #=======================================================================
-    # Hybrid search tool (calls pinecone provider)
+    # Embed queries tool (prepares the storage backend to search them)
     #=======================================================================
-    def _hybrid_search_tool(self, query_text: str, dense_index: str, sparse_index: str, top_k: int = 5):
-        return self.pinecone_provider.hybrid_search(query_text, dense_index, sparse_index, top_k)
+    def _embed_queries_tool(self, query_texts: List[str], deadline: Optional[Deadline] = None) -> None:
+        self.pinecone_provider.prepare_queries(query_texts, deadline=deadline)
+
+
+    #=======================================================================
+    # Hybrid search tool (calls pinecone provider, merging in hot tier results)
+    #=======================================================================
+    def _hybrid_search_tool(self, query_text: str, dense_index: str, sparse_index: str, top_k: int = 5, deadline: Optional[Deadline] = None):
+        with metrics.span("hybrid_search", index=dense_index):
+            search_results = self.pinecone_provider.hybrid_search(query_text, dense_index, sparse_index, top_k, self.namespace, deadline=deadline)
+
+        if self.hot_tier is not None:
+            hot_results = self.hot_tier.hybrid_search(query_text, dense_index, sparse_index, top_k)
+            search_results = {**search_results, "results": interleave_results(hot_results, search_results["results"], top_k)}
+
+        return search_results
 
 
     #=======================================================================
     # Memo hybrid search tool
     #=======================================================================
-    def _memo_hybrid_search_tool(self, query_text: str, top_k: int = 5) -> str:
+    def _memo_hybrid_search_tool(self, query_text: str, top_k: int = 5, deadline: Optional[Deadline] = None) -> str:
         search_results = self._hybrid_search_tool(
             query_text=query_text,
             dense_index="deep-memory-memo",
             sparse_index="deep-memory-memo-sparse",
-            top_k=top_k
+            top_k=top_k,
+            deadline=deadline
         )
 
         if not search_results["results"]:
@@ -104,12 +248,13 @@ class Tools:
     #=======================================================================
     # Page hybrid search tool
     #=======================================================================
-    def _page_hybrid_search_tool(self, query_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def _page_hybrid_search_tool(self, query_text: str, top_k: int = 5, deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
         search_results = self._hybrid_search_tool(
             query_text=query_text,
             dense_index="deep-memory-page",
             sparse_index="deep-memory-page-sparse",
-            top_k=top_k
+            top_k=top_k,
+            deadline=deadline
         )
 
         if not search_results["results"]:
@@ -118,6 +263,7 @@ class Tools:
         results = []
         for result in search_results["results"]:
             results.append({
+                "id": result['id'],
                 "text": result['text'],
                 "files": result.get('files', [])
             })
@@ -126,17 +272,29 @@ class Tools:
 
 
     #=======================================================================
-    # Search text helper
+    # Search text helper (merging in hot tier results)
     #=======================================================================
-    def _search_text(self, index_name: str, query_text: str, top_k: int = 5):
-        return self.pinecone_provider.search_text(index_name, query_text, top_k)
+    def _search_text(self, index_name: str, query_text: str, top_k: int = 5, deadline: Optional[Deadline] = None):
+        with metrics.span("search_leg", index=index_name):
+            search_results = self.pinecone_provider.search_text(index_name, query_text, top_k, self.namespace, deadline=deadline)
+
+        if self.hot_tier is not None:
+            hot_hits = [{
+                "_id": result["id"],
+                "_score": result["score"],
+                "fields": {"chunk_text": result["text"], "files": result["files"]}
+            } for result in self.hot_tier.search(index_name, query_text, top_k)]
+            hits = interleave_results(hot_hits, search_results["result"]["hits"], top_k, id_key="_id")
+            search_results = {"result": {"hits": hits}}
+
+        return search_results
 
 
     #=======================================================================
     # Page vector search tool
     #=======================================================================
-    def _page_vector_search_tool(self, query_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        search_results = self._search_text("deep-memory-page", query_text, top_k=top_k)
+    def _page_vector_search_tool(self, query_text: str, top_k: int = 5, deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        search_results = self._search_text("deep-memory-page", query_text, top_k=top_k, deadline=deadline)
 
         if not search_results["result"]["hits"]:
             return []
@@ -144,6 +302,7 @@ class Tools:
         results = []
         for hit in search_results["result"]["hits"]:
             results.append({
+                "id": hit['_id'],
                 "text": hit['fields']['chunk_text'],
                 "files": hit['fields'].get('files', [])
             })
@@ -154,8 +313,8 @@ class Tools:
     #=======================================================================
     # Page keyword search tool
     #=======================================================================
-    def _page_keyword_search_tool(self, query_text: str, top_k: int = 5) -> List[Dict[str, Any]]:
-        search_results = self._search_text("deep-memory-page-sparse", query_text, top_k=top_k)
+    def _page_keyword_search_tool(self, query_text: str, top_k: int = 5, deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
+        search_results = self._search_text("deep-memory-page-sparse", query_text, top_k=top_k, deadline=deadline)
 
         if not search_results["result"]["hits"]:
             return []
@@ -163,6 +322,7 @@ class Tools:
         results = []
         for hit in search_results["result"]["hits"]:
             results.append({
+                "id": hit['_id'],
                 "text": hit['fields']['chunk_text'],
                 "files": hit['fields'].get('files', [])
             })
@@ -1,5 +1,8 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
+import atexit
 import json
+import queue
+import threading
 import sys
 import redis
 import uuid
@@ -8,7 +11,9 @@ from textwrap import dedent
 
 # Import DeepMemory module
 sys.path.insert(0, os.path.dirname(__file__))
-from deep_memory import DeepMemory
+from deep_memory import DeepMemory, MemorizationQueue, PartialFailure, configure_executors, executor_stats, InstanceCache, MemoryCache, RedisCache, TieredCache, Deadline, Hedge, metrics
+from deep_memory.providers import LocalProvider
+from deep_memory.query_router import RESEARCH_MODES
 
 
 #=======================================================================
@@ -20,20 +25,229 @@ app = Flask(__name__)
 redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
 r = redis.from_url(redis_url, decode_responses=True)
 
-# Dictionary of user DeepMemory instances
-deep_memory_instances = {}
+# Shared cache of image descriptions and image query answers
+image_cache = TieredCache([
+    MemoryCache(max_size=1024, ttl=86400),
+    RedisCache(r, prefix="deep-memory:image:", ttl=7 * 86400)
+])
+
+# Optional shared cache of agent LLM generations (plans, integrations, abstracts), enabled by a GENERATION_CACHE_TTL above 0
+generation_cache_ttl = int(os.getenv('GENERATION_CACHE_TTL', '0'))
+generation_cache = TieredCache([
+    MemoryCache(max_size=512, ttl=generation_cache_ttl),
+    RedisCache(r, prefix="deep-memory:generation:", ttl=generation_cache_ttl)
+]) if generation_cache_ttl > 0 else None
+
+# Hybrid search fusion method ("rrf" or "weighted") and rerank policy ("always", "never" or "ambiguous")
+hybrid_fusion = os.getenv('HYBRID_FUSION', 'rrf')
+rerank_policy = os.getenv('RERANK_POLICY', 'ambiguous')
+
+# Token budget for the evidence given to the integration prompt
+evidence_token_budget = int(os.getenv('EVIDENCE_TOKEN_BUDGET', '8000'))
+
+# Hedged Pinecone searches shared by all users: SEARCH_HEDGE=auto sends a duplicate of searches
+# slower than the p95 search latency, a number of seconds hedges after that fixed delay, off disables
+search_hedge_setting = os.getenv('SEARCH_HEDGE', 'off')
+search_hedge = None if search_hedge_setting == 'off' else Hedge(
+    "pinecone.search_text",
+    dependency="pinecone",
+    delay=None if search_hedge_setting == 'auto' else float(search_hedge_setting)
+)
+
+# Where dense index queries and records are embedded: "integrated" (by Pinecone at each search and upsert)
+# or "client" (batched through Pinecone Inference, with vectors cached across users)
+pinecone_embedding = os.getenv('PINECONE_EMBEDDING', 'integrated')
+embedding_cache = MemoryCache(max_size=8192, ttl=86400) if pinecone_embedding == 'client' else None
+
+# Per-request time limits in seconds (0 disables): research returns the evidence found so far
+# by RESEARCH_DEADLINE, and the whole chat request (research and answer) ends by REQUEST_DEADLINE
+research_deadline_seconds = float(os.getenv('RESEARCH_DEADLINE', '60'))
+request_deadline_seconds = float(os.getenv('REQUEST_DEADLINE', '120'))
+
+# Thread counts of the process-wide storage pools (see deep_memory/executors.py): concurrent hybrid
+# searches from async research are capped at min(SEARCH_TOOL_THREADS, SEARCH_LEG_THREADS / 2)
+configure_executors(
+    search_legs=int(os.getenv('SEARCH_LEG_THREADS', '32')),
+    search_tools=int(os.getenv('SEARCH_TOOL_THREADS', '64')),
+    write_tools=int(os.getenv('WRITE_TOOL_THREADS', '16')),
+    hedged_requests=int(os.getenv('HEDGE_THREADS', '32'))
+)
+
+# Pinecone search results shared by all users (keyed by API key hash and invalidated by writes)
+search_cache = MemoryCache(max_size=4096, ttl=300)
+
+# Optional local storage backend shared by all users (DEEP_MEMORY_STORAGE=local)
+storage_backend = LocalProvider(
+    path=os.getenv('DEEP_MEMORY_STORAGE_PATH', '.deep-memory'),
+    fusion=hybrid_fusion
+) if os.getenv('DEEP_MEMORY_STORAGE', 'pinecone') == 'local' else None
+if storage_backend is not None:
+    atexit.register(storage_backend.flush)
+
+# Where memorization jobs run: "local" (in-process workers) or "redis" (a separate api/memorize_worker.py
+# process, with the hot tier of recent writes shared through Redis so this process sees its writes)
+memorize_backend = os.getenv('MEMORIZE_BACKEND', 'local')
+
+# Redis key prefix for pending memories of evicted DeepMemory instances
+PENDING_MEMORIES_PREFIX = "pending-memories:"
+
+
+#=======================================================================
+# Persists pending memories of an evicted DeepMemory instance to Redis
+#=======================================================================
+def persist_pending_memories(user_id: str, dm: DeepMemory):
+    memories = dm.take_memories()
+    if not memories:
+        return
+
+    key = PENDING_MEMORIES_PREFIX + user_id
+    r.rpush(key, *[json.dumps(memory) for memory in memories])
+    r.expire(key, 3600)
+
+
+#=======================================================================
+# Restores pending memories persisted for a user
+#=======================================================================
+def restore_pending_memories(user_id: str) -> list:
+    key = PENDING_MEMORIES_PREFIX + user_id
+    pipe = r.pipeline()
+    pipe.lrange(key, 0, -1)
+    pipe.delete(key)
+    stored, _ = pipe.execute()
+    return [json.loads(memory) for memory in stored]
+
+
+# Bounded cache of user DeepMemory instances
+deep_memory_instances = InstanceCache(
+    max_size=int(os.getenv('DEEP_MEMORY_MAX_INSTANCES', '256')),
+    idle_ttl=int(os.getenv('DEEP_MEMORY_IDLE_TTL', '3600')),
+    on_evict=persist_pending_memories
+)
+
+
+# Namespace of memories stored before per-user namespaces
+LEGACY_NAMESPACE = "deep-memory"
+
+# Seconds a legacy namespace migration may hold its lock
+MIGRATION_LOCK_TTL = 600
+
+
+#=======================================================================
+# Moves memories stored before per-user namespaces (in the legacy
+# namespace of the user's own Pinecone project) into the namespace
+# derived from their Pinecone key, once per key. A Redis lock keeps
+# sessions and processes sharing the key from migrating it twice, and a
+# failed migration is retried by the key's next session. The shared
+# local backend's legacy namespace belongs to no one user, so it is
+# never migrated.
+#=======================================================================
+def migrate_legacy_namespace(dm: DeepMemory) -> None:
+    if storage_backend is not None:
+        return
+
+    done_key = f"deep-memory:migrated:{dm.namespace}"
+    lock_key = f"{done_key}:lock"
+    try:
+        if r.get(done_key) or not r.set(lock_key, "1", nx=True, ex=MIGRATION_LOCK_TTL):
+            return
+    except Exception as e:
+        print(f"Warning: Could not check legacy memory migration: {e}")
+        return
+
+    try:
+        moved = dm.pinecone_provider.migrate_namespace(LEGACY_NAMESPACE, dm.namespace)
+        r.set(done_key, "1")
+        if moved:
+            print(f"Migrated {moved} legacy records into namespace {dm.namespace}")
+    except Exception as e:
+        print(f"Warning: Could not migrate legacy memories: {e}")
+    finally:
+        r.delete(lock_key)
 
 
 #=======================================================================
 # Get or create DeepMemory instance for a user
 #=======================================================================
-def get_deep_memory(user_id: str, pinecone_key: str, openai_key: str) -> DeepMemory:
-    if user_id not in deep_memory_instances:
-        deep_memory_instances[user_id] = DeepMemory(
-            pinecone_api_key=pinecone_key,
-            openai_api_key=openai_key
+def get_deep_memory(user_id: str, credentials: dict) -> DeepMemory:
+    def create() -> DeepMemory:
+        dm = DeepMemory(
+            pinecone_api_key=credentials["pinecone"],
+            openai_api_key=credentials["openAi"],
+            image_cache=image_cache,
+            generation_cache=generation_cache,
+            storage_backend=storage_backend,
+            hot_tier_redis=r if memorize_backend == 'redis' else None,
+            fusion=hybrid_fusion,
+            rerank_policy=rerank_policy,
+            evidence_token_budget=evidence_token_budget,
+            search_hedge=search_hedge,
+            embedding=pinecone_embedding,
+            embedding_cache=embedding_cache,
+            result_cache=search_cache
         )
-    return deep_memory_instances[user_id]
+        return dm
+
+    # Only the instance that wins a concurrent creation takes the persisted memories
+    # (and migrates legacy memories, in the background so the request is not held up)
+    def restore(dm: DeepMemory):
+        dm.memories[:0] = restore_pending_memories(user_id)
+        threading.Thread(target=migrate_legacy_namespace, args=(dm,), daemon=True).start()
+
+    return deep_memory_instances.get_or_create(user_id, create, on_insert=restore)
+
+
+#=======================================================================
+# Hands memories added to an evicted DeepMemory instance (still used by
+# an in-flight request) to the user's cached instance, or persists them
+# for the next one
+#=======================================================================
+def rehome_pending_memories(user_id: str, dm: DeepMemory):
+    current = deep_memory_instances.peek(user_id)
+    if current is dm:
+        return
+
+    if current is None:
+        persist_pending_memories(user_id, dm)
+    else:
+        current.memories.extend(dm.take_memories())
+
+
+#=======================================================================
+# Stores memories for a user (run by the memorization queue workers),
+# raising PartialFailure with the memories that could not be stored so
+# that only those are retried
+#=======================================================================
+def memorize(user_id: str, memories: list, context_window: str) -> dict:
+    credentials = r.hgetall(user_id)
+    if not credentials:
+        raise RuntimeError(f"Credentials for user {user_id} have expired")
+
+    dm = get_deep_memory(user_id, credentials)
+    report = dm.process_memories(context_window, memories=memories)
+    failed = dm.memory_agent.failed_memories(memories, context_window, report)
+    if failed:
+        errors = [error for result in report.values() for error in result["errors"]]
+        raise PartialFailure(report, failed, f"Could not store {len(failed)} of {len(memories)} memories: {errors[0] if errors else 'unknown error'}")
+    return report
+
+
+# Background memorization queue (MEMORIZE_BACKEND=redis lets a separate worker process drain it)
+memorize_queue = MemorizationQueue(
+    process=memorize,
+    redis_client=r if memorize_backend == 'redis' else None,
+    worker_id=os.getenv('MEMORIZE_WORKER_ID')
+)
+atexit.register(memorize_queue.shutdown)
+
+# Export shared cache and instance counters alongside the stage metrics
+metrics.register_gauges("image_cache", image_cache.stats)
+metrics.register_gauges("instance_cache", deep_memory_instances.stats)
+metrics.register_gauges("search_cache", search_cache.stats)
+metrics.register_gauges("executors", executor_stats)
+if generation_cache is not None:
+    metrics.register_gauges("generation_cache", generation_cache.stats)
+if embedding_cache is not None:
+    metrics.register_gauges("embedding_cache", embedding_cache.stats)
 
 
 #=======================================================================
@@ -55,70 +269,184 @@ def format_conversation_memory(messages: list) -> str:
     return "\n\n".join(formatted)
 
 
+#=======================================================================
+# Build the chat prompt with research context
+#=======================================================================
+def build_research_prompt(user_query: str, research_result: str) -> str:
+    return dedent(f"""
+        === RESEARCH CONTEXT ===
+        The following information was retrieved from your long-term memory system:
+
+        {research_result}
+
+        === END RESEARCH CONTEXT ===
+
+        Now, please respond to the user's query using the above context where relevant.
+
+        User Query: {user_query}
+    """).strip()
+
+
+#=======================================================================
+# Format a Server-Sent Event
+#=======================================================================
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+#=======================================================================
+# Parses a chat request body
+#=======================================================================
+def parse_chat_request(json_obj: dict) -> dict:
+    messages = json_obj.get('messages', [])
+    metadata = json_obj.get('metadata', {})
+
+    return {
+        "user_id": str(json_obj.get('id')),
+        # Extract user query
+        "user_query": messages[-1]["content"][0]["text"] if messages else "",
+        # Construct conversation memory
+        "conversation_memory": format_conversation_memory(messages[-2:] if len(messages) >= 2 else messages),
+        "research_enabled": metadata.get('isResearchEnabled', False),
+        "memorize_enabled": metadata.get('isMemorizeEnabled', False),
+        # Research tier override ("fast", "standard" or "deep"); otherwise the query router picks one
+        "research_mode": metadata.get('researchMode') if metadata.get('researchMode') in RESEARCH_MODES else None,
+        "stream_enabled": json_obj.get('stream', False)
+    }
+
+
+#=======================================================================
+# Adds a conversation turn to memory, queueing it for background
+# memorization if enabled. Returns the memorization job id, if any.
+#=======================================================================
+def capture_response(dm: DeepMemory, user_id: str, conversation_memory: str, response_text: str, memorize_enabled: bool):
+    conversation_with_response = conversation_memory + f"\n\nASSISTANT: {response_text}"
+    dm.add_memory(conversation_with_response)
+
+    if memorize_enabled:
+        return memorize_queue.submit(user_id, dm.take_memories(), context_window="")
+
+    rehome_pending_memories(user_id, dm)
+    return None
+
+
+#=======================================================================
+# Returns the research and request deadlines of a chat request started now
+#=======================================================================
+def request_deadlines() -> tuple:
+    request_deadline = Deadline(request_deadline_seconds if request_deadline_seconds > 0 else None)
+    limits = [seconds for seconds in (research_deadline_seconds, request_deadline_seconds) if seconds > 0]
+    research_deadline = Deadline(min(limits) if limits else None)
+    return research_deadline, request_deadline
+
+
 #=======================================================================
 # Chat API endpoint
 #=======================================================================
 @app.route("/api/python", methods=["GET", "POST"])
 def call_chatgpt():
+    research_deadline, request_deadline = request_deadlines()
+
     # Parse request data
     decoded = request.data.decode("utf-8")
-    json_obj = json.loads(decoded)
-    messages = json_obj.get('messages', [])
-    metadata = json_obj.get('metadata', {})
-    user_id = str(json_obj.get('id'))
-    research_enabled = metadata.get('isResearchEnabled', False)
-    memorize_enabled = metadata.get('isMemorizeEnabled', False)
-    
+    chat = parse_chat_request(json.loads(decoded))
+    user_id = chat["user_id"]
+    user_query = chat["user_query"]
+
     # Get credentials from Redis
     credentials = r.hgetall(user_id)
 
     # Get DeepMemory instance for user
-    dm = get_deep_memory(
-        user_id=user_id,
-        pinecone_key=credentials["pinecone"],
-        openai_key=credentials["openAi"]
-    )
-
-    # Extract user query
-    user_query = messages[-1]["content"][0]["text"] if messages else ""
-    prompt = user_query
+    dm = get_deep_memory(user_id, credentials)
 
-    # Construct conversation memory
-    conversation_memory = format_conversation_memory(messages[-2:] if len(messages) >= 2 else messages)
+    if chat["stream_enabled"]:
+        return stream_chat(dm, user_id, user_query, chat["conversation_memory"], chat["research_enabled"], chat["memorize_enabled"], chat["research_mode"], research_deadline, request_deadline)
+
+    prompt = user_query
 
     # Perform deep research if enabled
-    if research_enabled:
-        research_result = dm.research(user_query)
-        
-        # Format research context
-        research_context = dedent(f"""
-            === RESEARCH CONTEXT ===
-            The following information was retrieved from your long-term memory system:
+    if chat["research_enabled"]:
+        research_result = dm.research(user_query, mode=chat["research_mode"], deadline=research_deadline)
+        prompt = build_research_prompt(user_query, research_result)
 
-            {research_result}
+    # Generate chat response using OpenAI
+    response_text = dm.openai_provider.generate_text(prompt, use_cache=False, deadline=request_deadline)
 
-            === END RESEARCH CONTEXT ===
+    # Add conversation and response to memory, queueing it for background processing if enabled
+    job_id = capture_response(dm, user_id, chat["conversation_memory"], response_text, chat["memorize_enabled"])
+    if job_id is not None:
+        return {"text": response_text, "memorizeJobId": job_id}
 
-            Now, please respond to the user's query using the above context where relevant.
+    # Return chat response
+    return {"text": response_text}
 
-            User Query: {user_query}
-        """).strip()
 
-        prompt = research_context
+#=======================================================================
+# Streams a chat response as Server-Sent Events
+#
+# Emits "progress" events during research, a "token" event per text
+# delta and a final "done" event. The answer ends early when the
+# request deadline expires. Memory capture runs once the response has
+# closed, and only if the "done" event was produced (not when the
+# client disconnected or the answer failed).
+#=======================================================================
+def stream_chat(dm: DeepMemory, user_id: str, user_query: str, conversation_memory: str, research_enabled: bool, memorize_enabled: bool, research_mode: str, research_deadline: Deadline = None, request_deadline: Deadline = None) -> Response:
+    chunks = []
+    completed = threading.Event()
 
-    # Generate chat response using OpenAI
-    response_text = dm.openai_provider.generate_text(prompt)
+    def generate():
+        prompt = user_query
 
-    # Add conversation and response to memory
-    conversation_with_response = conversation_memory + f"\n\nASSISTANT: {response_text}"
-    dm.add_memory(conversation_with_response)
+        # Run research in the background, forwarding its progress events
+        if research_enabled:
+            events = queue.Queue()
+            research = {}
 
-    # If memorize is enabled, process and store memories
-    if memorize_enabled:
-        dm.process_memories(context_window="")
+            def run_research():
+                try:
+                    research["result"] = dm.research(
+                        user_query,
+                        on_progress=lambda stage, detail: events.put({"stage": stage, **detail}),
+                        mode=research_mode,
+                        deadline=research_deadline
+                    )
+                except Exception as e:
+                    research["error"] = e
+                finally:
+                    events.put(None)
 
-    # Return chat response
-    return {"text": response_text}
+            threading.Thread(target=run_research, daemon=True).start()
+            while (event := events.get()) is not None:
+                yield format_sse("progress", event)
+
+            if "error" in research:
+                yield format_sse("error", {"message": str(research["error"])})
+                return
+
+            prompt = build_research_prompt(user_query, research["result"])
+
+        # Stream generated tokens
+        try:
+            for delta in dm.openai_provider.stream_text(prompt, deadline=request_deadline):
+                chunks.append(delta)
+                yield format_sse("token", {"text": delta})
+        except Exception as e:
+            yield format_sse("error", {"message": str(e)})
+            return
+
+        completed.set()
+        yield format_sse("done", {"text": "".join(chunks)})
+
+    # Capture the completed conversation in memory after the stream closes
+    def capture_memory():
+        if completed.is_set() and chunks:
+            capture_response(dm, user_id, conversation_memory, "".join(chunks), memorize_enabled)
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(capture_memory)
+    return response
 
 
 #=======================================================================
@@ -145,10 +473,34 @@ def clear_memory():
     decoded = request.data.decode("utf-8")
     json_obj = json.loads(decoded)
     user_id = str(json_obj.get('id'))
-    
-    if user_id in deep_memory_instances:
-        dm = deep_memory_instances[user_id]
+    credentials = r.hgetall(user_id)
+
+    if credentials:
+        dm = get_deep_memory(user_id, credentials)
         dm.clear_memories()
         return jsonify(isError=False, message="Memories cleared", statusCode=200), 200
     
-    return jsonify(isError=True, message="No memories found", statusCode=404), 404
\ No newline at end of file
+    return jsonify(isError=True, message="No memories found", statusCode=404), 404
+
+
+#=======================================================================
+# Memorization job status API endpoint
+#=======================================================================
+@app.route("/api/memorize-status", methods=["POST"])
+def memorize_status():
+    decoded = request.data.decode("utf-8")
+    json_obj = json.loads(decoded)
+    job = memorize_queue.status(str(json_obj.get('jobId')))
+
+    if job is None:
+        return jsonify(isError=True, message="Job not found", statusCode=404), 404
+
+    return jsonify(isError=False, message="Success", statusCode=200, data=job), 200
+
+
+#=======================================================================
+# Metrics API endpoint (Prometheus text format)
+#=======================================================================
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# Import the app's memorization queue (configured with MEMORIZE_BACKEND=redis)
+sys.path.insert(0, os.path.dirname(__file__))
+from index import memorize_queue
+
+
+#=======================================================================
+# Drains queued memorization jobs from Redis
+#=======================================================================
+if __name__ == "__main__":
+    try:
+        memorize_queue.run_worker()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        memorize_queue.shutdown()
\ No newline at end of file
@@ -34,7 +34,7 @@ const attachmentAdapter: AttachmentAdapter = {
 */
 
 const MyModelAdapter: ChatModelAdapter = {
-  async run({ messages, abortSignal }) {
+  async *run({ messages, abortSignal }) {
     const metadata = (window as any).chatMetadata || {
       isResearchEnabled: false,
       isMemorizeEnabled: false,
@@ -48,6 +48,7 @@ const MyModelAdapter: ChatModelAdapter = {
       body: JSON.stringify({
         id: localStorage.getItem("uuid"),
         messages,
+        stream: true,
         metadata: {
           isResearchEnabled: metadata.isResearchEnabled,
           isMemorizeEnabled: metadata.isMemorizeEnabled,
@@ -58,15 +59,34 @@ const MyModelAdapter: ChatModelAdapter = {
 
     window.dispatchEvent(new Event('chatMessageSent'));
 
-    const data = await result.json();
-    return {
-      content: [
-        {
-          type: "text",
-          text: data.text,
-        },
-      ],
-    };
+    // Read Server-Sent Events, yielding the accumulated text as tokens arrive
+    const reader = result.body!.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let text = "";
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split("\n\n");
+      buffer = events.pop() ?? "";
+
+      for (const event of events) {
+        const type = event.match(/^event: (.*)$/m)?.[1];
+        const data = event.match(/^data: (.*)$/m)?.[1];
+        if (!type || !data) continue;
+
+        const payload = JSON.parse(data);
+        if (type === "token") {
+          text += payload.text;
+          yield { content: [{ type: "text", text }] };
+        } else if (type === "error") {
+          throw new Error(payload.message);
+        }
+      }
+    }
   },
 };
 
@@ -0,0 +1,299 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Callable
+
+# Import DeepMemory module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from deep_memory import DeepMemory, Hedge, metrics
+from deep_memory.providers import FakeOpenAIProvider, FakeAsyncOpenAIProvider, FakePineconeProvider
+
+
+# Memories seeded before research and chat benchmarks
+CORPUS = [
+    "The planning agent was moved to gpt-5.1 with medium reasoning effort last sprint.",
+    "Alice owns the Pinecone migration and plans to finish the sparse indexes by Friday.",
+    "Reranking uses bge-reranker-v2-m3 and truncates documents at the end.",
+    "Bob reported that memorization jobs time out when a message has more than five images.",
+    "The hot tier keeps the 200 most recent records for an hour so new memories are searchable at once.",
+    "We decided to cache image descriptions in Redis for a week.",
+    "The research endpoint streams progress events while searches run.",
+    "Carol asked for per-user namespaces so clearing memory does not affect other users.",
+    "The evidence packer keeps the integration prompt under 8000 tokens.",
+    "My dog Rex likes the beach at https://example.com/images/rex-beach.png",
+]
+
+# Research queries (mixed lookups and reasoning questions)
+QUERIES = [
+    "Who owns the Pinecone migration?",
+    "Why do memorization jobs time out?",
+    "How does the hot tier make new memories searchable?",
+    "What reranker do we use and how does it truncate?",
+    "Compare the planning and evidence packing settings and explain the trade-offs.",
+    "What is in the picture of Rex?",
+]
+
+
+#=======================================================================
+# Builds a DeepMemory instance on fake providers
+#=======================================================================
+def build_deep_memory(args: argparse.Namespace) -> DeepMemory:
+    openai_options = dict(
+        text_latency=args.text_latency,
+        image_latency=args.image_latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    return DeepMemory(
+        pinecone_api_key="fake",
+        openai_api_key="fake",
+        storage_backend=FakePineconeProvider(
+            search_latency=args.search_latency,
+            upsert_latency=args.upsert_latency,
+            rerank_latency=args.rerank_latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            seed=args.seed,
+            search_hedge=build_search_hedge(args)
+        ),
+        openai_provider=FakeOpenAIProvider(**openai_options),
+        async_openai_provider=FakeAsyncOpenAIProvider(**openai_options),
+        namespace="benchmark"
+    )
+
+
+#=======================================================================
+# Builds the search hedge selected by --search-hedge (None if off)
+#=======================================================================
+def build_search_hedge(args: argparse.Namespace):
+    if args.search_hedge == "off":
+        return None
+    return Hedge("fake.search_text", dependency="fake_pinecone", delay=None if args.search_hedge == "auto" else float(args.search_hedge))
+
+
+#=======================================================================
+# Builds a DeepMemory instance with the corpus already memorized
+#=======================================================================
+def build_seeded_deep_memory(args: argparse.Namespace) -> DeepMemory:
+    dm = build_deep_memory(args)
+    dm.process_memories("", memories=[{"text": text, "files": re.findall(r"https://\S+\.png", text)} for text in CORPUS])
+    return dm
+
+
+#=======================================================================
+# Summarizes request latencies (seconds) over a run's wall time
+#=======================================================================
+def summarize(latencies: List[float], errors: int, wall_time: float) -> Dict[str, Any]:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "wall_seconds": wall_time,
+        "throughput_per_second": len(latencies) / wall_time if wall_time else 0.0,
+        "mean_seconds": statistics.fmean(ordered) if ordered else 0.0,
+        "p50_seconds": percentile(0.50),
+        "p95_seconds": percentile(0.95),
+        "p99_seconds": percentile(0.99),
+        "max_seconds": ordered[-1] if ordered else 0.0,
+    }
+
+
+#=======================================================================
+# Runs requests calls of a function at a concurrency level in threads
+#=======================================================================
+def run_threaded(call: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    def timed_call(i: int):
+        start = time.perf_counter()
+        try:
+            call(i)
+            return time.perf_counter() - start
+        except Exception as e:
+            print(f"Warning: Benchmark request {i} failed: {e}")
+            return None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed_call, range(requests)))
+    wall_time = time.perf_counter() - start
+
+    latencies = [latency for latency in results if latency is not None]
+    return summarize(latencies, len(results) - len(latencies), wall_time)
+
+
+#=======================================================================
+# Runs requests calls of a coroutine function at a concurrency level
+# on one event loop
+#=======================================================================
+def run_async(call: Callable[[int], Any], requests: int, concurrency: int) -> Dict[str, Any]:
+    async def run():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed_call(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await call(i)
+                    return time.perf_counter() - start
+                except Exception as e:
+                    print(f"Warning: Benchmark request {i} failed: {e}")
+                    return None
+
+        return await asyncio.gather(*[timed_call(i) for i in range(requests)])
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    wall_time = time.perf_counter() - start
+
+    latencies = [latency for latency in results if latency is not None]
+    return summarize(latencies, len(results) - len(latencies), wall_time)
+
+
+#=======================================================================
+# Measures end-to-end DeepMemory.research latency per mode, engine
+# (thread pool or asyncio) and concurrency level
+#=======================================================================
+def bench_research(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    dm = build_seeded_deep_memory(args)
+    rows = []
+    for mode in args.modes:
+        for engine in args.engines:
+            for concurrency in args.concurrency:
+                metrics.reset()
+                if engine == "async":
+                    result = run_async(lambda i: dm.aresearch(QUERIES[i % len(QUERIES)], mode=mode), args.requests, concurrency)
+                else:
+                    result = run_threaded(lambda i: dm.research(QUERIES[i % len(QUERIES)], mode=mode), args.requests, concurrency)
+                rows.append({"mode": mode, "engine": engine, "concurrency": concurrency, **result, "metrics": metrics.snapshot()})
+                print(f"research mode={mode} engine={engine} concurrency={concurrency}: p50={result['p50_seconds']:.3f}s p95={result['p95_seconds']:.3f}s")
+    return rows
+
+
+#=======================================================================
+# Measures process_memories throughput per batch size
+#=======================================================================
+def bench_process_memories(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    rows = []
+    for batch_size in args.batch_sizes:
+        dm = build_deep_memory(args)
+        memories = [{"text": CORPUS[i % len(CORPUS)] + f" (note {i})", "files": []} for i in range(batch_size)]
+
+        metrics.reset()
+        start = time.perf_counter()
+        report = dm.process_memories("", memories=memories)
+        wall_time = time.perf_counter() - start
+
+        failed = sum(len(index_report["failed_ids"]) for index_report in report.values())
+        rows.append({
+            "batch_size": batch_size,
+            "wall_seconds": wall_time,
+            "memories_per_second": batch_size / wall_time if wall_time else 0.0,
+            "failed_records": failed,
+            "metrics": metrics.snapshot()
+        })
+        print(f"process_memories batch={batch_size}: {batch_size / wall_time:.1f} memories/s")
+    return rows
+
+
+#=======================================================================
+# Measures /api/python request latency (research enabled) through the
+# Flask app per concurrency level
+#=======================================================================
+def bench_chat_api(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    import index
+
+    # Serve every user from one seeded instance instead of Redis credentials
+    dm = build_seeded_deep_memory(args)
+
+    class CredentialStore:
+        def hgetall(self, user_id: str) -> Dict[str, str]:
+            return {"pinecone": "fake", "openAi": "fake"}
+
+    index.r = CredentialStore()
+    index.get_deep_memory = lambda user_id, credentials: dm
+
+    def post(i: int):
+        body = {
+            "id": f"benchmark-{i}",
+            "messages": [{"role": "user", "content": [{"type": "text", "text": QUERIES[i % len(QUERIES)]}]}],
+            "metadata": {"isResearchEnabled": True, "isMemorizeEnabled": False}
+        }
+        response = index.app.test_client().post("/api/python", data=json.dumps(body))
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    rows = []
+    for concurrency in args.concurrency:
+        metrics.reset()
+        result = run_threaded(post, args.requests, concurrency)
+        rows.append({"concurrency": concurrency, **result, "metrics": metrics.snapshot()})
+        print(f"/api/python concurrency={concurrency}: p50={result['p50_seconds']:.3f}s p95={result['p95_seconds']:.3f}s")
+    return rows
+
+
+#=======================================================================
+# Parses a comma-separated list
+#=======================================================================
+def parse_list(value: str, cast: Callable = str) -> list:
+    return [cast(item) for item in value.split(",") if item]
+
+
+#=======================================================================
+# Runs the selected benchmarks and writes the results as JSON
+#=======================================================================
+def main():
+    parser = argparse.ArgumentParser(description="Offline DeepMemory benchmarks on latency-injecting fake providers")
+    parser.add_argument("--benchmarks", type=parse_list, default=["research", "process_memories", "chat_api"], help="research,process_memories,chat_api")
+    parser.add_argument("--modes", type=parse_list, default=["fast", "standard", "deep"], help="research modes")
+    parser.add_argument("--engines", type=parse_list, default=["sync", "async"], help="sync (thread pool) and/or async (asyncio)")
+    parser.add_argument("--concurrency", type=lambda v: parse_list(v, int), default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=16, help="requests per concurrency level")
+    parser.add_argument("--batch-sizes", type=lambda v: parse_list(v, int), default=[8, 32, 128])
+    parser.add_argument("--text-latency", type=float, default=0.2)
+    parser.add_argument("--image-latency", type=float, default=0.1)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--upsert-latency", type=float, default=0.05)
+    parser.add_argument("--rerank-latency", type=float, default=0.03)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--search-hedge", default="off", help="off, auto (p95 latency) or a hedge delay in seconds")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json"))
+    args = parser.parse_args()
+
+    benchmarks = {
+        "research": bench_research,
+        "process_memories": bench_process_memories,
+        "chat_api": bench_chat_api,
+    }
+    for name in args.benchmarks:
+        if name not in benchmarks:
+            raise ValueError(f"Unknown benchmark '{name}'. Available benchmarks: {list(benchmarks)}")
+
+    results = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+    }
+    for name in args.benchmarks:
+        results[name] = benchmarks[name](args)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import fnmatch
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import pytest
+from deep_memory import DeepMemory
+from deep_memory.providers import FakeOpenAIProvider, FakeAsyncOpenAIProvider, FakePineconeProvider
+
+
+#=======================================================================
+# In-memory stand-in for the Redis commands the memorization queue uses
+#=======================================================================
+class FakeRedis:
+    def __init__(self):
+        self.values: Dict[str, Any] = {}
+        self.lists: Dict[str, List[Any]] = {}
+        self.expires_at: Dict[str, float] = {}
+        self._changed = threading.Condition()
+
+
+    def get(self, key: str) -> Optional[Any]:
+        if key in self.expires_at and self.expires_at[key] <= time.monotonic():
+            self.delete(key)
+        return self.values.get(key)
+
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None) -> None:
+        self.values[key] = value
+        if ex is not None:
+            self.expires_at[key] = time.monotonic() + ex
+        else:
+            self.expires_at.pop(key, None)
+
+
+    def exists(self, key: str) -> int:
+        return int(self.get(key) is not None or bool(self.lists.get(key)))
+
+
+    def delete(self, key: str) -> int:
+        self.expires_at.pop(key, None)
+        found = self.values.pop(key, None) is not None
+        return int(found or self.lists.pop(key, None) is not None)
+
+
+    def incr(self, key: str) -> int:
+        self.values[key] = int(self.get(key) or 0) + 1
+        return self.values[key]
+
+
+    def expire(self, key: str, seconds: int) -> None:
+        self.expires_at[key] = time.monotonic() + seconds
+
+
+    def lrange(self, key: str, start: int, end: int) -> List[Any]:
+        items = self.lists.get(key, [])
+        return list(items[start:] if end == -1 else items[start:end + 1])
+
+
+    def ltrim(self, key: str, start: int, end: int) -> None:
+        with self._changed:
+            items = self.lists.get(key, [])
+            items[:] = items[start:] if end == -1 else items[start:end + 1]
+
+
+    def scan_iter(self, match: str = "*"):
+        keys = list(self.values) + [key for key, items in self.lists.items() if items]
+        return iter([key for key in keys if fnmatch.fnmatchcase(key, match)])
+
+
+    def rpush(self, key: str, value: Any) -> None:
+        with self._changed:
+            self.lists.setdefault(key, []).append(value)
+            self._changed.notify_all()
+
+
+    def lpush(self, key: str, value: Any) -> None:
+        with self._changed:
+            self.lists.setdefault(key, []).insert(0, value)
+            self._changed.notify_all()
+
+
+    def lrem(self, key: str, count: int, value: Any) -> int:
+        with self._changed:
+            items = self.lists.get(key, [])
+            if value in items:
+                items.remove(value)
+                return 1
+            return 0
+
+
+    def lmove(self, source: str, destination: str, src: str = "LEFT", dest: str = "RIGHT") -> Optional[Any]:
+        with self._changed:
+            items = self.lists.get(source)
+            if not items:
+                return None
+            value = items.pop(0 if src == "LEFT" else -1)
+            target = self.lists.setdefault(destination, [])
+            if dest == "LEFT":
+                target.insert(0, value)
+            else:
+                target.append(value)
+            return value
+
+
+    def blmove(self, source: str, destination: str, timeout: float, src: str = "LEFT", dest: str = "RIGHT") -> Optional[Any]:
+        expires_at = time.monotonic() + timeout
+        with self._changed:
+            while not self.lists.get(source):
+                remaining = expires_at - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+            return self.lmove(source, destination, src, dest)
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    return FakeRedis()
+
+
+#=======================================================================
+# Returns a DeepMemory instance on fake providers (no latency unless
+# text_latency is given)
+#=======================================================================
+def build_deep_memory(text_latency: float = 0.0, openai_provider: Optional[Any] = None, async_openai_provider: Optional[Any] = None, storage_backend: Optional[Any] = None, **options) -> DeepMemory:
+    return DeepMemory(
+        pinecone_api_key="fake",
+        openai_api_key="fake",
+        storage_backend=storage_backend or FakePineconeProvider(search_latency=0.0, upsert_latency=0.0, rerank_latency=0.0),
+        openai_provider=openai_provider or FakeOpenAIProvider(text_latency=text_latency, image_latency=0.0),
+        async_openai_provider=async_openai_provider or FakeAsyncOpenAIProvider(text_latency=text_latency, image_latency=0.0),
+        **{"namespace": "test", "hot_tier_size": 0, **options}
+    )
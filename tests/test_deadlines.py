@@ -0,0 +1,75 @@
+import time
+import pytest
+from deep_memory import Deadline, DeadlineExceeded
+from deep_memory.providers import FakeOpenAIProvider, FakePineconeProvider
+from conftest import build_deep_memory
+
+
+MEMORIES = [
+    {"text": "Alice owns the Pinecone migration.", "files": []},
+    {"text": "Bob likes tea.", "files": []},
+]
+
+
+def test_research_integrates_with_time_left():
+    dm = build_deep_memory()
+    dm.process_memories("", memories=MEMORIES)
+    events = []
+
+    summary = dm.research("Who owns the Pinecone migration?", on_progress=lambda stage, detail: events.append(stage), mode="deep", deadline=Deadline(60))
+
+    assert "degraded" not in events
+    assert "Alice owns the Pinecone migration." in summary
+
+
+def test_research_returns_packed_evidence_when_no_time_is_left_to_integrate():
+    dm = build_deep_memory()
+    dm.process_memories("", memories=MEMORIES)
+    events = []
+
+    summary = dm.research("Who owns the Pinecone migration?", on_progress=lambda stage, detail: events.append((stage, detail)), mode="deep", deadline=Deadline(0.5))
+
+    assert ("degraded", {"stage": "integration"}) in events
+    assert summary.startswith("[page-")
+    assert "Alice owns the Pinecone migration." in summary
+
+
+def test_rerank_is_skipped_when_the_deadline_is_short():
+    storage = FakePineconeProvider(search_latency=0.0, upsert_latency=0.0, rerank_latency=0.0, rerank_policy="always")
+    storage.upsert_records("deep-memory-page", [{"_id": "page-1", "chunk_text": "Bob likes tea."}], "test")
+    storage.upsert_records("deep-memory-page-sparse", [{"_id": "page-1", "chunk_text": "Bob likes tea."}], "test")
+
+    results = storage.hybrid_search("tea", "deep-memory-page", "deep-memory-page-sparse", namespace="test", deadline=Deadline(0.5))
+
+    assert results["degraded"]
+    assert [result["id"] for result in results["results"]] == ["page-1"]
+
+
+def test_slow_calls_time_out_at_the_deadline():
+    provider = FakeOpenAIProvider(text_latency=5.0)
+    started = time.monotonic()
+
+    with pytest.raises(TimeoutError):
+        provider.generate_text("hello", deadline=Deadline(0.2))
+
+    assert time.monotonic() - started < 2.0
+
+
+def test_stream_is_not_opened_after_the_deadline():
+    provider = FakeOpenAIProvider(text_latency=0.0)
+    deadline = Deadline(0.0)
+
+    with pytest.raises(DeadlineExceeded):
+        list(provider.stream_text("hello", deadline=deadline))
+
+
+def test_stream_ends_early_when_the_deadline_expires():
+    provider = FakeOpenAIProvider(text_latency=0.0)
+    deadline = Deadline(0.1)
+
+    words = []
+    for word in provider.stream_text("one two three four five six seven eight", deadline=deadline):
+        words.append(word)
+        time.sleep(0.06)
+
+    assert 1 <= len(words) < len("Answer to: one two three four five six seven eight".split(" "))
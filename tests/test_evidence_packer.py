@@ -0,0 +1,40 @@
+from deep_memory.evidence_packer import EvidencePacker
+from deep_memory.agents.integrate_agent import IntegrateAgent
+
+
+def test_items_within_budget_are_included_in_rank_order():
+    packer = EvidencePacker(max_tokens=1000)
+    packing = packer.pack("tea", [{"id": "page-1", "text": "Bob likes tea."}, {"id": "page-2", "text": "Alice likes coffee."}])
+
+    assert packing["context"] == "[page-1] Bob likes tea.\n\n[page-2] Alice likes coffee."
+    assert packing["included"] == ["page-1", "page-2"]
+    assert packing["trimmed"] == [] and packing["dropped"] == []
+
+
+def test_long_items_are_trimmed_to_relevant_passages():
+    packer = EvidencePacker(max_tokens=1000, max_item_tokens=12)
+    text = "The weather was cold. Bob owns the migration. The cafeteria serves soup."
+    packing = packer.pack("who owns the migration", [{"id": "page-1", "text": text}])
+
+    assert packing["trimmed"] == ["page-1"]
+    assert "Bob owns the migration." in packing["context"]
+    assert packer.count_tokens(packing["context"]) <= 12 + packer.count_tokens("[page-1] ")
+
+
+def test_items_past_the_budget_are_dropped():
+    packer = EvidencePacker(max_tokens=40, max_item_tokens=30, min_item_tokens=20)
+    evidence = [{"id": f"page-{i}", "text": "word " * 25} for i in range(3)]
+
+    packing = packer.pack("word", evidence)
+
+    assert packing["tokens"] <= 40
+    assert [entry["id"] for entry in packing["dropped"]] == ["page-1", "page-2"]
+
+
+def test_packed_evidence_is_not_packed_again():
+    agent = IntegrateAgent(tools=None, packer=EvidencePacker(max_tokens=10))
+    context = "[page-1] " + "fact " * 50
+
+    prompt = agent._build_prompt("question", context, packed=True)
+
+    assert f"EVIDENCE_CONTEXT: {context}" in prompt
@@ -0,0 +1,41 @@
+import threading
+import pytest
+from deep_memory import configure_executors, executor_stats
+from deep_memory.executors import DEFAULT_POOL_SIZES, get_executor
+
+
+@pytest.fixture(autouse=True)
+def default_pools():
+    yield
+    configure_executors(**DEFAULT_POOL_SIZES)
+
+
+def test_configured_size_caps_concurrent_tasks():
+    configure_executors(search_legs=2)
+    release = threading.Event()
+    running = []
+    executor = get_executor("search_legs")
+    futures = [executor.submit(lambda: (running.append(1), release.wait(5))) for _ in range(4)]
+    try:
+        assert executor_stats()["search_legs_threads"] == 2
+        for _ in range(100):
+            if len(running) == 2 and executor_stats()["search_legs_queued"] == 2:
+                break
+            threading.Event().wait(0.01)
+        assert len(running) == 2
+        assert executor_stats()["search_legs_queued"] == 2
+    finally:
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+
+
+def test_writes_do_not_share_a_pool_with_searches():
+    assert get_executor("write_tools") is not get_executor("search_tools")
+
+
+def test_unknown_or_empty_pools_are_rejected():
+    with pytest.raises(ValueError, match="Unknown executor 'search'"):
+        configure_executors(search=4)
+    with pytest.raises(ValueError, match="at least one thread"):
+        configure_executors(search_legs=0)
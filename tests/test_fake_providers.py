@@ -0,0 +1,50 @@
+import json
+import pytest
+from deep_memory.providers import FakePineconeProvider
+from deep_memory.providers.fake_providers import FaultInjector, canned_response
+
+
+def test_seeded_fault_injection_is_repeatable():
+    first = FaultInjector(latency=0.1, jitter=0.05, error_rate=0.5, seed=7)
+    second = FaultInjector(latency=0.1, jitter=0.05, error_rate=0.5, seed=7)
+
+    draws = [first.draw() for _ in range(20)]
+
+    assert draws == [second.draw() for _ in range(20)]
+    assert all(0.05 <= delay <= 0.15 for delay, _ in draws)
+    assert any(fails for _, fails in draws) and not all(fails for _, fails in draws)
+
+
+def test_injected_failures_raise_connection_errors():
+    with pytest.raises(ConnectionError, match="Injected failure in search"):
+        FaultInjector(error_rate=1.0).inject("search")
+
+
+def test_planning_prompts_get_a_plan_searching_the_question():
+    prompt = "You are the PlanningAgent.\nQUESTION: Who owns the migration?\nAVAILABLE_IMAGE_URLS: []\n"
+
+    plan = json.loads(canned_response(prompt).split("</think>", 1)[1])
+
+    assert plan["hybrid_queries"] == ["Who owns the migration?"]
+    assert plan["image_queries"] == []
+
+
+def test_integration_prompts_get_their_evidence():
+    prompt = (
+        "You are the IntegrateAgent.\n"
+        "- EVIDENCE_CONTEXT: newly retrieved supporting evidence.\n"
+        "QUESTION: Who?\n"
+        "EVIDENCE_CONTEXT: [page-1] Alice owns it.\n\n"
+        "INSTRUCTIONS:\n1. Understand the QUESTION."
+    )
+
+    assert json.loads(canned_response(prompt)) == {"content": "[page-1] Alice owns it."}
+
+
+def test_fake_pinecone_finds_upserted_records():
+    storage = FakePineconeProvider(search_latency=0.0, upsert_latency=0.0, rerank_latency=0.0)
+    storage.upsert_records("deep-memory-page-sparse", [{"_id": "page-1", "chunk_text": "Alice owns the migration."}], "test")
+
+    hits = storage.search_text("deep-memory-page-sparse", "migration", namespace="test")["result"]["hits"]
+
+    assert [hit["_id"] for hit in hits] == ["page-1"]
@@ -0,0 +1,46 @@
+import pytest
+from deep_memory.providers.fusion import reciprocal_rank_fusion, weighted_score_fusion, fuse_results, is_ambiguous
+
+
+#=======================================================================
+# Returns ranked documents with the given ids and scores
+#=======================================================================
+def documents(*scored):
+    return [{"_id": doc_id, "chunk_text": doc_id, "_score": score} for doc_id, score in scored]
+
+
+def test_rrf_ranks_documents_found_by_both_legs_first():
+    dense = documents(("a", 0.9), ("b", 0.8))
+    sparse = documents(("b", 12.0), ("c", 3.0))
+
+    fused = reciprocal_rank_fusion([dense, sparse])
+
+    assert [doc["_id"] for doc in fused] == ["b", "a", "c"]
+    assert all(0.0 <= doc["_score"] <= 1.0 for doc in fused)
+
+
+def test_rrf_scores_one_for_a_document_ranked_first_everywhere():
+    fused = reciprocal_rank_fusion([documents(("a", 0.9)), documents(("a", 5.0))])
+    assert fused[0]["_score"] == pytest.approx(1.0)
+
+
+def test_weighted_fusion_normalizes_each_leg():
+    dense = documents(("a", 0.9), ("b", 0.1))
+    sparse = documents(("b", 100.0), ("a", 0.0))
+
+    fused = weighted_score_fusion([dense, sparse], weights=[2.0, 1.0])
+
+    assert [doc["_id"] for doc in fused] == ["a", "b"]
+    assert fused[0]["_score"] == pytest.approx(2 / 3)
+
+
+def test_unknown_fusion_method_is_rejected():
+    with pytest.raises(ValueError, match="Unknown fusion method 'max'"):
+        fuse_results("max", [])
+
+
+def test_close_or_unconfident_rankings_are_ambiguous():
+    assert is_ambiguous(documents(("a", 0.95), ("b", 0.94)), margin=0.1)
+    assert is_ambiguous(documents(("a", 0.5), ("b", 0.1)), margin=0.1)
+    assert not is_ambiguous(documents(("a", 0.95), ("b", 0.5)), margin=0.1)
+    assert not is_ambiguous([], margin=0.1)
@@ -0,0 +1,53 @@
+import time
+from deep_memory.hot_tier import HotTier
+from conftest import build_deep_memory
+
+
+#=======================================================================
+# Returns the ids of a hot tier search's results
+#=======================================================================
+def result_ids(hot_tier: HotTier, index_name: str, query: str) -> list:
+    return [result["id"] for result in hot_tier.search(index_name, query)]
+
+
+def test_records_are_searchable_right_after_they_are_written():
+    hot_tier = HotTier()
+    hot_tier.add("deep-memory-page-sparse", [{"_id": "page-1", "chunk_text": "Alice owns the Pinecone migration."}])
+    assert result_ids(hot_tier, "deep-memory-page-sparse", "Pinecone migration") == ["page-1"]
+    assert result_ids(hot_tier, "deep-memory-memo-sparse", "Pinecone migration") == []
+
+
+def test_oldest_records_are_evicted_over_the_size_limit():
+    hot_tier = HotTier(max_records=2)
+    for number in range(3):
+        hot_tier.add("deep-memory-page-sparse", [{"_id": f"page-{number}", "chunk_text": f"migration note {number}"}])
+    assert sorted(result_ids(hot_tier, "deep-memory-page-sparse", "migration")) == ["page-1", "page-2"]
+
+
+def test_records_are_evicted_past_the_age_limit():
+    hot_tier = HotTier(max_age=0.05)
+    hot_tier.add("deep-memory-page-sparse", [{"_id": "page-1", "chunk_text": "Alice owns the Pinecone migration."}])
+    time.sleep(0.1)
+    assert result_ids(hot_tier, "deep-memory-page-sparse", "Pinecone migration") == []
+
+
+def test_records_published_by_another_process_are_seen(fake_redis):
+    worker = HotTier(redis_client=fake_redis, key_prefix="deep-memory:hot:user")
+    web = HotTier(redis_client=fake_redis, key_prefix="deep-memory:hot:user")
+    other_user = HotTier(redis_client=fake_redis, key_prefix="deep-memory:hot:other")
+
+    worker.add("deep-memory-page-sparse", [{"_id": "page-1", "chunk_text": "Alice owns the Pinecone migration."}])
+    assert result_ids(web, "deep-memory-page-sparse", "Pinecone migration") == ["page-1"]
+    assert result_ids(other_user, "deep-memory-page-sparse", "Pinecone migration") == []
+
+    web.clear()
+    assert result_ids(HotTier(redis_client=fake_redis, key_prefix="deep-memory:hot:user"), "deep-memory-page-sparse", "Pinecone migration") == []
+
+
+def test_memories_stored_by_a_worker_are_found_by_the_web_process(fake_redis):
+    worker = build_deep_memory(hot_tier_size=200, hot_tier_redis=fake_redis)
+    web = build_deep_memory(hot_tier_size=200, hot_tier_redis=fake_redis)
+    worker.process_memories("", memories=[{"text": "Alice owns the Pinecone migration.", "files": []}])
+
+    results = web.tools.hot_tier.hybrid_search("Pinecone migration", "deep-memory-page", "deep-memory-page-sparse")
+    assert [result["text"] for result in results] == ["Alice owns the Pinecone migration."]
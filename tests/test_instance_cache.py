@@ -0,0 +1,50 @@
+import threading
+from deep_memory import InstanceCache
+
+
+def test_concurrent_misses_share_one_instance_and_restore_once():
+    cache = InstanceCache()
+    racers = 8
+    barrier = threading.Barrier(racers)
+    restored = []
+    results = []
+
+    # Every racer misses and creates its own instance before any inserts
+    def factory():
+        barrier.wait(timeout=5)
+        return object()
+
+    def racer():
+        results.append(cache.get_or_create("user", factory, on_insert=restored.append))
+
+    threads = [threading.Thread(target=racer) for _ in range(racers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len({id(value) for value in results}) == 1
+    assert restored == [results[0]]
+
+
+def test_evicted_entries_are_passed_to_on_evict():
+    evicted = []
+    cache = InstanceCache(max_size=2, on_evict=lambda key, value: evicted.append(key))
+    for key in ("a", "b", "c"):
+        cache.get_or_create(key, object)
+
+    assert evicted == ["a"]
+    assert cache.peek("a") is None
+    assert "c" in cache
+
+
+def test_peek_does_not_refresh_recency():
+    evicted = []
+    cache = InstanceCache(max_size=2, on_evict=lambda key, value: evicted.append(key))
+    cache.get_or_create("a", object)
+    cache.get_or_create("b", object)
+
+    cache.peek("a")
+    cache.get_or_create("c", object)
+
+    assert evicted == ["a"]
@@ -0,0 +1,70 @@
+import os
+from unittest import mock
+from deep_memory.providers import LocalProvider
+
+
+RECORDS = [
+    {"_id": "page-1", "chunk_text": "Alice owns the Pinecone migration."},
+    {"_id": "page-2", "chunk_text": "Bob likes green tea."},
+]
+
+
+#=======================================================================
+# Returns the ids of a search's hits
+#=======================================================================
+def hit_ids(provider: LocalProvider, index_name: str, query: str, namespace: str = "user") -> list:
+    return [hit["_id"] for hit in provider.search_text(index_name, query, top_k=5, namespace=namespace)["result"]["hits"]]
+
+
+def test_records_survive_a_reload_after_flush(tmp_path):
+    provider = LocalProvider(path=str(tmp_path), save_delay=60)
+    provider.upsert_records("deep-memory-page", RECORDS, namespace="user")
+    provider.upsert_records("deep-memory-page-sparse", RECORDS, namespace="user")
+    provider.flush()
+
+    reloaded = LocalProvider(path=str(tmp_path))
+    assert hit_ids(reloaded, "deep-memory-page", "Pinecone migration")[0] == "page-1"
+    assert hit_ids(reloaded, "deep-memory-page-sparse", "green tea")[0] == "page-2"
+
+
+def test_upserts_are_saved_in_one_batch(tmp_path):
+    provider = LocalProvider(path=str(tmp_path), save_delay=60)
+    with mock.patch.object(provider, "_save", wraps=provider._save) as save:
+        for record in RECORDS:
+            provider.upsert_records("deep-memory-page", [record], namespace="user")
+            provider.upsert_records("deep-memory-page-sparse", [record], namespace="user")
+
+        # Nothing is written until the scheduled save (or a flush) runs
+        assert save.call_count == 0
+        assert not os.path.exists(tmp_path / "deep-memory-page")
+
+        provider.flush()
+        assert save.call_count == 2
+
+        # A flush with nothing dirty writes nothing
+        provider.flush()
+        assert save.call_count == 2
+
+
+def test_scheduled_save_runs_after_the_delay(tmp_path):
+    provider = LocalProvider(path=str(tmp_path), save_delay=0.1)
+    provider.upsert_records("deep-memory-page", RECORDS, namespace="user")
+    timer = provider._save_timer
+    timer.join(timeout=5)
+
+    assert hit_ids(LocalProvider(path=str(tmp_path)), "deep-memory-page", "Pinecone migration")[0] == "page-1"
+
+
+def test_cleared_namespace_stays_cleared_after_reload(tmp_path):
+    provider = LocalProvider(path=str(tmp_path), save_delay=60)
+    provider.upsert_records("deep-memory-page", RECORDS, namespace="user")
+    provider.upsert_records("deep-memory-page", RECORDS, namespace="other")
+    provider.flush()
+
+    provider.upsert_records("deep-memory-page", [{"_id": "page-3", "chunk_text": "Unsaved"}], namespace="user")
+    provider.clear_namespace("user")
+    provider.flush()
+
+    reloaded = LocalProvider(path=str(tmp_path))
+    assert hit_ids(reloaded, "deep-memory-page", "Pinecone migration") == []
+    assert hit_ids(reloaded, "deep-memory-page", "Pinecone migration", namespace="other")[0] == "page-1"
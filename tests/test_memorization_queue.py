@@ -0,0 +1,202 @@
+import threading
+import time
+from deep_memory import MemorizationQueue, PartialFailure
+from deep_memory.providers import FakePineconeProvider
+from conftest import build_deep_memory
+
+
+#=======================================================================
+# Fake storage rejecting upserts of records whose text contains any of
+# the rejected words
+#=======================================================================
+class RejectingPineconeProvider(FakePineconeProvider):
+    def __init__(self, rejected):
+        super().__init__(search_latency=0.0, upsert_latency=0.0, rerank_latency=0.0)
+        self.rejected = rejected
+
+    def upsert_records(self, index_name, records, namespace="deep-memory"):
+        if any(word in record["chunk_text"] for record in records for word in self.rejected):
+            raise ValueError("upsert rejected")
+        super().upsert_records(index_name, records, namespace)
+
+
+#=======================================================================
+# Builds a process callable storing memories the way the API's memorize
+# does, recording the memories given to each attempt
+#=======================================================================
+def memorizer(dm, attempts):
+    def process(user_id, memories, context_window):
+        attempts.append([memory["text"] for memory in memories])
+        report = dm.process_memories(context_window, memories=memories)
+        failed = dm.memory_agent.failed_memories(memories, context_window, report)
+        if failed:
+            raise PartialFailure(report, failed, f"Could not store {len(failed)} memories")
+        return report
+    return process
+
+
+#=======================================================================
+# Waits until a job reaches a final status, returning it
+#=======================================================================
+def wait_for(queue: MemorizationQueue, job_id: str, timeout: float = 5.0) -> dict:
+    expires_at = time.monotonic() + timeout
+    while time.monotonic() < expires_at:
+        job = queue.status(job_id)
+        if job is not None and job["status"] in ("succeeded", "partial", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish: {queue.status(job_id)}")
+
+
+def test_local_job_status_reaches_succeeded():
+    queue = MemorizationQueue(process=lambda user_id, memories, context_window: {"stored": len(memories)})
+    try:
+        job_id = queue.submit("user", [{"text": "hello", "files": []}])
+        job = wait_for(queue, job_id)
+        assert job["status"] == "succeeded"
+        assert job["report"] == {"stored": 1}
+    finally:
+        queue.shutdown()
+
+
+def test_redis_status_is_read_from_redis_by_other_processes(fake_redis):
+    # The web process only submits; a worker queue with its own local state runs the job
+    web = MemorizationQueue(process=lambda *args: None, redis_client=fake_redis, worker_id="web")
+    worker = MemorizationQueue(process=lambda user_id, memories, context_window: {"stored": len(memories)}, redis_client=fake_redis, worker_id="worker")
+
+    job_id = web.submit("user", [{"text": "hello", "files": []}])
+    assert web.status(job_id)["status"] == "queued"
+
+    thread = threading.Thread(target=worker.run_worker, kwargs={"poll_timeout": 0.1}, daemon=True)
+    thread.start()
+    try:
+        job = wait_for(web, job_id)
+        assert job["status"] == "succeeded"
+        assert job["report"] == {"stored": 1}
+        assert not fake_redis.lists.get(worker.processing_key)
+    finally:
+        worker.shutdown()
+        thread.join(timeout=5)
+
+
+def test_redis_worker_takes_jobs_only_into_free_slots(fake_redis):
+    release = threading.Event()
+    worker = MemorizationQueue(process=lambda *args: release.wait(5), redis_client=fake_redis, max_workers=2, worker_id="worker")
+    job_ids = [worker.submit("user", []) for _ in range(5)]
+
+    thread = threading.Thread(target=worker.run_worker, kwargs={"poll_timeout": 0.1}, daemon=True)
+    thread.start()
+    try:
+        time.sleep(0.3)
+        assert len(fake_redis.lists[worker.processing_key]) == 2
+        assert len(fake_redis.lists[worker.queue_key]) == 3
+
+        release.set()
+        for job_id in job_ids:
+            assert wait_for(worker, job_id)["status"] == "succeeded"
+    finally:
+        release.set()
+        worker.shutdown()
+        thread.join(timeout=5)
+
+
+def test_workers_get_distinct_ids_by_default(fake_redis):
+    first = MemorizationQueue(process=lambda *args: None, redis_client=fake_redis)
+    second = MemorizationQueue(process=lambda *args: None, redis_client=fake_redis)
+    assert first.processing_key != second.processing_key
+
+
+def test_jobs_of_a_worker_without_heartbeat_are_recovered_by_another(fake_redis):
+    crashed = MemorizationQueue(process=lambda *args: None, redis_client=fake_redis)
+    job_id = crashed.submit("user", [])
+    fake_redis.lmove(crashed.queue_key, crashed.processing_key)
+
+    # A live worker's jobs stay where they are
+    alive = MemorizationQueue(process=lambda *args: None, redis_client=fake_redis)
+    alive._heartbeat()
+    alive_job_id = alive.submit("user", [])
+    fake_redis.lmove(alive.queue_key, alive.processing_key)
+
+    survivor = MemorizationQueue(process=lambda *args: {"stored": 0}, redis_client=fake_redis)
+    thread = threading.Thread(target=survivor.run_worker, kwargs={"poll_timeout": 0.1}, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(survivor, job_id)["status"] == "succeeded"
+        assert survivor.status(alive_job_id)["status"] == "queued"
+        assert len(fake_redis.lists[alive.processing_key]) == 1
+    finally:
+        survivor.shutdown()
+        thread.join(timeout=5)
+    assert not fake_redis.exists(survivor._heartbeat_key(survivor.worker_id))
+
+
+def test_jobs_held_by_a_crashed_worker_are_requeued(fake_redis):
+    crashed = MemorizationQueue(process=lambda *args: None, redis_client=fake_redis, worker_id="worker")
+    job_id = crashed.submit("user", [])
+    fake_redis.lmove(crashed.queue_key, crashed.processing_key)
+
+    restarted = MemorizationQueue(process=lambda *args: {"stored": 0}, redis_client=fake_redis, worker_id="worker")
+    thread = threading.Thread(target=restarted.run_worker, kwargs={"poll_timeout": 0.1}, daemon=True)
+    thread.start()
+    try:
+        assert wait_for(restarted, job_id)["status"] == "succeeded"
+    finally:
+        restarted.shutdown()
+        thread.join(timeout=5)
+
+
+def test_job_whose_upserts_are_all_rejected_is_retried_then_failed():
+    attempts = []
+    dm = build_deep_memory(storage_backend=RejectingPineconeProvider(rejected=["Alice"]))
+    dm.memory_agent.batch_size = 1
+    queue = MemorizationQueue(process=memorizer(dm, attempts), max_attempts=3, retry_delay=0.01)
+    try:
+        job = wait_for(queue, queue.submit("user", [{"text": "Alice owns the migration.", "files": []}]))
+        assert job["status"] == "failed"
+        assert job["attempts"] == 3
+        assert "Could not store 1 memories" in job["error"]
+        assert job["report"]["deep-memory-page"]["failed_ids"]
+        assert len(attempts) == 3
+    finally:
+        queue.shutdown()
+
+
+def test_only_failed_memories_are_retried_and_job_ends_partial():
+    attempts = []
+    dm = build_deep_memory(storage_backend=RejectingPineconeProvider(rejected=["Alice"]))
+    dm.memory_agent.batch_size = 1
+    queue = MemorizationQueue(process=memorizer(dm, attempts), max_attempts=2, retry_delay=0.01)
+    memories = [{"text": "Alice owns the migration.", "files": []}, {"text": "Bob likes tea.", "files": []}]
+    try:
+        job = wait_for(queue, queue.submit("user", memories))
+        assert job["status"] == "partial"
+        assert attempts == [["Alice owns the migration.", "Bob likes tea."], ["Alice owns the migration."]]
+    finally:
+        queue.shutdown()
+
+
+def test_job_succeeds_once_retried_memories_are_stored():
+    attempts = []
+    storage = RejectingPineconeProvider(rejected=["Alice"])
+    dm = build_deep_memory(storage_backend=storage)
+    dm.memory_agent.batch_size = 1
+    process = memorizer(dm, attempts)
+
+    #=======================================================================
+    # Accepts upserts again after the first attempt
+    #=======================================================================
+    def recovering(user_id, memories, context_window):
+        try:
+            return process(user_id, memories, context_window)
+        finally:
+            storage.rejected = []
+
+    queue = MemorizationQueue(process=recovering, max_attempts=3, retry_delay=0.01)
+    memories = [{"text": "Alice owns the migration.", "files": []}, {"text": "Bob likes tea.", "files": []}]
+    try:
+        job = wait_for(queue, queue.submit("user", memories))
+        assert job["status"] == "succeeded"
+        assert job["error"] is None
+        assert attempts[1] == ["Alice owns the migration."]
+    finally:
+        queue.shutdown()
@@ -0,0 +1,82 @@
+import asyncio
+import pytest
+from deep_memory.providers import FakeOpenAIProvider, FakeAsyncOpenAIProvider
+from conftest import build_deep_memory
+
+
+#=======================================================================
+# Fake OpenAI provider failing abstract generation for messages that
+# contain "BROKEN"
+#=======================================================================
+class FailingOpenAIProvider(FakeOpenAIProvider):
+    def generate_text(self, prompt, use_cache=True, reasoning_effort=None, deadline=None):
+        if "BROKEN" in prompt:
+            raise RuntimeError("abstract failed")
+        return super().generate_text(prompt, use_cache, reasoning_effort, deadline)
+
+
+#=======================================================================
+# Async counterpart of FailingOpenAIProvider
+#=======================================================================
+class FailingAsyncOpenAIProvider(FakeAsyncOpenAIProvider):
+    async def generate_text(self, prompt, use_cache=True, reasoning_effort=None, deadline=None):
+        if "BROKEN" in prompt:
+            raise RuntimeError("abstract failed")
+        return await super().generate_text(prompt, use_cache, reasoning_effort, deadline)
+
+
+MEMORIES = [
+    {"text": "Alice owns the Pinecone migration.", "files": []},
+    {"text": "BROKEN message", "files": []},
+    {"text": "Bob likes tea.", "files": []},
+]
+
+
+@pytest.mark.parametrize("pipelined", [True, False])
+def test_failed_memory_is_reported_and_others_are_stored(pipelined):
+    dm = build_deep_memory(openai_provider=FailingOpenAIProvider(text_latency=0.0, image_latency=0.0))
+    dm.memory_agent.pipelined = pipelined
+    # Flush one record per chunk, so chunks are written before the failure is seen
+    dm.memory_agent.batch_size = 1
+
+    report = dm.process_memories("", memories=MEMORIES)
+
+    memo_id, page_id = dm.memory_agent._record_ids(MEMORIES[1], "")
+    for index_name in ("deep-memory-memo", "deep-memory-memo-sparse"):
+        assert report[index_name]["upserted"] == 2
+        assert report[index_name]["failed_ids"] == [memo_id]
+    for index_name in ("deep-memory-page", "deep-memory-page-sparse"):
+        assert report[index_name]["upserted"] == 2
+        assert report[index_name]["failed_ids"] == [page_id]
+        assert report[index_name]["errors"] == ["abstract failed"]
+
+
+def test_async_failed_memory_is_reported_and_others_are_stored():
+    dm = build_deep_memory(async_openai_provider=FailingAsyncOpenAIProvider(text_latency=0.0, image_latency=0.0))
+
+    report = asyncio.run(dm.aprocess_memories("", memories=MEMORIES))
+
+    assert report["deep-memory-page"]["upserted"] == 2
+    assert report["deep-memory-page"]["failed_ids"] == [dm.memory_agent._record_ids(MEMORIES[1], "")[1]]
+
+
+def test_retried_memories_overwrite_their_records():
+    dm = build_deep_memory()
+    memories = MEMORIES[:1] + MEMORIES[2:]
+
+    dm.process_memories("", memories=memories)
+    dm.process_memories("", memories=memories)
+
+    storage = dm.pinecone_provider
+    for index_name in ("deep-memory-memo", "deep-memory-page", "deep-memory-memo-sparse", "deep-memory-page-sparse"):
+        assert len(storage._get_index(index_name, "test").records) == 2
+
+
+def test_the_same_message_in_two_conversations_keeps_both_abstracts():
+    dm = build_deep_memory()
+    memory = {"text": "Bob likes tea.", "files": []}
+
+    dm.process_memories("USER: What does Bob drink?", memories=[memory])
+    dm.process_memories("USER: Plan the team offsite.", memories=[memory])
+
+    assert len(dm.pinecone_provider._get_index("deep-memory-memo", "test").records) == 2
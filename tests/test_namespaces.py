@@ -0,0 +1,68 @@
+from types import SimpleNamespace
+from deep_memory import DeepMemory, key_namespace
+from deep_memory.providers import FakePineconeProvider
+from deep_memory.providers.pinecone_provider import PineconeProvider, INDEX_NAMES
+from deep_memory.providers.pinecone_registry import PineconeRegistry
+
+
+#=======================================================================
+# Stand-in for a Pinecone index handle storing vectors per namespace
+#=======================================================================
+class StubIndex:
+    def __init__(self):
+        self.namespaces = {}
+
+    def list(self, namespace, limit):
+        ids = list(self.namespaces.get(namespace, {}))
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def fetch(self, ids, namespace):
+        stored = self.namespaces.get(namespace, {})
+        return SimpleNamespace(vectors={record_id: stored[record_id] for record_id in ids if record_id in stored})
+
+    def upsert(self, vectors, namespace, show_progress=True):
+        for vector in vectors:
+            self.namespaces.setdefault(namespace, {})[vector["id"]] = vector
+
+    def delete_namespace(self, namespace):
+        self.namespaces.pop(namespace, None)
+
+
+#=======================================================================
+# Returns a provider on stub index handles (no Pinecone calls)
+#=======================================================================
+def build_provider():
+    registry = PineconeRegistry()
+    registry._clients["key"] = object()
+    registry._initialized.add("key")
+    for index_name in INDEX_NAMES:
+        registry._indexes[("key", index_name)] = StubIndex()
+    return PineconeProvider("key", registry=registry)
+
+
+def test_legacy_namespace_is_moved_into_the_user_namespace():
+    provider = build_provider()
+    page = provider.registry.get_index("key", "deep-memory-page")
+    vectors = [{"id": f"page-{number}", "values": [0.1], "metadata": {"chunk_text": f"note {number}"}} for number in range(120)]
+    page.upsert(vectors, namespace="deep-memory")
+
+    assert provider.migrate_namespace("deep-memory", "deep-memory-user") == 120
+    assert page.namespaces["deep-memory-user"]["page-7"]["metadata"] == {"chunk_text": "note 7"}
+    assert "deep-memory" not in page.namespaces
+
+    # Running it again moves nothing
+    assert provider.migrate_namespace("deep-memory", "deep-memory-user") == 0
+    assert len(page.namespaces["deep-memory-user"]) == 120
+
+
+def test_default_namespace_follows_the_pinecone_key():
+    def build(pinecone_api_key):
+        storage = FakePineconeProvider(search_latency=0.0, upsert_latency=0.0, rerank_latency=0.0)
+        return DeepMemory(pinecone_api_key=pinecone_api_key, openai_api_key="fake", storage_backend=storage, hot_tier_size=0)
+
+    first = build("first-key")
+    assert first.namespace == key_namespace("first-key")
+    assert first.namespace != "deep-memory"
+    assert build("first-key").namespace == first.namespace
+    assert build("second-key").namespace != first.namespace
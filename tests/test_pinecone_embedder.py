@@ -0,0 +1,116 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from deep_memory.providers.pinecone_embedder import PineconeEmbedder
+from deep_memory.providers.pinecone_provider import PineconeProvider, INDEX_NAMES
+from deep_memory.providers.pinecone_registry import PineconeRegistry
+
+
+#=======================================================================
+# Stand-in for Pinecone Inference recording embed requests (vectors are
+# [text length, 1.0 for queries or 0.0 for passages])
+#=======================================================================
+class StubInference:
+    def __init__(self, gate=None, error=None):
+        self.requests = []
+        self.gate = gate
+        self.error = error
+        self._lock = threading.Lock()
+
+    def embed(self, model, inputs, parameters):
+        with self._lock:
+            self.requests.append((list(inputs), parameters["input_type"]))
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.error is not None:
+            raise self.error
+        return [{"values": [float(len(text)), float(parameters["input_type"] == "query")]} for text in inputs]
+
+
+#=======================================================================
+# Stand-in for a Pinecone client exposing only inference
+#=======================================================================
+def stub_client(inference: StubInference) -> SimpleNamespace:
+    return SimpleNamespace(inference=inference)
+
+
+def test_texts_are_embedded_in_batches_in_input_order():
+    inference = StubInference()
+    embedder = PineconeEmbedder(stub_client(inference), batch_size=2, api_key="embed-key")
+
+    vectors = embedder.embed_documents(["a", "bb", "ccc", "dddd", "eeeee"])
+    assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert [len(inputs) for inputs, _ in inference.requests] == [2, 2, 1]
+
+
+def test_each_text_is_embedded_once_per_input_type():
+    inference = StubInference()
+    embedder = PineconeEmbedder(stub_client(inference), api_key="embed-key")
+
+    embedder.embed_queries(["migration", "migration", "tea"])
+    embedder.embed_queries(["tea", "migration"])
+    assert inference.requests == [(["migration", "tea"], "query")]
+
+    assert embedder.embed_documents(["tea"]) == [[3.0, 0.0]]
+    assert inference.requests[-1] == (["tea"], "passage")
+
+
+def test_concurrent_requests_for_a_text_share_one_embedding():
+    gate = threading.Event()
+    inference = StubInference(gate=gate)
+    embedder = PineconeEmbedder(stub_client(inference), api_key="embed-key")
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(embedder.embed_queries(["migration"]))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while not inference.requests:
+        gate.wait(0.01)
+    gate.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == [[[9.0, 1.0]]] * 3
+    assert len(inference.requests) == 1
+
+
+def test_failed_embedding_is_not_cached():
+    inference = StubInference(error=ValueError("bad request"))
+    embedder = PineconeEmbedder(stub_client(inference), api_key="embed-key")
+    with pytest.raises(ValueError):
+        embedder.embed_queries(["migration"])
+
+    inference.error = None
+    assert embedder.embed_queries(["migration"]) == [[9.0, 1.0]]
+
+
+#=======================================================================
+# Stand-in for a Pinecone index handle recording search queries
+#=======================================================================
+class StubIndex:
+    def __init__(self):
+        self.queries = []
+
+    def search(self, query, namespace):
+        self.queries.append(query)
+        return {"result": {"hits": []}}
+
+
+def test_client_embedding_searches_dense_indexes_by_vector():
+    inference = StubInference()
+    registry = PineconeRegistry()
+    registry._clients["embed-key"] = stub_client(inference)
+    registry._initialized.add("embed-key")
+    for index_name in INDEX_NAMES:
+        registry._indexes[("embed-key", index_name)] = StubIndex()
+    provider = PineconeProvider("embed-key", registry=registry, embedding="client")
+
+    provider.search_text("deep-memory-page", "migration", namespace="user")
+    provider.search_text("deep-memory-page-sparse", "migration", namespace="user")
+    assert registry._indexes[("embed-key", "deep-memory-page")].queries == [{"top_k": 5, "vector": {"values": [9.0, 1.0]}}]
+    assert registry._indexes[("embed-key", "deep-memory-page-sparse")].queries == [{"top_k": 5, "inputs": {"text": "migration"}}]
+
+    # Failed embeddings fall back to integrated text search
+    inference.error = ValueError("bad request")
+    provider.search_text("deep-memory-memo", "tea", namespace="user")
+    assert registry._indexes[("embed-key", "deep-memory-memo")].queries == [{"top_k": 5, "inputs": {"text": "tea"}}]
@@ -0,0 +1,56 @@
+import pytest
+from deep_memory import QueryRouter
+from deep_memory.providers import FakeOpenAIProvider
+from conftest import build_deep_memory
+
+
+#=======================================================================
+# Fake OpenAI provider recording the reasoning effort of each generation
+#=======================================================================
+class RecordingOpenAIProvider(FakeOpenAIProvider):
+    def __init__(self):
+        super().__init__(text_latency=0.0, image_latency=0.0)
+        self.efforts = []
+
+    def generate_text(self, prompt, use_cache=True, reasoning_effort=None, deadline=None):
+        self.efforts.append(reasoning_effort)
+        return super().generate_text(prompt, use_cache, reasoning_effort, deadline)
+
+
+@pytest.mark.parametrize("query, mode", [
+    ("Who owns the Pinecone migration?", "fast"),
+    ("", "fast"),
+    ("Show me the screenshot of the dashboard", "standard"),
+    ("What images did I upload last week?", "standard"),
+    ("How should we plan the rollout?", "standard"),
+    ("Why did we switch to Pinecone, and compare it with the local backend?", "deep"),
+    ("Explain the tradeoffs across every storage change since March", "deep"),
+])
+def test_queries_are_routed_by_their_features(query, mode):
+    assert QueryRouter().route(query) == mode
+
+
+def test_long_lookups_are_not_fast():
+    query = "What was the name of the person who said they would send the report about the migration last week?"
+    assert QueryRouter(fast_max_words=12).route(query) == "standard"
+
+
+def test_fast_research_makes_no_llm_calls():
+    provider = RecordingOpenAIProvider()
+    dm = build_deep_memory(openai_provider=provider)
+    events = []
+
+    dm.research("Who owns the Pinecone migration?", on_progress=lambda stage, detail: events.append((stage, detail)))
+    assert ("routed", {"mode": "fast"}) in events
+    assert provider.efforts == []
+
+
+def test_requested_mode_overrides_the_router():
+    provider = RecordingOpenAIProvider()
+    dm = build_deep_memory(openai_provider=provider)
+
+    dm.research("Who owns the Pinecone migration?", mode="standard")
+    assert provider.efforts and set(provider.efforts) == {"low"}
+
+    with pytest.raises(ValueError, match="Unknown research mode 'slow'"):
+        dm.research("Who owns the Pinecone migration?", mode="slow")
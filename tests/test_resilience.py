@@ -0,0 +1,134 @@
+import threading
+import time
+import pytest
+from deep_memory import CircuitOpenError, Hedge, get_circuit_breaker
+from deep_memory.resilience import resilient
+
+
+#=======================================================================
+# Error carrying an HTTP status and response headers like SDK errors do
+#=======================================================================
+class StatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+#=======================================================================
+# Provider whose calls raise the queued errors, then return "ok"
+#=======================================================================
+class FlakyProvider:
+    def __init__(self, api_key, errors=()):
+        self.api_key = api_key
+        self.errors = list(errors)
+        self.calls = 0
+
+    def attempt(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+    @resilient("flaky.single", "flaky-breaker", attempts=1)
+    def single(self):
+        return self.attempt()
+
+    @resilient("flaky.retried", "flaky-retry", attempts=3)
+    def retried(self):
+        return self.attempt()
+
+
+def test_breaker_opens_only_for_the_failing_key():
+    failing = FlakyProvider("failing-key", [ConnectionError("down")] * 5)
+    for _ in range(5):
+        with pytest.raises(ConnectionError):
+            failing.single()
+
+    with pytest.raises(CircuitOpenError):
+        failing.single()
+    assert failing.calls == 5
+
+    assert FlakyProvider("healthy-key").single() == "ok"
+    assert get_circuit_breaker("flaky-breaker", "healthy-key").state == "closed"
+
+
+def test_rate_limits_do_not_open_the_breaker():
+    limited = FlakyProvider("limited-key", [StatusError(429)] * 6)
+    for _ in range(6):
+        with pytest.raises(StatusError):
+            limited.single()
+    assert get_circuit_breaker("flaky-breaker", "limited-key").state == "closed"
+
+
+def test_short_retry_after_is_honoured_and_retried():
+    provider = FlakyProvider("retry-key", [StatusError(429, {"Retry-After": "0"})])
+    assert provider.retried() == "ok"
+    assert provider.calls == 2
+
+
+def test_retry_after_past_the_limit_gives_up_at_once():
+    provider = FlakyProvider("patient-key", [StatusError(429, {"Retry-After": "600"})])
+    started = time.monotonic()
+    with pytest.raises(StatusError):
+        provider.retried()
+    assert provider.calls == 1
+    assert time.monotonic() - started < 1
+
+
+def test_client_errors_are_not_retried():
+    provider = FlakyProvider("invalid-key", [StatusError(401)])
+    with pytest.raises(StatusError):
+        provider.retried()
+    assert provider.calls == 1
+
+
+#=======================================================================
+# Provider whose first call hangs until released and later calls return
+# at once
+#=======================================================================
+class SlowFirstProvider:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.release = threading.Event()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self):
+        with self._lock:
+            self.calls += 1
+            first = self.calls == 1
+        if first:
+            self.release.wait(5)
+            return "primary"
+        return "duplicate"
+
+
+def test_slow_call_is_hedged_with_a_duplicate():
+    provider = SlowFirstProvider("hedged-key")
+    hedge = Hedge("slow.search", dependency="hedge-dep", delay=0.05)
+    try:
+        assert hedge.call(provider.search) == "duplicate"
+        assert provider.calls == 2
+    finally:
+        provider.release.set()
+
+
+def test_calls_are_not_hedged_while_the_circuit_is_open():
+    breaker = get_circuit_breaker("hedge-open-dep", "open-key")
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(ConnectionError("down"))
+
+    provider = SlowFirstProvider("open-key")
+    provider.release.set()
+    hedge = Hedge("slow.search", dependency="hedge-open-dep", delay=0.01)
+    assert hedge.call(provider.search) == "primary"
+    assert provider.calls == 1
+
+
+def test_adaptive_delay_waits_for_enough_samples():
+    hedge = Hedge("fast.search", min_samples=3, quantile=0.5)
+    assert hedge.delay() is None
+    for _ in range(3):
+        hedge.call(lambda: None)
+    assert hedge.delay() is not None
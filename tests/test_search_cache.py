@@ -0,0 +1,81 @@
+from deep_memory import MemoryCache
+from deep_memory.providers.pinecone_provider import PineconeProvider, INDEX_NAMES
+from deep_memory.providers.pinecone_registry import PineconeRegistry
+
+
+#=======================================================================
+# Stand-in for a Pinecone index handle counting searches
+#=======================================================================
+class StubIndex:
+    def __init__(self):
+        self.searches = 0
+
+    def search(self, query, namespace):
+        self.searches += 1
+        return {"result": {"hits": [{"_id": f"hit-{self.searches}", "_score": 1.0, "fields": {"chunk_text": query["inputs"]["text"]}}]}}
+
+    def upsert_records(self, records, namespace):
+        pass
+
+
+#=======================================================================
+# Returns a provider on stub index handles (no Pinecone calls), and its
+# page index
+#=======================================================================
+def build_provider(result_cache=None, indexing_delay=0.0, api_key="key"):
+    registry = PineconeRegistry()
+    registry._clients[api_key] = object()
+    registry._initialized.add(api_key)
+    for index_name in INDEX_NAMES:
+        registry._indexes[(api_key, index_name)] = StubIndex()
+
+    provider = PineconeProvider(api_key, registry=registry, result_cache=result_cache, indexing_delay=indexing_delay)
+    return provider, registry._indexes[(api_key, "deep-memory-page")]
+
+
+def test_repeated_search_is_served_from_the_cache():
+    cache = MemoryCache(max_size=16, ttl=60)
+    provider, index = build_provider(result_cache=cache)
+
+    first = provider.search_text("deep-memory-page", "migration", namespace="user")
+    assert provider.search_text("deep-memory-page", "migration", namespace="user") == first
+    assert index.searches == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_write_bumps_the_generation_and_invalidates_cached_results():
+    provider, index = build_provider(result_cache=MemoryCache(max_size=16, ttl=60))
+    provider.search_text("deep-memory-page", "migration", namespace="user")
+    generation = provider.registry.generation("key", "deep-memory-page", "user")
+
+    provider.upsert_records("deep-memory-page", [{"_id": "page-1", "chunk_text": "new"}], namespace="user")
+    assert provider.registry.generation("key", "deep-memory-page", "user") > generation
+
+    results = provider.search_text("deep-memory-page", "migration", namespace="user")
+    assert index.searches == 2
+    assert results["result"]["hits"][0]["_id"] == "hit-2"
+
+    # Writes to another namespace leave this one's results cached
+    provider.upsert_records("deep-memory-page", [{"_id": "page-2", "chunk_text": "other"}], namespace="other")
+    provider.search_text("deep-memory-page", "migration", namespace="user")
+    assert index.searches == 2
+
+
+def test_results_are_not_cached_while_a_write_may_be_indexing():
+    provider, index = build_provider(result_cache=MemoryCache(max_size=16, ttl=60), indexing_delay=60.0)
+    provider.upsert_records("deep-memory-page", [{"_id": "page-1", "chunk_text": "new"}], namespace="user")
+
+    provider.search_text("deep-memory-page", "migration", namespace="user")
+    provider.search_text("deep-memory-page", "migration", namespace="user")
+    assert index.searches == 2
+
+
+def test_shared_cache_keeps_api_keys_apart():
+    cache = MemoryCache(max_size=16, ttl=60)
+    provider, index = build_provider(result_cache=cache)
+    other, other_index = build_provider(result_cache=cache, api_key="other-key")
+
+    provider.search_text("deep-memory-page", "migration", namespace="user")
+    other.search_text("deep-memory-page", "migration", namespace="user")
+    assert index.searches == 1
+    assert other_index.searches == 1
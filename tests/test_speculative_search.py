@@ -0,0 +1,84 @@
+import asyncio
+import threading
+import time
+from deep_memory.providers import FakeOpenAIProvider, FakePineconeProvider
+from conftest import build_deep_memory
+
+
+QUERY = "Who owns the Pinecone migration project?"
+
+
+#=======================================================================
+# Fake OpenAI provider recording when planning starts and ends
+#=======================================================================
+class TimedOpenAIProvider(FakeOpenAIProvider):
+    def __init__(self, text_latency):
+        super().__init__(text_latency=text_latency, image_latency=0.0)
+        self.planned = []
+
+    def generate_text(self, prompt, use_cache=True, reasoning_effort=None, deadline=None):
+        started = time.monotonic()
+        response = super().generate_text(prompt, use_cache, reasoning_effort, deadline)
+        if "You are the PlanningAgent" in prompt:
+            self.planned.append((started, time.monotonic()))
+        return response
+
+
+#=======================================================================
+# Fake storage recording when each search starts
+#=======================================================================
+class TimedPineconeProvider(FakePineconeProvider):
+    def __init__(self):
+        super().__init__(search_latency=0.0, upsert_latency=0.0, rerank_latency=0.0)
+        self.started = []
+        self._started_lock = threading.Lock()
+
+    def search_text(self, index_name, query_text, top_k=5, namespace="deep-memory", deadline=None):
+        with self._started_lock:
+            self.started.append((index_name, query_text, time.monotonic()))
+        return super().search_text(index_name, query_text, top_k, namespace, deadline=deadline)
+
+
+#=======================================================================
+# Returns the hybrid search_done events of a research run
+#=======================================================================
+def hybrid_searches(events: list) -> list:
+    return [detail for stage, detail in events if stage == "search_done" and detail.get("type") == "hybrid"]
+
+
+def test_raw_query_is_searched_while_the_plan_is_generated():
+    provider = TimedOpenAIProvider(text_latency=0.2)
+    storage = TimedPineconeProvider()
+    dm = build_deep_memory(openai_provider=provider, storage_backend=storage)
+
+    dm.research_agent.gather_evidence(QUERY, mode="deep")
+    (_, plan_ended), = provider.planned
+    page_searches = [started for index_name, query_text, started in storage.started if index_name.startswith("deep-memory-page") and query_text == QUERY]
+    assert page_searches and min(page_searches) < plan_ended
+
+
+def test_planned_duplicate_of_the_raw_query_is_not_searched_again():
+    dm = build_deep_memory()
+    events = []
+
+    dm.research_agent.gather_evidence(QUERY, on_progress=lambda stage, detail: events.append((stage, detail)), mode="deep")
+    searches = hybrid_searches(events)
+    assert [detail.get("speculative", False) for detail in searches if detail["query"] == QUERY] == [True]
+
+
+def test_without_speculation_only_planned_searches_run():
+    dm = build_deep_memory()
+    dm.research_agent.speculative = False
+    events = []
+
+    dm.research_agent.gather_evidence(QUERY, on_progress=lambda stage, detail: events.append((stage, detail)), mode="deep")
+    searches = hybrid_searches(events)
+    assert searches and not any(detail.get("speculative") for detail in searches)
+
+
+def test_async_research_searches_speculatively():
+    dm = build_deep_memory()
+    events = []
+
+    asyncio.run(dm.research_agent.agather_evidence(QUERY, on_progress=lambda stage, detail: events.append((stage, detail)), mode="deep"))
+    assert [detail["query"] for detail in hybrid_searches(events) if detail.get("speculative")] == [QUERY]